@@ -2,30 +2,73 @@
 
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
+from pathlib import Path
+import time
 import traceback
+from typing import Any, Callable, Coroutine, Dict, Optional, Set
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 
 from config import (
     ADMIN_USER_ID,
+    ATTACHMENT_CACHE_MB,
     BOOST_REPORT_CHANNEL_ID,
+    BREAKER_COOLDOWN_SECONDS,
+    BREAKER_MAX_COOLDOWN_SECONDS,
+    CLUSTER_DB_PATH,
+    CLUSTER_HEARTBEAT_SECONDS,
+    CONFIG_RELOAD_INTERVAL_SECONDS,
+    DOTENV_PATH,
+    ENABLED_COGS,
+    ENTITY_CACHE_NEGATIVE_TTL_SECONDS,
+    ENTITY_CACHE_TTL_SECONDS,
+    EVENT_RECORD_BACKUPS,
+    EVENT_RECORD_MAX_MB,
+    EVENT_RECORD_PATH,
     GUILD_ID,
+    GUILD_IDS,
+    HEALTH_HOST,
+    HEALTH_PORT,
+    HEALTH_STALL_SECONDS,
     INVITE_CODE_FOR_BOT_BOOSTER,
     ROLE_BOT_BOOSTER,
     ROLE_MOVIES,
     ROLE_SERVER_BOOSTER,
     MODERATOR_ROLE,
-    TRACK_USER_ID,
+    READY_CONCURRENCY,
+    SHARD_COUNT,
     GOOGLE_SHEET_URL,
+    LOOP_LAG_ALERT_MS,
+    LOOP_MONITOR_INTERVAL_MS,
+    LOOP_STALL_THRESHOLD_MS,
+    STATE_DB_PATH,
+    STATE_FLUSH_INTERVAL_MS,
 )
 
+from .breaker import CircuitBreaker
+from .cluster import ClusterBus, ClusterInfo
+from .command_sync import sync_all_guilds
+from .entities import EntityCache
+from .guild_settings import GuildSettingsIndex
+from .health import HealthServer
+from .loopmon import LoopMonitor
+from .manifest import CogSpec, compute_intents, select_cogs
+from .media import AttachmentCache
+from .recorder import EventRecorder
+from .scheduler import TimerScheduler
+from .settings_reload import SettingsReloader
+from .shutdown import SHUTDOWN_NOTICE
+from .startup import Phase, StartupTimeline, run_cog_readiness
+from .storage import StateStore
+
 
 @dataclass(frozen=True)
 class BotSettings:
     admin_user_id: int
-    track_user_id: int
     guild_id: int
     boost_report_channel_id: int
     invite_code_for_bot_booster: str
@@ -36,20 +79,56 @@ class BotSettings:
     google_sheet_url: str
 
 
-class OutBot(commands.Bot):
-    def __init__(self) -> None:
-        intents = discord.Intents.default()
-        intents.members = True
-        intents.guilds = True
-        intents.message_content = True
-        intents.voice_states = True
-        intents.presences = True
+class _CommandTree(app_commands.CommandTree):
+    """Turns commands away during shutdown and tracks the ones it runs."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        bot = self.client
+        if bot.shutting_down:
+            if interaction.type is discord.InteractionType.application_command:
+                await interaction.response.send_message(SHUTDOWN_NOTICE, ephemeral=True)
+            return False
+        task = asyncio.current_task()
+        if task is not None:
+            bot.track(task)
+        return True
+
 
-        super().__init__(command_prefix="!", intents=intents)
+class OutBot(commands.AutoShardedBot):
+    def __init__(self, *, started_at: Optional[float] = None, cluster: Optional[ClusterInfo] = None) -> None:
+        self.startup = StartupTimeline(started_at)
+        if started_at is not None:
+            self.startup.add("import", started_at, time.perf_counter())
+        self._login_phase: Optional[Phase] = None
+        self._startup_reported = False
+        # Names of cogs whose ready_guild work has finished for every guild.
+        self.ready_cogs: Set[str] = set()
+        self.cogs_ready = asyncio.Event()
+        # Event handlers and command invocations still running; drained on shutdown.
+        self.inflight: Set[asyncio.Task] = set()
+        self.shutting_down = False
+
+        self.cog_specs = select_cogs(ENABLED_COGS)
+        intents = compute_intents(self.cog_specs)
+
+        # In cluster mode this process runs only its shard range; otherwise every
+        # shard (SHARD_COUNT, or Discord's recommendation when 0) runs here.
+        if cluster is not None:
+            sharding = {"shard_ids": list(cluster.shard_ids), "shard_count": cluster.shard_count}
+        else:
+            sharding = {"shard_count": SHARD_COUNT or None}
+
+        super().__init__(
+            command_prefix="!",
+            intents=intents,
+            **sharding,
+            chunk_guilds_at_startup=any(spec.chunk_members for spec in self.cog_specs),
+            max_messages=1000 if any(spec.message_cache for spec in self.cog_specs) else None,
+            tree_cls=_CommandTree,
+        )
 
         self.settings = BotSettings(
             admin_user_id=ADMIN_USER_ID,
-            track_user_id=TRACK_USER_ID,
             guild_id=GUILD_ID,
             boost_report_channel_id=BOOST_REPORT_CHANNEL_ID,
             invite_code_for_bot_booster=INVITE_CODE_FOR_BOT_BOOSTER,
@@ -59,36 +138,211 @@ class OutBot(commands.Bot):
             moderator_role=MODERATOR_ROLE,
             google_sheet_url=GOOGLE_SHEET_URL,
         )
+        # Per-guild view of the settings above; overrides load with the store.
+        self.guild_settings = GuildSettingsIndex(self, GUILD_IDS)
+        self.entities = EntityCache(
+            self, ttl=ENTITY_CACHE_TTL_SECONDS, negative_ttl=ENTITY_CACHE_NEGATIVE_TTL_SECONDS
+        )
+        self.attachments = AttachmentCache(max_bytes=ATTACHMENT_CACHE_MB * 1024 * 1024)
+        self.breaker = CircuitBreaker(
+            self, cooldown=BREAKER_COOLDOWN_SECONDS, max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS
+        )
+        # Delayed actions of every cog (reconnects, expiries, periodic checks).
+        self.scheduler = TimerScheduler(self)
+        self.settings_reloader = SettingsReloader(self, DOTENV_PATH, interval=CONFIG_RELOAD_INTERVAL_SECONDS)
+        self.commands_synced: bool = False
+        self.loop_monitor = LoopMonitor(
+            self,
+            interval=LOOP_MONITOR_INTERVAL_MS / 1000,
+            stall_threshold=LOOP_STALL_THRESHOLD_MS / 1000,
+            alert_threshold=LOOP_LAG_ALERT_MS / 1000,
+        )
+
+        self.cluster: Optional[ClusterBus] = None
+        if cluster is not None:
+            self.cluster = ClusterBus(
+                self, Path(CLUSTER_DB_PATH), cluster, heartbeat=CLUSTER_HEARTBEAT_SECONDS
+            )
+
+        self.health: Optional[HealthServer] = None
+        if HEALTH_PORT:
+            # Each cluster worker gets its own port so a supervisor can probe every process.
+            port = HEALTH_PORT + (cluster.cluster_id if cluster is not None else 0)
+            self.health = HealthServer(self, HEALTH_HOST, port, stall_after=HEALTH_STALL_SECONDS)
+
+        self.store = StateStore(
+            Path(STATE_DB_PATH) if STATE_DB_PATH else None,
+            flush_interval=STATE_FLUSH_INTERVAL_MS / 1000,
+        )
+
+        self.event_recorder: Optional[EventRecorder] = None
+        if EVENT_RECORD_PATH:
+            record_path = Path(EVENT_RECORD_PATH)
+            if cluster is not None:
+                # One capture file per worker; they would otherwise rotate each other's files.
+                record_path = record_path.with_name(f"{record_path.stem}.cluster{cluster.cluster_id}{record_path.suffix}")
+            self.event_recorder = EventRecorder(
+                record_path,
+                max_bytes=EVENT_RECORD_MAX_MB * 1024 * 1024,
+                backups=EVENT_RECORD_BACKUPS,
+            )
+            self.event_recorder.install(self._connection.parsers)
+
+    def track(self, task: asyncio.Task) -> None:
+        self.inflight.add(task)
+        task.add_done_callback(self.inflight.discard)
+
+    def _schedule_event(
+        self,
+        coro: Callable[..., Coroutine[Any, Any, Any]],
+        event_name: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> asyncio.Task:
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.track(task)
+        return task
+
+    async def login(self, token: str) -> None:
+        self._login_phase = self.startup.begin("login")
+        await super().login(token)
 
     async def setup_hook(self) -> None:
-        from .cogs.boosters import BoostersCog
-        from .cogs.dm_relay import DmRelayCog
-        from .cogs.voice import VoiceCog
-        from .cogs.tracking import TrackingCog
-        from .cogs.misc import MiscCog
-        from .cogs.target_game import TargetGameCog
-        from .cogs.error_handlers import ErrorHandlerCog
-
-        await self.add_cog(MiscCog(self))
-        await self.add_cog(BoostersCog(self))
-        await self.add_cog(VoiceCog(self))
-        await self.add_cog(TrackingCog(self))
-        await self.add_cog(DmRelayCog(self))
-        await self.add_cog(TargetGameCog(self))
-        await self.add_cog(ErrorHandlerCog(self))
+        if self._login_phase is not None:
+            self.startup.end(self._login_phase)
+        with self.startup.span("setup_hook"):
+            await self._setup()
 
-        try:
-            guild_object = discord.Object(id=self.settings.guild_id)
-            synced = await self.tree.sync(guild=guild_object)
-            print(f"Synced {len(synced)} application commands for guild {self.settings.guild_id}.")
-        except Exception as exc:
+    async def _setup(self) -> None:
+        self.loop_monitor.start()
+        if self.health is not None:
+            # Up before anything slow so /livez answers (and /readyz says 503) during startup.
+            await self.health.start()
+        # Cogs read their persisted state in __init__, so load it first.
+        with self.startup.span("state store load"):
+            await self.store.open()
+            self.guild_settings.load()
+            self.breaker.load()
+            self.scheduler.load()
+        if self.cluster is not None:
+            with self.startup.span("cluster bus"):
+                await self.cluster.open()
+            self.cluster.on("notify", self._on_cluster_notify)
+            self.cluster.on("reload", self._on_cluster_reload)
+        self.settings_reloader.start()
+        # Fires nothing before the gateway is ready; cogs register handlers as they load.
+        self.scheduler.start()
+
+        for spec in self.cog_specs:
+            with self.startup.span(f"load {spec.name}"):
+                await self.load_extension(spec.module)
+        print(
+            f"Loaded cogs: {', '.join(spec.name for spec in self.cog_specs)} "
+            f"(intents value {self.intents.value})."
+        )
+
+        if self.cluster is not None and not self.cluster.info.primary:
+            # Commands are per guild, not per shard; the primary worker syncs them.
+            self.commands_synced = True
+            return
+        with self.startup.span(f"command sync ({len(GUILD_IDS)} guilds)"):
+            results = await sync_all_guilds(self, GUILD_IDS)
+        failed = [guild_id for guild_id, result in results.items() if isinstance(result, Exception)]
+        for result in results.values():
+            if isinstance(result, Exception):
+                continue
+            if result.skipped:
+                print(
+                    f"Skipped command sync for guild {result.guild_id}: "
+                    f"command tree unchanged (fingerprint {result.fingerprint[:12]})."
+                )
+            else:
+                print(f"Synced {len(result.synced or [])} application commands for guild {result.guild_id}.")
+        if failed:
             from .utils import notify_admin
 
+            details = "\n".join(
+                "".join(traceback.format_exception(results[guild_id])) for guild_id in failed
+            )
             await notify_admin(
                 self,
-                f"Failed to sync app commands: {exc}\n{traceback.format_exc()}",
+                f"Failed to sync app commands for guilds {', '.join(map(str, failed))}:\n{details}",
             )
+        self.commands_synced = not failed
+
+    async def _on_cluster_notify(self, sender: int, payload: Dict[str, Any]) -> None:
+        from .utils import send_admin_alert
+
+        await send_admin_alert(self, f"[cluster {sender}] {payload['message']}")
+
+    async def _on_cluster_reload(self, sender: int, payload: Dict[str, Any]) -> None:
+        try:
+            await self.reload_cog(payload["cog"])
+        except Exception as exc:
+            from .utils import notify_admin
+
+            await notify_admin(self, f"Reload of {payload['cog']} requested by cluster {sender} failed: {exc!r}")
+
+    async def on_connect(self) -> None:
+        if not self._startup_reported:
+            self.startup.mark("gateway connected")
+
+    async def on_ready(self) -> None:
+        """Run every cog's per-guild readiness work once caches are populated."""
+        if not self._startup_reported:
+            self.startup.mark("gateway ready (caches loaded)")
+        self.ready_cogs.clear()
+        self.cogs_ready.clear()
+        await run_cog_readiness(self, self.startup, limit=READY_CONCURRENCY)
+        if not self._startup_reported:
+            self._startup_reported = True
+            print("\n".join(self.startup.format()))
+
+    def is_cog_ready(self, name: str) -> bool:
+        """Whether the cog named ``name`` (class name) finished its readiness work."""
+        cog = self.get_cog(name)
+        return cog is not None and (name in self.ready_cogs or not hasattr(cog, "ready_guild"))
+
+    async def reload_cog(self, name: str) -> CogSpec:
+        """Re-import one cog's extension in place, keeping the gateway session.
+
+        Attributes listed in the cog's ``HANDOFF_ATTRS`` are moved to the new
+        instance; store-backed state is shared through ``self.store`` anyway.
+        If the new code fails to load, discord.py restores the old module and
+        the handoff is applied to that instance instead.
+        """
+        spec = next((spec for spec in self.cog_specs if spec.name == name), None)
+        if spec is None:
+            raise commands.ExtensionNotLoaded(name)
+
+        old = self.get_cog(spec.class_name)
+        handoff = {
+            attr: getattr(old, attr)
+            for attr in getattr(old, "HANDOFF_ATTRS", ())
+            if hasattr(old, attr)
+        }
+        try:
+            await self.reload_extension(spec.module)
+        finally:
+            new = self.get_cog(spec.class_name)
+            if new is not None and new is not old:
+                for attr, value in handoff.items():
+                    setattr(new, attr, value)
+        return spec
+
+    async def close(self) -> None:
+        if self.health is not None:
+            await self.health.stop()
+        await self.settings_reloader.stop()
+        await self.loop_monitor.stop()
+        await self.scheduler.stop()
+        await super().close()
+        if self.cluster is not None:
+            await self.cluster.close()
+        await self.store.close()
+        if self.event_recorder is not None:
+            await asyncio.to_thread(self.event_recorder.close)
 
 
-def create_bot() -> OutBot:
-    return OutBot()
+def create_bot(*, started_at: Optional[float] = None, cluster: Optional[ClusterInfo] = None) -> OutBot:
+    return OutBot(started_at=started_at, cluster=cluster)
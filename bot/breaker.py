@@ -0,0 +1,207 @@
+"""Circuit breaker for Discord sends, keyed by destination and error class."""
+
+from __future__ import annotations
+
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import json
+import time
+from typing import AsyncContextManager, AsyncIterator, Dict, List, Optional, Set
+
+import discord
+from discord.ext import commands
+
+from .storage import PersistentMap
+
+STORE_NAMESPACE = "breaker.circuits"
+
+# Discord JSON error code for "Cannot send messages to this user" (DMs closed or bot blocked).
+_CANNOT_DM = 50007
+# Failures in a row that open a circuit. Client errors repeat until something
+# changes on the other side; server errors get a few chances.
+_THRESHOLDS = {"dm_closed": 1, "forbidden": 1, "not_found": 1, "server_error": 3}
+_DESCRIPTIONS = {
+    "dm_closed": "ЛС закрыты или бот заблокирован",
+    "forbidden": "нет доступа (403)",
+    "not_found": "получатель не найден (404)",
+    "server_error": "ошибки Discord (5xx)",
+}
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """Error class of a failed send, or None when the failure says nothing about the destination."""
+    if isinstance(exc, discord.Forbidden):
+        return "dm_closed" if exc.code == _CANNOT_DM else "forbidden"
+    if isinstance(exc, discord.NotFound):
+        return "not_found"
+    if isinstance(exc, discord.DiscordServerError):
+        return "server_error"
+    return None
+
+
+def user_destination(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def send_guard(bot: commands.Bot, destination: str) -> AsyncContextManager[None]:
+    """``bot.breaker.guard(destination)``, or a no-op where the bot has no breaker."""
+    breaker = getattr(bot, "breaker", None)
+    return breaker.guard(destination) if breaker is not None else nullcontext()
+
+
+@dataclass
+class Circuit:
+    destination: str
+    error: str
+    failures: int = 0
+    cooldown: float = 0.0
+    # Wall-clock time (persisted); 0 while the circuit is closed.
+    open_until: float = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until > 0
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending while a destination's circuit is open."""
+
+    def __init__(self, circuit: Circuit) -> None:
+        super().__init__(f"Circuit open for {circuit.destination} ({circuit.error}) until {circuit.open_until:.0f}")
+        self.circuit = circuit
+
+    def notice(self) -> str:
+        retry = datetime.fromtimestamp(self.circuit.open_until).strftime("%H:%M")
+        reason = _DESCRIPTIONS.get(self.circuit.error, self.circuit.error)
+        return f"Отправка пропущена: {reason}. Следующая попытка после {retry}."
+
+
+class CircuitBreaker:
+    """Short-circuits sends to destinations that keep failing the same way.
+
+    A circuit per ``(destination, error class)`` opens after the class's
+    threshold of consecutive failures. While open, ``guard`` raises
+    ``CircuitOpen`` without a request. Once the cooldown ends one send goes
+    through as a probe (half-open): success closes every circuit of the
+    destination, failure reopens it with double the cooldown, up to
+    ``max_cooldown``. Open circuits are kept in the state store.
+    """
+
+    def __init__(self, bot: commands.Bot, *, cooldown: float, max_cooldown: float) -> None:
+        self.bot = bot
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.short_circuited = 0
+        self.probes = 0
+        # destination -> error class -> circuit
+        self._circuits: Dict[str, Dict[str, Circuit]] = {}
+        self._probing: Set[str] = set()
+
+    def load(self) -> None:
+        """Read open circuits; call once the state store is open."""
+        self._circuits = {}
+        for encoded in self._table().values():
+            try:
+                circuit = Circuit(**json.loads(encoded))
+            except (TypeError, ValueError):
+                continue
+            self._circuits.setdefault(circuit.destination, {})[circuit.error] = circuit
+
+    def _table(self) -> PersistentMap[str, str]:
+        return self.bot.store.table(STORE_NAMESPACE, str, str)
+
+    def _save(self, circuit: Circuit) -> None:
+        key = f"{circuit.destination}|{circuit.error}"
+        if circuit.is_open:
+            self._table()[key] = json.dumps(asdict(circuit))
+        else:
+            self._table().pop(key, None)
+
+    def open_circuits(self) -> List[Circuit]:
+        circuits = (c for errors in self._circuits.values() for c in errors.values() if c.is_open)
+        return sorted(circuits, key=lambda c: c.open_until)
+
+    def check(self, destination: str) -> bool:
+        """Raise ``CircuitOpen`` if sending is blocked; returns True when this send is the half-open probe."""
+        now = time.time()
+        probe = False
+        for circuit in self._circuits.get(destination, {}).values():
+            if not circuit.is_open:
+                continue
+            if now < circuit.open_until or destination in self._probing:
+                self.short_circuited += 1
+                raise CircuitOpen(circuit)
+            probe = True
+        if probe:
+            self._probing.add(destination)
+            self.probes += 1
+        return probe
+
+    def success(self, destination: str) -> None:
+        self._probing.discard(destination)
+        for circuit in self._circuits.pop(destination, {}).values():
+            if circuit.is_open:
+                circuit.open_until = 0.0
+                self._save(circuit)
+                print(f"Circuit closed for {destination} ({circuit.error}).")
+
+    def failure(self, destination: str, exc: BaseException) -> None:
+        probing = destination in self._probing
+        self._probing.discard(destination)
+        error = classify(exc)
+        if error is None:
+            return
+        circuit = self._circuits.setdefault(destination, {}).setdefault(error, Circuit(destination, error))
+        circuit.failures += 1
+        if not probing and circuit.failures < _THRESHOLDS[error]:
+            return
+        circuit.cooldown = min(self.max_cooldown, circuit.cooldown * 2) if circuit.is_open else self.cooldown
+        circuit.open_until = time.time() + circuit.cooldown
+        self._save(circuit)
+        print(f"Circuit open for {destination} ({error}) for {circuit.cooldown:.0f} s.")
+
+    def reset(self, destination: Optional[str] = None) -> int:
+        """Close circuits for ``destination`` (all when None); returns how many were open."""
+        destinations = list(self._circuits) if destination is None else [destination]
+        closed = 0
+        for name in destinations:
+            self._probing.discard(name)
+            for circuit in self._circuits.pop(name, {}).values():
+                if circuit.is_open:
+                    closed += 1
+                    circuit.open_until = 0.0
+                    self._save(circuit)
+        return closed
+
+    @asynccontextmanager
+    async def guard(self, destination: str) -> AsyncIterator[None]:
+        """Wrap one send to ``destination``; raises ``CircuitOpen`` instead of sending when blocked."""
+        self.check(destination)
+        try:
+            yield
+        except Exception as exc:
+            self.failure(destination, exc)
+            raise
+        except BaseException:
+            self._probing.discard(destination)
+            raise
+        else:
+            self.success(destination)
+
+    def stats_line(self) -> str:
+        return (
+            f"Предохранитель отправки: открыто {len(self.open_circuits())}, "
+            f"пропущено отправок {self.short_circuited}, пробных {self.probes}"
+        )
+
+    def format_circuits(self) -> List[str]:
+        lines = []
+        for circuit in self.open_circuits():
+            retry = datetime.fromtimestamp(circuit.open_until).strftime("%Y-%m-%d %H:%M")
+            state = "пробная отправка" if circuit.destination in self._probing else f"до {retry}"
+            lines.append(
+                f"{circuit.destination}: {_DESCRIPTIONS.get(circuit.error, circuit.error)}, "
+                f"ошибок {circuit.failures}, пауза {circuit.cooldown:.0f} с, {state}"
+            )
+        return lines
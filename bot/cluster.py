@@ -0,0 +1,344 @@
+"""Cluster coordination between worker processes that each run a shard range.
+
+Workers share one SQLite file holding a message table and one health row per
+shard. The worker that owns shard 0 is the primary: Discord delivers every DM
+on shard 0, so it owns the DM relay and sends admin notifications on behalf of
+the whole cluster. Other workers forward that kind of work to it as messages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+import math
+import os
+from pathlib import Path
+import sqlite3
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from discord.ext import commands
+
+PRIMARY = 0
+BROADCAST = -1
+
+Handler = Callable[[int, Dict[str, Any]], Awaitable[None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target INTEGER NOT NULL,
+    sender INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    cluster_id INTEGER PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shard_health (
+    shard_id INTEGER PRIMARY KEY,
+    cluster_id INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    latency_ms REAL,
+    guilds INTEGER NOT NULL,
+    connected INTEGER NOT NULL,
+    loop_lag_ms REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class ClusterInfo:
+    cluster_id: int
+    shard_ids: Tuple[int, ...]
+    shard_count: int
+    size: int
+
+    @property
+    def primary(self) -> bool:
+        return self.cluster_id == PRIMARY
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether this worker's shards include the one Discord routes ``guild_id`` to."""
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+
+def shard_ranges(shard_count: int, processes: int) -> List[Tuple[int, ...]]:
+    """Split ``range(shard_count)`` into contiguous ranges, one per process; the first holds shard 0."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(tuple(range(start, start + size)))
+        start += size
+    return ranges
+
+
+@dataclass(frozen=True)
+class ShardHealth:
+    shard_id: int
+    cluster_id: int
+    pid: int
+    latency_ms: Optional[float]
+    guilds: int
+    connected: bool
+    loop_lag_ms: float
+    updated_at: float
+
+
+def local_shard_health(bot: commands.AutoShardedBot, cluster_id: int = PRIMARY) -> List[ShardHealth]:
+    """Health of the shards running in this process."""
+    guilds = Counter(guild.shard_id for guild in bot.guilds)
+    monitor = getattr(bot, "loop_monitor", None)
+    lag_ms = monitor.stats().last * 1000 if monitor is not None else 0.0
+    now = time.time()
+    rows = []
+    for shard_id, shard in sorted(bot.shards.items()):
+        latency = shard.latency
+        rows.append(
+            ShardHealth(
+                shard_id=shard_id,
+                cluster_id=cluster_id,
+                pid=os.getpid(),
+                latency_ms=latency * 1000 if math.isfinite(latency) else None,
+                guilds=guilds[shard_id],
+                connected=not shard.is_closed(),
+                loop_lag_ms=lag_ms,
+                updated_at=now,
+            )
+        )
+    return rows
+
+
+def format_shard_health(rows: List[ShardHealth], *, stale_after: float) -> List[str]:
+    now = time.time()
+    lines = []
+    for row in rows:
+        age = now - row.updated_at
+        if age > stale_after:
+            state = f"❌ нет отчёта {age:.0f} с"
+        elif row.connected:
+            state = "✅"
+        else:
+            state = "⚠️ отключён"
+        latency = f"{row.latency_ms:.0f} мс" if row.latency_ms is not None else "—"
+        lines.append(
+            f"Шард {row.shard_id} (процесс {row.cluster_id}, pid {row.pid}): {state}, "
+            f"пинг {latency}, гильдий {row.guilds}, задержка цикла {row.loop_lag_ms:.0f} мс"
+        )
+    return lines
+
+
+def reset_cluster_db(path: Path, shard_count: int) -> None:
+    """Drop messages, cursors and health rows left over from a previous launch."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(_SCHEMA)
+        with conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM cursors")
+            conn.execute("DELETE FROM shard_health WHERE shard_id >= ?", (shard_count,))
+    finally:
+        conn.close()
+
+
+class ClusterBus:
+    """Messages between workers and per-shard health, exchanged through SQLite.
+
+    ``send`` appends a message for one worker (the primary by default) or for
+    every other worker. Each worker polls for new messages every
+    ``poll_interval`` seconds and remembers the last one it handled, so a
+    restarted worker resumes where it left off. Health rows are rewritten
+    every ``heartbeat`` seconds; messages older than ``retention`` seconds
+    are pruned then, but only once every worker's cursor has passed them.
+    """
+
+    def __init__(
+        self,
+        bot: commands.AutoShardedBot,
+        path: Path,
+        info: ClusterInfo,
+        *,
+        heartbeat: float,
+        poll_interval: float = 0.5,
+        retention: float = 600.0,
+    ) -> None:
+        self.bot = bot
+        self.path = path
+        self.info = info
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.sent = 0
+        self.received = 0
+        self._handlers: Dict[str, Handler] = {}
+        self._cursor = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def on(self, kind: str, handler: Handler) -> None:
+        """Handle messages of ``kind``; the handler gets the sender's cluster ID and the payload."""
+        self._handlers[kind] = handler
+
+    def off(self, kind: str) -> None:
+        self._handlers.pop(kind, None)
+
+    async def open(self) -> None:
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cluster-bus")
+        self._cursor = await self._run(self._load_cursor)
+        # Pruning waits for every worker's cursor, so register ours before the first message.
+        await self._run(self._save_cursor, self._cursor)
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            await self._run(self._disconnect)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        assert self._executor is not None
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def send(self, kind: str, payload: Dict[str, Any], *, target: int = PRIMARY) -> None:
+        if target == self.info.cluster_id:
+            await self._handle(self.info.cluster_id, kind, payload)
+            return
+        encoded = json.dumps(payload, ensure_ascii=False)
+        await self._run(self._insert, target, kind, encoded)
+        self.sent += 1
+
+    async def health(self) -> List[ShardHealth]:
+        """Latest health row of every shard in the cluster."""
+        rows = await self._run(self._select_health)
+        return [ShardHealth(*row[:5], bool(row[5]), *row[6:]) for row in rows]
+
+    async def _handle(self, sender: int, kind: str, payload: Dict[str, Any]) -> None:
+        handler = self._handlers.get(kind)
+        if handler is None:
+            print(f"Cluster bus: no handler for {kind!r} from cluster {sender}.")
+            return
+        try:
+            await handler(sender, payload)
+        except Exception:
+            print(f"Cluster bus handler {kind!r} failed:\n{traceback.format_exc()}")
+
+    async def _loop(self) -> None:
+        next_heartbeat = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now >= next_heartbeat:
+                    next_heartbeat = now + self.heartbeat
+                    health = local_shard_health(self.bot, self.info.cluster_id)
+                    await self._run(self._write_health, health, time.time() - self.retention)
+                previous = self._cursor
+                messages, high = await self._run(self._fetch, self._cursor)
+                for message_id, sender, kind, payload in messages:
+                    self.received += 1
+                    await self._handle(sender, kind, json.loads(payload))
+                    self._cursor = message_id
+                # Messages for other workers up to ``high`` were passed over, not missed.
+                self._cursor = max(self._cursor, high)
+                if self._cursor != previous:
+                    await self._run(self._save_cursor, self._cursor)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                print(f"Cluster bus poll failed:\n{traceback.format_exc()}")
+            await asyncio.sleep(self.poll_interval)
+
+    # -- bus thread ------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _load_cursor(self) -> int:
+        row = self._connect().execute(
+            "SELECT last_id FROM cursors WHERE cluster_id = ?", (self.info.cluster_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _save_cursor(self, last_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO cursors (cluster_id, last_id) VALUES (?, ?) "
+                "ON CONFLICT (cluster_id) DO UPDATE SET last_id = excluded.last_id",
+                (self.info.cluster_id, last_id),
+            )
+
+    def _insert(self, target: int, kind: str, payload: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO messages (target, sender, kind, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (target, self.info.cluster_id, kind, payload, time.time()),
+            )
+
+    def _fetch(self, after: int) -> Tuple[List[Tuple[int, int, str, str]], int]:
+        """Messages for this worker after ``after``, and the highest message ID they were read up to."""
+        conn = self._connect()
+        # Read first, so a message committed between the two queries is left for the next poll.
+        (high,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()
+        rows = conn.execute(
+            "SELECT id, sender, kind, payload FROM messages "
+            "WHERE id > ? AND id <= ? AND (target = ? OR (target = ? AND sender != ?)) ORDER BY id",
+            (after, high, self.info.cluster_id, BROADCAST, self.info.cluster_id),
+        ).fetchall()
+        return rows, max(after, high)
+
+    def _write_health(self, rows: List[ShardHealth], prune_before: float) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO shard_health "
+                "(shard_id, cluster_id, pid, latency_ms, guilds, connected, loop_lag_ms, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row.shard_id, row.cluster_id, row.pid, row.latency_ms, row.guilds, int(row.connected),
+                     row.loop_lag_ms, row.updated_at)
+                    for row in rows
+                ],
+            )
+            # Only messages every worker has read past; a restarting or slow worker keeps its backlog.
+            conn.execute(
+                "DELETE FROM messages WHERE created_at < ? AND id <= ("
+                "SELECT CASE WHEN COUNT(*) >= ? THEN MIN(last_id) ELSE 0 END FROM cursors WHERE cluster_id < ?)",
+                (prune_before, self.info.size, self.info.size),
+            )
+
+    def _select_health(self) -> List[Tuple[Any, ...]]:
+        return self._connect().execute(
+            "SELECT shard_id, cluster_id, pid, latency_ms, guilds, connected, loop_lag_ms, updated_at "
+            "FROM shard_health ORDER BY shard_id"
+        ).fetchall()
+
+    def _disconnect(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
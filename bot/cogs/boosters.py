@@ -3,76 +3,180 @@
 from __future__ import annotations
 
 import traceback
-from typing import Dict, List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from bot.cluster import BROADCAST
 from bot.utils import notify_admin
-from config import GUILD_ID
+from config import BOOSTER_CHECK_HOURS, GUILD_IDS
 
 
 class BoostersCog(commands.Cog):
+    # Carried over by /reload so invites are not refetched.
+    HANDOFF_ATTRS = ("invites", "_role_ids")
+    # GuildSettings fields holding role names resolved through the role-ID cache.
+    ROLE_FIELDS = frozenset({"role_bot_booster", "role_server_booster", "moderator_role"})
+    AUDIT_TIMER = "boosters.audit"
+
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        self.invites: Dict[int, List[discord.Invite]] = {}
-        self.auto_report_boosters: bool = True
+        # guild id -> invite code -> uses at the last fetch.
+        self.invites: Dict[int, Dict[str, int]] = {}
+        # (guild id, settings field) -> role id, or None when no role has that name.
+        self._role_ids: Dict[Tuple[int, str], Optional[int]] = {}
+        self.auto_report_boosters: bool = bot.store.get_bool("boosters.auto_report", True)
+
+    async def cog_load(self) -> None:
+        self.bot.scheduler.on(self.AUDIT_TIMER, self._audit_guild)
+        if self.bot.cluster is not None:
+            self.bot.cluster.on("auto_report", self._on_cluster_auto_report)
+
+    async def cog_unload(self) -> None:
+        self.bot.scheduler.off(self.AUDIT_TIMER)
+        if self.bot.cluster is not None:
+            self.bot.cluster.off("auto_report")
+
+    def _set_auto_report(self, enabled: bool) -> None:
+        self.auto_report_boosters = enabled
+        self.bot.store.set("boosters.auto_report", enabled)
+
+    async def _on_cluster_auto_report(self, _sender: int, payload: Dict[str, Any]) -> None:
+        """/toggle_auto_report ran on another worker."""
+        self._set_auto_report(payload["enabled"])
+
+    def _setting_role(self, guild: discord.Guild, field: str) -> Optional[discord.Role]:
+        """Resolve the role named by a settings field, caching its ID per guild."""
+        key = (guild.id, field)
+        if key in self._role_ids:
+            role_id = self._role_ids[key]
+            return guild.get_role(role_id) if role_id is not None else None
+        role_name = (getattr(self.bot.guild_settings.get(guild.id), field) or "").strip()
+        role = discord.utils.get(guild.roles, name=role_name) if role_name else None
+        self._role_ids[key] = role.id if role else None
+        return role
+
+    def _forget_roles(self, guild_id: Optional[int] = None, fields: Iterable[str] = ROLE_FIELDS) -> None:
+        fields = frozenset(fields)
+        self._role_ids = {
+            key: role_id
+            for key, role_id in self._role_ids.items()
+            if key[1] not in fields or (guild_id is not None and key[0] != guild_id)
+        }
 
     def _has_moderator_privileges(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id == self.bot.settings.admin_user_id:
             return True
-        role_name = (self.bot.settings.moderator_role or "").strip()
-        if not role_name:
-            return False
         if not isinstance(interaction.user, discord.Member):
             return False
-        role = discord.utils.get(interaction.user.roles, name=role_name)
-        return role is not None
+        role = self._setting_role(interaction.user.guild, "moderator_role")
+        return role is not None and interaction.user.get_role(role.id) is not None
+
+    @staticmethod
+    def _index_invites(invites: Iterable[discord.Invite]) -> Dict[str, int]:
+        return {invite.code: invite.uses or 0 for invite in invites}
 
     async def _refresh_invites(self, guild: discord.Guild) -> None:
         try:
-            self.invites[guild.id] = await guild.invites()
+            self.invites[guild.id] = self._index_invites(await guild.invites())
         except Exception as exc:
             await notify_admin(
                 self.bot,
                 f"Failed to fetch invites for guild {guild.id}: {exc}\n{traceback.format_exc()}",
             )
 
-    def _find_invite(self, invite_list: List[discord.Invite], code: str) -> Optional[discord.Invite]:
-        for inv in invite_list:
-            if inv.code == code:
-                return inv
-        return None
-
     async def _report_booster_removal(self, member: discord.Member) -> None:
-        channel_id = self.bot.settings.boost_report_channel_id
-        channel = self.bot.get_channel(channel_id)
-        if isinstance(channel, discord.TextChannel):
+        channel = self._get_report_channel(member.guild)
+        if channel:
             await channel.send(f"{member.display_name} больше не бустит сервер.")
 
+    async def ready_guild(self, guild: discord.Guild) -> None:
+        await self._refresh_invites(guild)
+        if BOOSTER_CHECK_HOURS > 0:
+            # Keeps the persisted deadline across restarts instead of pushing it out.
+            self._schedule_audit(guild.id, replace=False)
+
+    def _schedule_audit(self, guild_id: int, *, replace: bool = True) -> None:
+        self.bot.scheduler.schedule(
+            self.AUDIT_TIMER,
+            f"{self.AUDIT_TIMER}:{guild_id}",
+            BOOSTER_CHECK_HOURS * 3600,
+            {"guild_id": guild_id},
+            replace=replace,
+            persist=True,
+        )
+
+    def _expired_boosters(self, guild: discord.Guild) -> Optional[List[discord.Member]]:
+        """Members with the bot booster role who no longer boost; None when that role is missing."""
+        booster_role = self._setting_role(guild, "role_server_booster")
+        bot_booster_role = self._setting_role(guild, "role_bot_booster")
+        if not bot_booster_role:
+            return None
+        return [
+            member for member in bot_booster_role.members
+            if not booster_role or booster_role not in member.roles
+        ]
+
+    async def _audit_guild(self, payload: Dict[str, Any]) -> None:
+        """Periodic expired-booster report, every BOOSTER_CHECK_HOURS."""
+        guild = self.bot.get_guild(payload["guild_id"])
+        if guild is None or BOOSTER_CHECK_HOURS <= 0 or not self.bot.guild_settings.serves(guild.id):
+            return
+        self._schedule_audit(guild.id)
+        if not self.auto_report_boosters:
+            return
+        expired = self._expired_boosters(guild)
+        channel = self._get_report_channel(guild)
+        if expired and channel:
+            message = "\n".join(["Плановая проверка: перестали бустить сервер:"] + [m.display_name for m in expired])
+            if len(message) > 2000:
+                message = f"Плановая проверка: перестали бустить сервер {len(expired)} участников."
+            await channel.send(message)
+
     @commands.Cog.listener()
-    async def on_ready(self) -> None:
-        for guild in self.bot.guilds:
-            await self._refresh_invites(guild)
+    async def on_settings_changed(self, _old: object, _new: object, changed: FrozenSet[str]) -> None:
+        if changed & self.ROLE_FIELDS:
+            self._forget_roles(fields=changed & self.ROLE_FIELDS)
+
+    @commands.Cog.listener()
+    async def on_guild_settings_changed(
+        self, guild_id: int, _old: object, _new: object, changed: FrozenSet[str]
+    ) -> None:
+        if changed & self.ROLE_FIELDS:
+            self._forget_roles(guild_id, changed & self.ROLE_FIELDS)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self._forget_roles(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        if before.name != after.name:
+            self._forget_roles(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self._forget_roles(role.guild.id)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
+        if not self.bot.guild_settings.serves(member.guild.id):
+            return
         try:
-            new_invites = await member.guild.invites()
-            for new_invite in new_invites:
-                old_invite = self._find_invite(self.invites.get(member.guild.id, []), new_invite.code)
-                if old_invite and new_invite.uses > old_invite.uses:
-                    if new_invite.code == self.bot.settings.invite_code_for_bot_booster:
-                        role = discord.utils.get(member.guild.roles, name=self.bot.settings.role_bot_booster)
-                        if role:
-                            await member.add_roles(role, reason="Использовал приглашение для бустеров")
-                            channel = self.bot.get_channel(self.bot.settings.boost_report_channel_id)
-                            if isinstance(channel, discord.TextChannel):
-                                now = discord.utils.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-                                await channel.send(f"{member.mention}, {now}")
-                        break
-            self.invites[member.guild.id] = new_invites
+            known = self.invites.get(member.guild.id, {})
+            current = self._index_invites(await member.guild.invites())
+            code = self.bot.guild_settings.get(member.guild.id).invite_code_for_bot_booster
+            if code in known and current.get(code, 0) > known[code]:
+                role = self._setting_role(member.guild, "role_bot_booster")
+                if role:
+                    await member.add_roles(role, reason="Использовал приглашение для бустеров")
+                    channel = self._get_report_channel(member.guild)
+                    if channel:
+                        now = discord.utils.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+                        await channel.send(f"{member.mention}, {now}")
+            self.invites[member.guild.id] = current
         except Exception:
             await notify_admin(
                 self.bot,
@@ -81,15 +185,15 @@ class BoostersCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
-        if not self.auto_report_boosters:
+        if not self.auto_report_boosters or not self.bot.guild_settings.serves(after.guild.id):
             return
         try:
-            channel = self.bot.get_channel(self.bot.settings.boost_report_channel_id)
-            if not isinstance(channel, discord.TextChannel):
+            channel = self._get_report_channel(after.guild)
+            if not channel:
                 return
 
-            booster_role = discord.utils.get(after.guild.roles, name=self.bot.settings.role_server_booster)
-            bot_booster_role = discord.utils.get(after.guild.roles, name=self.bot.settings.role_bot_booster)
+            booster_role = self._setting_role(after.guild, "role_server_booster")
+            bot_booster_role = self._setting_role(after.guild, "role_bot_booster")
 
             if booster_role in before.roles and booster_role not in after.roles:
                 if bot_booster_role in after.roles:
@@ -100,15 +204,16 @@ class BoostersCog(commands.Cog):
                 f"Error in on_member_update:\n{traceback.format_exc()}",
             )
 
-    def _get_report_channel(self) -> Optional[discord.TextChannel]:
-        channel = self.bot.get_channel(self.bot.settings.boost_report_channel_id)
+    def _get_report_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
+        """The guild's own report channel; reports never cross into another guild."""
+        channel = guild.get_channel(self.bot.guild_settings.get(guild.id).boost_report_channel_id)
         return channel if isinstance(channel, discord.TextChannel) else None
 
     @app_commands.command(
         name="kick_expired_boosters",
         description="Удалить из гильдии пользователей с 'Бот Бустер', которые больше не бустят",
     )
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def kick_expired_boosters(self, interaction: discord.Interaction) -> None:
         if not self._has_moderator_privileges(interaction):
             await interaction.response.send_message(
@@ -121,11 +226,11 @@ class BoostersCog(commands.Cog):
                 await interaction.response.send_message("Команда доступна только на сервере.", ephemeral=True)
                 return
 
-            booster_role = discord.utils.get(guild.roles, name=self.bot.settings.role_server_booster)
-            bot_booster_role = discord.utils.get(guild.roles, name=self.bot.settings.role_bot_booster)
+            booster_role = self._setting_role(guild, "role_server_booster")
+            bot_booster_role = self._setting_role(guild, "role_bot_booster")
             if not bot_booster_role:
                 await interaction.response.send_message(
-                    f"Роль '{self.bot.settings.role_bot_booster}' не найдена.", ephemeral=True
+                    f"Роль '{self.bot.guild_settings.get(guild.id).role_bot_booster}' не найдена.", ephemeral=True
                 )
                 return
 
@@ -145,7 +250,7 @@ class BoostersCog(commands.Cog):
                 "Удалены за прекращение буста: " + ", ".join(kicked_users)
             ) if kicked_users else "Удалений нет: все бустеры актуальны."
 
-            channel = self._get_report_channel()
+            channel = self._get_report_channel(guild)
             if channel:
                 await channel.send(message)
                 await interaction.response.send_message(
@@ -165,7 +270,7 @@ class BoostersCog(commands.Cog):
         name="report_expired_boosters",
         description="Список пользователей с 'Бот Бустер', которые больше не бустят",
     )
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def report_expired_boosters(self, interaction: discord.Interaction) -> None:
         if not self._has_moderator_privileges(interaction):
             await interaction.response.send_message(
@@ -178,23 +283,20 @@ class BoostersCog(commands.Cog):
                 await interaction.response.send_message("Команда доступна только на сервере.", ephemeral=True)
                 return
 
-            channel = self._get_report_channel()
+            channel = self._get_report_channel(guild)
             if not channel:
                 await interaction.response.send_message("Канал для отчётов не найден.", ephemeral=True)
                 return
 
-            booster_role = discord.utils.get(guild.roles, name=self.bot.settings.role_server_booster)
-            bot_booster_role = discord.utils.get(guild.roles, name=self.bot.settings.role_bot_booster)
-            if not bot_booster_role:
+            expired = self._expired_boosters(guild)
+            if expired is None:
                 await interaction.response.send_message(
-                    f"Роль '{self.bot.settings.role_bot_booster}' не найдена.", ephemeral=True
+                    f"Роль '{self.bot.guild_settings.get(guild.id).role_bot_booster}' не найдена.", ephemeral=True
                 )
                 return
 
             lines = ["Пользователи, которые, возможно, перестали бустить сервер:"]
-            for member in bot_booster_role.members:
-                if not booster_role or booster_role not in member.roles:
-                    lines.append(member.display_name)
+            lines.extend(member.display_name for member in expired)
 
             message = "\n".join(lines)
             if len(message) > 2000:
@@ -211,7 +313,7 @@ class BoostersCog(commands.Cog):
                 await interaction.response.send_message("Произошла ошибка при формировании отчёта.", ephemeral=True)
 
     @app_commands.command(name="toggle_auto_report", description="Включить/выключить авто-репорты бустеров")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def toggle_auto_report(self, interaction: discord.Interaction) -> None:
         if not self._has_moderator_privileges(interaction):
             await interaction.response.send_message(
@@ -219,7 +321,9 @@ class BoostersCog(commands.Cog):
             )
             return
         try:
-            self.auto_report_boosters = not self.auto_report_boosters
+            self._set_auto_report(not self.auto_report_boosters)
+            if self.bot.cluster is not None:
+                await self.bot.cluster.send("auto_report", {"enabled": self.auto_report_boosters}, target=BROADCAST)
             state = "включена" if self.auto_report_boosters else "выключена"
             await interaction.response.send_message(
                 f"Автоматическая отправка отчётов теперь {state}.", ephemeral=True
@@ -234,3 +338,7 @@ class BoostersCog(commands.Cog):
                     "Произошла ошибка при переключении автопроверки.",
                     ephemeral=True,
                 )
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(BoostersCog(bot))
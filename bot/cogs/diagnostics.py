@@ -0,0 +1,382 @@
+"""Admin-only runtime diagnostics."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import traceback
+from pathlib import Path
+import tracemalloc
+from typing import List, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.breaker import user_destination
+from bot.cluster import BROADCAST, format_shard_health, local_shard_health
+from bot.command_sync import SyncResult, sync_all_guilds
+from bot.memory import MemoryTracker, cog_containers, discord_caches, format_memory_report
+from bot.profiling import ProfileSession
+from bot.utils import notify_admin
+from config import CLUSTER_HEARTBEAT_SECONDS, GUILD_IDS, PROFILE_DIR
+
+MAX_PROFILE_SECONDS = 600
+SUMMARY_LIMIT = 1800
+
+
+class DiagnosticsCog(commands.Cog):
+    """Commands for inspecting the running bot without a restart."""
+
+    HANDOFF_ATTRS = ("memory",)
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.profile_session: Optional[ProfileSession] = None
+        self.memory = MemoryTracker()
+
+    async def cog_unload(self) -> None:
+        if self.profile_session is not None and not self.profile_session.finished:
+            await self.profile_session.cancel()
+        self.profile_session = None
+
+    def _is_admin(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.bot.settings.admin_user_id
+
+    def _profile_targets(self) -> List[str]:
+        names = {cmd.qualified_name for cmd in self.bot.tree.walk_commands()}
+        for guild in self.bot.guilds:
+            names.update(cmd.qualified_name for cmd in self.bot.tree.walk_commands(guild=guild))
+        names.update(cmd.qualified_name for cmd in self.bot.walk_commands())
+        names.update(self.bot.extra_events)
+        return sorted(names)
+
+    def _format_report(self, session: ProfileSession, top: int) -> str:
+        what = f"`{session.target}` ({session.invocations} вызовов)" if session.target else "весь цикл событий"
+        summary = session.summary(top)
+        if len(summary) > SUMMARY_LIMIT:
+            summary = summary[:SUMMARY_LIMIT] + "\n…"
+        return f"📈 Профиль ({session.mode}): {what}\n```\n{summary}\n```"
+
+    def _report_file(self, session: ProfileSession) -> Optional[discord.File]:
+        if session.output_path is None or not session.output_path.exists():
+            return None
+        return discord.File(str(session.output_path), filename=session.output_path.name)
+
+    @app_commands.command(name="profile", description="Профилировать команду/слушатель или цикл событий (админ)")
+    @app_commands.describe(
+        target="Команда или событие (например, tmdb или on_member_join); пусто — весь цикл событий",
+        mode="Детерминированный (cProfile) или выборочный профиль",
+        count="Сколько следующих вызовов профилировать",
+        seconds="Длительность окна, если цель не указана",
+        top="Сколько строк показать в сводке",
+        cancel="Остановить текущее профилирование",
+    )
+    @app_commands.choices(
+        mode=[
+            app_commands.Choice(name="Детерминированный", value="deterministic"),
+            app_commands.Choice(name="Выборочный", value="sampling"),
+        ]
+    )
+    @app_commands.guilds(*GUILD_IDS)
+    async def profile(
+        self,
+        interaction: discord.Interaction,
+        target: Optional[str] = None,
+        mode: Optional[app_commands.Choice[str]] = None,
+        count: app_commands.Range[int, 1, 100] = 1,
+        seconds: app_commands.Range[int, 1, MAX_PROFILE_SECONDS] = 30,
+        top: app_commands.Range[int, 5, 40] = 15,
+        cancel: bool = False,
+    ) -> None:
+        if not self._is_admin(interaction):
+            await interaction.response.send_message("Команда доступна только администратору.", ephemeral=True)
+            return
+        try:
+            active = self.profile_session
+            if cancel:
+                if active is None or active.finished:
+                    await interaction.response.send_message("Профилирование не запущено.", ephemeral=True)
+                else:
+                    await active.cancel()
+                    await interaction.response.send_message("Профилирование остановлено.", ephemeral=True)
+                return
+            if active is not None and not active.finished:
+                what = f"`{active.target}`" if active.target else "цикла событий"
+                await interaction.response.send_message(
+                    f"Уже идёт профилирование {what}. Остановите его параметром `cancel`.", ephemeral=True
+                )
+                return
+
+            mode_value = mode.value if mode else "deterministic"
+            if target:
+                await self._profile_target(interaction, target, mode_value, count, top)
+            else:
+                await self._profile_window(interaction, mode_value, seconds, top)
+        except Exception as exc:
+            await notify_admin(self.bot, f"Error in /profile: {exc}\n{traceback.format_exc()}")
+            try:
+                if interaction.response.is_done():
+                    await interaction.followup.send("Ошибка при профилировании.", ephemeral=True)
+                else:
+                    await interaction.response.send_message("Ошибка при профилировании.", ephemeral=True)
+            except Exception:
+                pass
+
+    async def _profile_target(
+        self, interaction: discord.Interaction, target: str, mode: str, count: int, top: int
+    ) -> None:
+        async def deliver(session: ProfileSession) -> None:
+            try:
+                admin_dm = await self.bot.entities.admin_dm()
+                if admin_dm is None:
+                    return
+                report_file = self._report_file(session)
+                await admin_dm.send(self._format_report(session, top), file=report_file or discord.utils.MISSING)
+            except Exception as exc:
+                await notify_admin(self.bot, f"Error delivering profile: {exc}\n{traceback.format_exc()}")
+
+        session = ProfileSession(
+            self.bot, target=target, mode=mode, count=count, output_dir=Path(PROFILE_DIR), on_complete=deliver
+        )
+        wrapped = session.attach()
+        if not wrapped:
+            await session.cancel()
+            await interaction.response.send_message(f"Команда или событие `{target}` не найдены.", ephemeral=True)
+            return
+        self.profile_session = session
+        await interaction.response.send_message(
+            f"Профилирую следующие {count} вызовов `{target}` ({wrapped} обработчиков). "
+            "Результат придёт в ЛС.",
+            ephemeral=True,
+        )
+
+    async def _profile_window(self, interaction: discord.Interaction, mode: str, seconds: int, top: int) -> None:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        async def deliver(session: ProfileSession) -> None:
+            report_file = self._report_file(session)
+            await interaction.followup.send(
+                self._format_report(session, top), file=report_file or discord.utils.MISSING, ephemeral=True
+            )
+
+        session = ProfileSession(
+            self.bot, target=None, mode=mode, count=1, output_dir=Path(PROFILE_DIR), on_complete=deliver
+        )
+        self.profile_session = session
+        await session.run_window(seconds)
+        if session.output_path is None:
+            await interaction.followup.send("Профилирование остановлено.", ephemeral=True)
+
+    @profile.autocomplete("target")
+    async def profile_target_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        current = current.lower()
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in self._profile_targets()
+            if current in name.lower()
+        ][:25]
+
+    @app_commands.command(name="reload", description="Перезагрузить код кога без переподключения к Discord (админ)")
+    @app_commands.describe(cog="Имя кога из манифеста")
+    @app_commands.guilds(*GUILD_IDS)
+    async def reload_cog(self, interaction: discord.Interaction, cog: str) -> None:
+        if not self._is_admin(interaction):
+            await interaction.response.send_message("Команда доступна только администратору.", ephemeral=True)
+            return
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            try:
+                spec = await self.bot.reload_cog(cog)
+            except commands.ExtensionNotLoaded:
+                loaded = ", ".join(spec.name for spec in self.bot.cog_specs)
+                await interaction.followup.send(f"Ког `{cog}` не загружен. Доступны: {loaded}.", ephemeral=True)
+                return
+            except commands.ExtensionError as exc:
+                cause = exc.__cause__ or exc
+                await interaction.followup.send(
+                    f"Не удалось перезагрузить `{cog}`, оставлена прежняя версия:\n```\n{cause!r}\n```",
+                    ephemeral=True,
+                )
+                return
+
+            cluster = self.bot.cluster
+            if cluster is not None:
+                await cluster.send("reload", {"cog": spec.name}, target=BROADCAST)
+
+            results = await sync_all_guilds(self.bot, GUILD_IDS)
+            failed = [str(guild_id) for guild_id, result in results.items() if isinstance(result, Exception)]
+            synced = sum(1 for result in results.values() if isinstance(result, SyncResult) and not result.skipped)
+            if failed:
+                sync_note = f"синхронизация не удалась для гильдий {', '.join(failed)}"
+            elif synced:
+                sync_note = f"слэш-команды синхронизированы ({synced} гильдий)"
+            else:
+                sync_note = "команды не изменились"
+            if cluster is not None and cluster.info.size > 1:
+                sync_note += "; остальные процессы кластера перезагрузят его в течение секунды"
+            await interaction.followup.send(f"♻️ Ког `{spec.name}` перезагружен, {sync_note}.", ephemeral=True)
+        except Exception as exc:
+            await notify_admin(self.bot, f"Error in /reload: {exc}\n{traceback.format_exc()}")
+            try:
+                if interaction.response.is_done():
+                    await interaction.followup.send("Ошибка при перезагрузке кога.", ephemeral=True)
+                else:
+                    await interaction.response.send_message("Ошибка при перезагрузке кога.", ephemeral=True)
+            except Exception:
+                pass
+
+    @reload_cog.autocomplete("cog")
+    async def reload_cog_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=spec.name, value=spec.name)
+            for spec in self.bot.cog_specs
+            if current.lower() in spec.name
+        ][:25]
+
+    @app_commands.command(name="memory", description="Снимок памяти: рост по местам выделения и размеры кэшей (админ)")
+    @app_commands.describe(
+        action="Снимок и сравнение, запуск или остановка tracemalloc",
+        baseline="Сравнивать с первым снимком, а не с предыдущим",
+        top="Сколько мест выделения показать",
+        frames="Глубина стека tracemalloc при запуске",
+    )
+    @app_commands.choices(
+        action=[
+            app_commands.Choice(name="Снимок", value="snapshot"),
+            app_commands.Choice(name="Запустить tracemalloc", value="start"),
+            app_commands.Choice(name="Остановить tracemalloc", value="stop"),
+        ]
+    )
+    @app_commands.guilds(*GUILD_IDS)
+    async def memory_report(
+        self,
+        interaction: discord.Interaction,
+        action: Optional[app_commands.Choice[str]] = None,
+        baseline: bool = False,
+        top: app_commands.Range[int, 5, 50] = 15,
+        frames: app_commands.Range[int, 1, 25] = 1,
+    ) -> None:
+        if not self._is_admin(interaction):
+            await interaction.response.send_message("Команда доступна только администратору.", ephemeral=True)
+            return
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            action_value = action.value if action else "snapshot"
+
+            if action_value == "stop":
+                self.memory.stop()
+                await interaction.followup.send("tracemalloc остановлен, снимки удалены.", ephemeral=True)
+                return
+            if action_value == "start":
+                await asyncio.to_thread(self.memory.start, frames)
+                await interaction.followup.send(
+                    f"tracemalloc запущен (глубина {frames}), базовый снимок сохранён.", ephemeral=True
+                )
+                return
+
+            sites = []
+            traced = None
+            if self.memory.tracing:
+                sites = await asyncio.to_thread(self.memory.snapshot_diff, top, against_baseline=baseline)
+                traced = tracemalloc.get_traced_memory()
+            containers = cog_containers(self.bot) + discord_caches(self.bot)
+            deltas = self.memory.container_deltas(containers)
+            report = format_memory_report(sites, containers, deltas, traced)
+
+            header = "🧠 Память"
+            if not self.memory.tracing:
+                header += " (tracemalloc выключен — запустите `action: start`, чтобы видеть места выделения)"
+            header += f"\n{self.bot.entities.stats_line()}"
+            header += f"\n{self.bot.attachments.stats_line()}"
+            header += f"\n{self.bot.breaker.stats_line()}"
+            header += f"\n{self.bot.scheduler.stats_line()}"
+            header += f"\n{self.bot.store.stats_line()}"
+            body = report if len(report) <= SUMMARY_LIMIT else report[:SUMMARY_LIMIT] + "\n…"
+            await interaction.followup.send(
+                f"{header}\n```\n{body}\n```",
+                file=discord.File(io.BytesIO(report.encode("utf-8")), filename="memory-report.txt"),
+                ephemeral=True,
+            )
+        except Exception as exc:
+            await notify_admin(self.bot, f"Error in /memory: {exc}\n{traceback.format_exc()}")
+            try:
+                if interaction.response.is_done():
+                    await interaction.followup.send("Ошибка при снятии отчёта о памяти.", ephemeral=True)
+                else:
+                    await interaction.response.send_message("Ошибка при снятии отчёта о памяти.", ephemeral=True)
+            except Exception:
+                pass
+
+    @app_commands.command(name="shards", description="Состояние шардов и процессов кластера: пинг, гильдии, задержка цикла (админ)")
+    @app_commands.guilds(*GUILD_IDS)
+    async def shards_report(self, interaction: discord.Interaction) -> None:
+        if not self._is_admin(interaction):
+            await interaction.response.send_message("Команда доступна только администратору.", ephemeral=True)
+            return
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            cluster = self.bot.cluster
+            if cluster is None:
+                rows = local_shard_health(self.bot)
+                header = f"🧩 Один процесс, шардов: {self.bot.shard_count or len(rows)}"
+            else:
+                rows = await cluster.health()
+                info = cluster.info
+                header = (
+                    f"🧩 Кластер: {info.size} процессов, {info.shard_count} шардов; "
+                    f"этот процесс {info.cluster_id} (шарды {info.shard_ids[0]}–{info.shard_ids[-1]}"
+                    f"{', основной' if info.primary else ''}); "
+                    f"сообщений отправлено {cluster.sent}, получено {cluster.received}"
+                )
+            lines = format_shard_health(rows, stale_after=3 * CLUSTER_HEARTBEAT_SECONDS) or ["Шарды ещё не подключены."]
+            report = "\n".join(lines)
+            body = report if len(report) <= SUMMARY_LIMIT else report[:SUMMARY_LIMIT] + "\n…"
+            await interaction.followup.send(f"{header}\n```\n{body}\n```", ephemeral=True)
+        except Exception as exc:
+            await notify_admin(self.bot, f"Error in /shards: {exc}\n{traceback.format_exc()}")
+            try:
+                if interaction.response.is_done():
+                    await interaction.followup.send("Ошибка при получении состояния шардов.", ephemeral=True)
+                else:
+                    await interaction.response.send_message("Ошибка при получении состояния шардов.", ephemeral=True)
+            except Exception:
+                pass
+
+    @app_commands.command(name="breakers", description="Открытые предохранители отправки ЛС и их сброс (админ)")
+    @app_commands.describe(reset_user="Сбросить предохранитель для пользователя", reset_all="Сбросить все предохранители")
+    @app_commands.guilds(*GUILD_IDS)
+    async def breakers_report(
+        self,
+        interaction: discord.Interaction,
+        reset_user: Optional[discord.User] = None,
+        reset_all: bool = False,
+    ) -> None:
+        if not self._is_admin(interaction):
+            await interaction.response.send_message("Команда доступна только администратору.", ephemeral=True)
+            return
+        try:
+            breaker = self.bot.breaker
+            notes = []
+            if reset_all:
+                notes.append(f"Сброшено предохранителей: {breaker.reset()}.")
+            elif reset_user is not None:
+                closed = breaker.reset(user_destination(reset_user.id))
+                notes.append(f"Сброшено предохранителей для {reset_user.mention}: {closed}.")
+            lines = breaker.format_circuits() or ["Открытых предохранителей нет."]
+            report = "\n".join(lines)
+            body = report if len(report) <= SUMMARY_LIMIT else report[:SUMMARY_LIMIT] + "\n…"
+            header = "\n".join([f"🔌 {breaker.stats_line()}", *notes])
+            await interaction.response.send_message(f"{header}\n```\n{body}\n```", ephemeral=True)
+        except Exception as exc:
+            await notify_admin(self.bot, f"Error in /breakers: {exc}\n{traceback.format_exc()}")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("Ошибка при получении состояния предохранителей.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(DiagnosticsCog(bot))
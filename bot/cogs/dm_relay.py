@@ -2,16 +2,20 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import partial
 import traceback
-from typing import Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from bot.utils import notify_admin
-from config import GUILD_ID
+from bot.breaker import CircuitOpen, send_guard, user_destination
+from bot.media import files_from_bytes
+from bot.tickets import ForumTickets
+from bot.utils import append_error_log, notify_admin
+from config import DM_FORUM_CHANNEL_ID, DM_FORUM_THREADS_PER_MINUTE, DM_TICKET_EXPIRY_DAYS, GUILD_IDS
 
 
 def _to_base36(n: int) -> str:
@@ -29,12 +33,86 @@ def _to_base36(n: int) -> str:
 
 
 class DmRelayCog(commands.Cog):
+    EXPIRY_TIMER = "dm.ticket_expiry"
+
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        self.dm_ticket_map: Dict[str, int] = {}
-        self.dm_user_ticket: Dict[int, str] = {}
-        self.dm_last_seen: Dict[int, datetime] = {}
-        self.dm_forward_map: Dict[int, int] = {}
+        store = bot.store
+        self.dm_ticket_map: Dict[str, int] = store.table("dm_relay.ticket_map", str, int)
+        self.dm_user_ticket: Dict[int, str] = store.table("dm_relay.user_ticket", int, str)
+        self.dm_last_seen: Dict[int, datetime] = store.table("dm_relay.last_seen", int, datetime)
+        self.dm_forward_map: Dict[int, int] = store.table("dm_relay.forward_map", int, int)
+        # user_id -> forwarded message IDs, so expiry does not scan every forward.
+        self._forwards_by_user: Dict[int, Set[int]] = {}
+        for message_id, user_id in self.dm_forward_map.items():
+            self._forwards_by_user.setdefault(user_id, set()).add(message_id)
+        self.ticket_ttl = timedelta(days=DM_TICKET_EXPIRY_DAYS)
+        # Forum mode: tickets go to threads in a staff forum instead of the admin's DMs.
+        self.forum: Optional[ForumTickets] = (
+            ForumTickets(bot, DM_FORUM_CHANNEL_ID, budget=DM_FORUM_THREADS_PER_MINUTE)
+            if DM_FORUM_CHANNEL_ID else None
+        )
+
+    @property
+    def _owns_tickets(self) -> bool:
+        # The ticket tables and their expiry timers belong to the primary worker,
+        # which receives every DM; other workers only read them.
+        cluster = self.bot.cluster
+        return cluster is None or cluster.info.primary
+
+    async def cog_load(self) -> None:
+        if not self._owns_tickets:
+            return
+        cluster = self.bot.cluster
+        if cluster is not None:
+            cluster.on("dm", self._on_cluster_dm)
+            cluster.on("forum_reply", self._on_cluster_forum_reply)
+        self.bot.scheduler.on(self.EXPIRY_TIMER, self._expire_ticket)
+        if self.ticket_ttl:
+            # Tickets from before expiry was enabled get their timer now.
+            now = datetime.now()
+            for user_id, last_seen in self.dm_last_seen.items():
+                if self.bot.scheduler.pending(f"{self.EXPIRY_TIMER}:{user_id}") is None:
+                    self._schedule_expiry(user_id, (last_seen + self.ticket_ttl - now).total_seconds())
+
+    async def cog_unload(self) -> None:
+        if self.bot.cluster is not None:
+            self.bot.cluster.off("dm")
+            self.bot.cluster.off("forum_reply")
+        self.bot.scheduler.off(self.EXPIRY_TIMER)
+        if self.forum is not None:
+            await self.forum.close()
+
+    def health_status(self) -> Dict[str, Any]:
+        """Ticket counts and forum thread creation for the health endpoint."""
+        status: Dict[str, Any] = {"tickets": len(self.dm_ticket_map)}
+        if self.forum is not None:
+            status["forum"] = self.forum.status()
+        return status
+
+    def _schedule_expiry(self, user_id: int, delay: float) -> None:
+        self.bot.scheduler.schedule(
+            self.EXPIRY_TIMER, f"{self.EXPIRY_TIMER}:{user_id}", delay, {"user_id": user_id}, persist=True
+        )
+
+    async def _expire_ticket(self, payload: Dict[str, Any]) -> None:
+        """Forget a user's ticket after DM_TICKET_EXPIRY_DAYS without messages from them."""
+        user_id = payload["user_id"]
+        last_seen = self.dm_last_seen.get(user_id)
+        if not self.ticket_ttl or last_seen is None:
+            return
+        remaining = (last_seen + self.ticket_ttl - datetime.now()).total_seconds()
+        if remaining > 0:
+            self._schedule_expiry(user_id, remaining)
+            return
+        ticket = self.dm_user_ticket.pop(user_id, None)
+        if ticket is not None and self.dm_ticket_map.get(ticket) == user_id:
+            del self.dm_ticket_map[ticket]
+            if self.forum is not None:
+                self.forum.forget(ticket)
+        self.dm_last_seen.pop(user_id, None)
+        for message_id in self._forwards_by_user.pop(user_id, ()):
+            self.dm_forward_map.pop(message_id, None)
 
     def _get_or_make_ticket(self, user_id: int) -> str:
         if user_id in self.dm_user_ticket:
@@ -49,14 +127,190 @@ class DmRelayCog(commands.Cog):
         self.dm_ticket_map[ticket] = user_id
         return ticket
 
-    async def _dm_admin(self) -> Optional[discord.User]:
-        admin = self.bot.get_user(self.bot.settings.admin_user_id)
-        if admin is None:
+    async def _dm_admin(self) -> Optional[discord.DMChannel]:
+        try:
+            return await self.bot.entities.admin_dm()
+        except Exception:
+            return None
+
+    async def _send_dm(self, target: str, text: str, files: Optional[List[discord.File]]) -> str:
+        """Deliver a /dm message; returns the reply for the admin."""
+        target = target.strip().upper()
+        if target.isdigit() and len(target) >= 15:
+            user_id = int(target)
+        else:
+            user_id = self.dm_ticket_map.get(target)
+
+        if not user_id:
+            return "Не найден получатель: неверный ticket или user_id."
+
+        user = await self.bot.entities.user(user_id)
+        if not user:
+            return "Не удалось получить пользователя по указанной цели."
+
+        try:
+            async with send_guard(self.bot, user_destination(user_id)):
+                await user.send(text, files=files)
+        except CircuitOpen as exc:
+            return f"⛔ {exc.notice()}"
+        ticket = self._get_or_make_ticket(user_id)
+        return f"✅ Отправлено в ЛС пользователю **{user}** (ID `{user_id}`) — Ticket `#{ticket}`"
+
+    async def _on_cluster_dm(self, _sender: int, payload: Dict[str, Any]) -> None:
+        followup = discord.Webhook.from_state(
+            {"id": payload["application_id"], "type": 3, "token": payload["token"]},
+            self.bot._connection,
+        )
+        try:
+            files = None
+            if payload.get("attachment"):
+                try:
+                    files = await self._cdn_files(
+                        [(payload["attachment_id"], payload["attachment"], payload.get("filename") or "attachment")]
+                    )
+                except Exception:
+                    await notify_admin(self.bot, f"/dm: failed to fetch attachment:\n{traceback.format_exc()}")
+            await followup.send(await self._send_dm(payload["target"], payload["text"], files), ephemeral=True)
+        except Exception:
+            await notify_admin(self.bot, f"/dm (forwarded) error:\n{traceback.format_exc()}")
+            try:
+                await followup.send("Произошла ошибка при отправке ЛС.", ephemeral=True)
+            except Exception:
+                pass
+
+    async def _on_cluster_forum_reply(self, _sender: int, payload: Dict[str, Any]) -> None:
+        channel_id = payload["channel_id"]
+        message = self.bot.get_partial_messageable(channel_id).get_partial_message(payload["message_id"])
+        try:
+            files = partial(self._cdn_files, payload["attachments"])
+            await self._forum_reply(message, channel_id, payload["content"], files)
+        except Exception:
+            await notify_admin(self.bot, f"Forum reply relay (forwarded) failed:\n{traceback.format_exc()}")
+
+    async def _cdn_files(self, attachments: List[Tuple[int, str, str]]) -> List[discord.File]:
+        """Files for attachments another worker saw, by ID, CDN URL and filename."""
+        items = []
+        for attachment_id, url, filename in attachments:
+            download = partial(self.bot.http.get_from_cdn, url)
+            data = await self.bot.attachments.fetch(("attachment", attachment_id), download)
+            items.append((filename, data))
+        return files_from_bytes(items)
+
+    async def _attachment_files(self, message: discord.Message) -> List[discord.File]:
+        return files_from_bytes([await self.bot.attachments.attachment(att) for att in message.attachments[:10]])
+
+    async def _forum_reply(
+        self,
+        message: Union[discord.Message, discord.PartialMessage],
+        thread_id: int,
+        content: str,
+        files: Callable[[], Awaitable[List[discord.File]]],
+    ) -> None:
+        assert self.forum is not None
+        ticket = self.forum.ticket_for(thread_id)
+        user_id = self.dm_ticket_map.get(ticket) if ticket is not None else None
+        if user_id is None:
+            # Not a ticket thread, or the ticket has expired.
+            await message.add_reaction("⛔")
+            return
+        await self._deliver_reply(message, user_id, content, files)
+
+    async def _deliver_reply(
+        self,
+        message: Union[discord.Message, discord.PartialMessage],
+        user_id: int,
+        content: str,
+        files: Callable[[], Awaitable[List[discord.File]]],
+    ) -> None:
+        """Send a staff reply to the ticket's user and react on the reply with the outcome."""
+        try:
+            loaded = await files()
+            content = content.strip()
+            if not content and not loaded:
+                await message.add_reaction("⛔")
+                return
+
+            user = await self.bot.entities.user(user_id)
+            if user is None:
+                await message.add_reaction("⛔")
+                return
+            async with send_guard(self.bot, user_destination(user_id)):
+                await user.send(content or " ", files=loaded if loaded else None)
+            await message.add_reaction("✅")
+        except CircuitOpen as exc:
+            await message.add_reaction("⛔")
+            await message.reply(exc.notice(), mention_author=False)
+        except Exception:
+            await notify_admin(self.bot, f"Reply DM relay failed:\n{traceback.format_exc()}")
+            try:
+                await message.add_reaction("⚠️")
+            except Exception:
+                pass
+
+    async def _on_forum_message(self, message: discord.Message, content: str) -> None:
+        """A staff reply in a ticket thread; relayed by the primary worker, which owns the tickets."""
+        cluster = self.bot.cluster
+        if cluster is not None and not cluster.info.primary:
+            await cluster.send(
+                "forum_reply",
+                {
+                    "channel_id": message.channel.id,
+                    "message_id": message.id,
+                    "content": content,
+                    "attachments": [(att.id, att.url, att.filename) for att in message.attachments[:10]],
+                },
+            )
+            return
+        files = partial(self._attachment_files, message)
+        await self._forum_reply(message, message.channel.id, content, files)
+
+    async def _is_command(self, message: discord.Message) -> bool:
+        prefix = await self.bot.get_prefix(message)
+        return (message.content or "").startswith(tuple(prefix) if isinstance(prefix, list) else prefix)
+
+    async def _forward(self, message: discord.Message, ticket: str) -> None:
+        """Pass a user's DM on to staff: the ticket's forum thread when enabled, else the admin's DMs."""
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        header = (
+            f"📨 **DM #{ticket}**\n"
+            f"От: **{message.author}** (`{message.author.id}`)\n"
+            f"Время: {ts}\n"
+            f"------"
+        )
+        content = message.content.strip() if message.content else "*— без текста —*"
+
+        attachments: List[Tuple[str, bytes]] = []
+        try:
+            for att in message.attachments[:10]:
+                attachments.append(await self.bot.attachments.attachment(att))
+        except Exception:
+            await notify_admin(self.bot, f"Attachment fetch failed:\n{traceback.format_exc()}")
+
+        if self.forum is not None:
             try:
-                admin = await self.bot.fetch_user(self.bot.settings.admin_user_id)
+                await self.forum.post(ticket, f"#{ticket} · {message.author}", f"{header}\n{content}", attachments)
+                return
             except Exception:
-                admin = None
-        return admin
+                # Falls back to the admin's DMs so the message is not lost.
+                await notify_admin(self.bot, f"Failed to post DM #{ticket} to the forum:\n{traceback.format_exc()}")
+
+        admin = await self._dm_admin()
+        if not admin:
+            return
+        try:
+            async with send_guard(self.bot, user_destination(self.bot.settings.admin_user_id)):
+                forwarded = await admin.send(f"{header}\n{content}", files=files_from_bytes(attachments) or None)
+            self.dm_forward_map[forwarded.id] = message.author.id
+            self._forwards_by_user.setdefault(message.author.id, set()).add(forwarded.id)
+        except CircuitOpen:
+            # The admin's DMs are closed, so an alert would be short-circuited too; keep the DM in the log.
+            names = ", ".join(name for name, _ in attachments)
+            append_error_log(
+                f"DM #{ticket} not forwarded, admin circuit open:\n{header}\n{content}"
+                + (f"\nAttachments: {names}" if names else "")
+            )
+        except Exception:
+            await notify_admin(self.bot, f"Failed to forward DM to admin:\n{traceback.format_exc()}")
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
@@ -64,6 +318,15 @@ class DmRelayCog(commands.Cog):
             return
 
         if message.guild is not None:
+            if self.forum is not None and self.forum.is_ticket_thread(message.channel):
+                # Commands and staff-only discussion stay in the thread.
+                content = None if await self._is_command(message) else self.forum.reply_text(message)
+                if content is not None:
+                    try:
+                        await self._on_forum_message(message, content)
+                    except Exception:
+                        await notify_admin(self.bot, f"Forum reply relay failed:\n{traceback.format_exc()}")
+                    return
             await self.bot.process_commands(message)
             return
 
@@ -82,54 +345,18 @@ class DmRelayCog(commands.Cog):
                             pass
 
                     if user_id:
-                        try:
-                            files = [await att.to_file() for att in message.attachments[:10]]
-                            content = (message.content or "").strip()
-                            if not content and not files:
-                                await message.add_reaction("⛔")
-                                return
-
-                            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
-                            await user.send(content or " ", files=files if files else None)
-                            await message.add_reaction("✅")
-                        except Exception:
-                            await notify_admin(self.bot, f"Reply DM relay failed:\n{traceback.format_exc()}")
-                            try:
-                                await message.add_reaction("⚠️")
-                            except Exception:
-                                pass
-                        finally:
-                            return
+                        files = partial(self._attachment_files, message)
+                        await self._deliver_reply(message, user_id, message.content or "", files)
+                        return
                 await self.bot.process_commands(message)
                 return
 
             ticket = self._get_or_make_ticket(message.author.id)
             self.dm_last_seen[message.author.id] = datetime.now()
+            if self.ticket_ttl and self._owns_tickets:
+                self._schedule_expiry(message.author.id, self.ticket_ttl.total_seconds())
 
-            admin = await self._dm_admin()
-            if admin:
-                ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                header = (
-                    f"📨 **DM #{ticket}**\n"
-                    f"От: **{message.author}** (`{message.author.id}`)\n"
-                    f"Время: {ts}\n"
-                    f"------"
-                )
-                content = message.content.strip() if message.content else "*— без текста —*"
-
-                files = []
-                try:
-                    for att in message.attachments[:10]:
-                        files.append(await att.to_file())
-                except Exception:
-                    await notify_admin(self.bot, f"Attachment fetch failed:\n{traceback.format_exc()}")
-
-                try:
-                    forwarded = await admin.send(f"{header}\n{content}", files=files if files else None)
-                    self.dm_forward_map[forwarded.id] = message.author.id
-                except Exception:
-                    await notify_admin(self.bot, f"Failed to forward DM to admin:\n{traceback.format_exc()}")
-
+            await self._forward(message, ticket)
             await self.bot.process_commands(message)
         except Exception:
             await notify_admin(self.bot, f"on_message error:\n{traceback.format_exc()}")
@@ -147,7 +374,7 @@ class DmRelayCog(commands.Cog):
         text="Текст сообщения",
         attachment="Необязательное вложение (1 файл)",
     )
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def dm_send(
         self,
         interaction: discord.Interaction,
@@ -162,39 +389,31 @@ class DmRelayCog(commands.Cog):
         try:
             await interaction.response.defer(ephemeral=True, thinking=False)
 
-            target = target.strip().upper()
-            if target.isdigit() and len(target) >= 15:
-                user_id = int(target)
-            else:
-                user_id = self.dm_ticket_map.get(target)
-
-            if not user_id:
-                await interaction.followup.send(
-                    "Не найден получатель: неверный ticket или user_id.", ephemeral=True
-                )
-                return
-
-            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
-            if not user:
-                await interaction.followup.send(
-                    "Не удалось получить пользователя по указанной цели.",
-                    ephemeral=True,
+            cluster = self.bot.cluster
+            if cluster is not None and not cluster.info.primary:
+                # Tickets live on the primary worker; it answers through the interaction's webhook.
+                await cluster.send(
+                    "dm",
+                    {
+                        "target": target,
+                        "text": text,
+                        "attachment": attachment.url if attachment is not None else None,
+                        "attachment_id": attachment.id if attachment is not None else None,
+                        "filename": attachment.filename if attachment is not None else None,
+                        "application_id": interaction.application_id,
+                        "token": interaction.token,
+                    },
                 )
                 return
 
             files = None
             if attachment is not None:
                 try:
-                    files = [await attachment.to_file()]
+                    files = files_from_bytes([await self.bot.attachments.attachment(attachment)])
                 except Exception:
                     await notify_admin(self.bot, f"/dm: failed to fetch attachment:\n{traceback.format_exc()}")
 
-            await user.send(text, files=files)
-            ticket = self._get_or_make_ticket(user_id)
-            await interaction.followup.send(
-                f"✅ Отправлено в ЛС пользователю **{user}** (ID `{user_id}`) — Ticket `#{ticket}`",
-                ephemeral=True,
-            )
+            await interaction.followup.send(await self._send_dm(target, text, files), ephemeral=True)
         except Exception:
             await notify_admin(self.bot, f"/dm error:\n{traceback.format_exc()}")
             try:
@@ -209,3 +428,7 @@ class DmRelayCog(commands.Cog):
                     )
             except Exception:
                 pass
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(DmRelayCog(bot))
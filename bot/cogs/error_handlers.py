@@ -61,3 +61,7 @@ class ErrorHandlerCog(commands.Cog):
         )
         print(error_message)
         await notify_admin(self.bot, error_message)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(ErrorHandlerCog(bot))
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import random
 import traceback
 from pathlib import Path
@@ -11,21 +12,29 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from bot.breaker import CircuitOpen, send_guard, user_destination
+from bot.command_sync import sync_guild_commands
+from bot.guild_settings import GUILD_FIELDS, parse_value
+from bot.loopmon import format_lag_summary
+from bot.media import MAX_FILES_PER_MESSAGE, ImageCache, files_from_bytes
 from bot.utils import notify_admin
-from config import GUILD_ID
+from config import GUILD_ID, GUILD_IDS
 
 
 class MiscCog(commands.Cog):
     """General-purpose commands that don't fit elsewhere."""
 
+    HANDOFF_ATTRS = ("tmdb_images",)
+
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.tmdb_images = ImageCache(Path("images"), bot.attachments)
 
     def _is_admin(self, interaction: discord.Interaction) -> bool:
         return interaction.user.id == self.bot.settings.admin_user_id
 
     @app_commands.command(name="фильмы", description="Ссылка на таблицу с фильмами (видно только вам)")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def films(self, interaction: discord.Interaction) -> None:
         try:
             if not isinstance(interaction.user, discord.Member):
@@ -34,7 +43,8 @@ class MiscCog(commands.Cog):
                 )
                 return
 
-            role_name = self.bot.settings.role_movies
+            settings = self.bot.guild_settings.get(interaction.user.guild.id)
+            role_name = settings.role_movies
             role = discord.utils.get(interaction.user.roles, name=role_name)
             if role is None:
                 await interaction.response.send_message(
@@ -43,7 +53,7 @@ class MiscCog(commands.Cog):
                 return
 
             await interaction.response.send_message(
-                f"[Таблица с фильмами]({self.bot.settings.google_sheet_url})",
+                f"[Таблица с фильмами]({settings.google_sheet_url})",
                 ephemeral=True,
             )
         except Exception as exc:
@@ -52,12 +62,13 @@ class MiscCog(commands.Cog):
                 await interaction.response.send_message("Ошибка при обработке команды.", ephemeral=True)
 
     @app_commands.command(name="invite", description="Получить пригласительную ссылку")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def invite(self, interaction: discord.Interaction) -> None:
         try:
+            guild_id = interaction.guild.id if interaction.guild else GUILD_ID
+            code = self.bot.guild_settings.get(guild_id).invite_code_for_bot_booster
             await interaction.response.send_message(
-                "Пригласительная ссылка для ботов: "
-                f"https://discord.gg/{self.bot.settings.invite_code_for_bot_booster}",
+                f"Пригласительная ссылка для ботов: https://discord.gg/{code}",
                 ephemeral=True,
             )
         except Exception as exc:
@@ -66,8 +77,9 @@ class MiscCog(commands.Cog):
                 await interaction.response.send_message("Ошибка при обработке команды.", ephemeral=True)
 
     @app_commands.command(name="sync", description="Синхронизировать слэш-команды для текущей гильдии и показать список")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
-    async def sync_commands(self, interaction: discord.Interaction) -> None:
+    @app_commands.describe(force="Синхронизировать, даже если команды не изменились")
+    @app_commands.guilds(*GUILD_IDS)
+    async def sync_commands(self, interaction: discord.Interaction, force: bool = False) -> None:
         if not self._is_admin(interaction):
             await interaction.response.send_message(
                 "Команда доступна только администратору.", ephemeral=True
@@ -76,9 +88,17 @@ class MiscCog(commands.Cog):
         try:
             await interaction.response.send_message("Синхронизирую слэш-команды…", ephemeral=True)
             guild_id = interaction.guild.id if interaction.guild else GUILD_ID
-            guild_obj = discord.Object(id=guild_id)
-            synced = await self.bot.tree.sync(guild=guild_obj)
-            names = [f"/{cmd.name}" for cmd in synced]
+            result = await sync_guild_commands(self.bot, guild_id, force=force)
+            if result.skipped:
+                names = [f"/{cmd.name}" for cmd in self.bot.tree.get_commands(guild=discord.Object(id=guild_id))]
+                txt = ", ".join(names) if names else "— команд нет"
+                await interaction.followup.send(
+                    f"Команды не изменились (отпечаток `{result.fingerprint[:12]}`), синхронизация пропущена. "
+                    f"Используйте `force`, чтобы синхронизировать принудительно.\n{txt}",
+                    ephemeral=True,
+                )
+                return
+            names = [f"/{cmd.name}" for cmd in result.synced or []]
             txt = ", ".join(names) if names else "— команд нет"
             await interaction.followup.send(f"Готово (гильдия {guild_id}): {txt}", ephemeral=True)
         except Exception as exc:
@@ -86,40 +106,90 @@ class MiscCog(commands.Cog):
             if not interaction.response.is_done():
                 await interaction.response.send_message("Ошибка при синхронизации команд.", ephemeral=True)
 
-    @app_commands.command(name="tmdb", description="Отправить 4 локальных PNG-изображения пользователю в ЛС")
+    @app_commands.command(name="guild_settings", description="Показать или изменить настройки текущего сервера")
+    @app_commands.describe(
+        field="Настройка (не указывать — показать все)",
+        value="Новое значение; для ID канала можно указать упоминание #канала",
+        reset="Вернуть значение по умолчанию из .env",
+    )
+    @app_commands.choices(field=[app_commands.Choice(name=name, value=name) for name in GUILD_FIELDS])
+    @app_commands.guilds(*GUILD_IDS)
+    async def guild_settings_cmd(
+        self,
+        interaction: discord.Interaction,
+        field: Optional[app_commands.Choice[str]] = None,
+        value: Optional[str] = None,
+        reset: bool = False,
+    ) -> None:
+        if not self._is_admin(interaction):
+            await interaction.response.send_message(
+                "Команда доступна только администратору.", ephemeral=True
+            )
+            return
+        if interaction.guild is None:
+            await interaction.response.send_message("Команда доступна только на сервере.", ephemeral=True)
+            return
+        try:
+            index = self.bot.guild_settings
+            guild_id = interaction.guild.id
+            if field is not None and reset:
+                index.reset(guild_id, field.value)
+            elif field is not None and value is not None:
+                try:
+                    index.set(guild_id, field.value, parse_value(field.value, value))
+                except ValueError as exc:
+                    await interaction.response.send_message(f"Некорректное значение: {exc}", ephemeral=True)
+                    return
+            elif reset:
+                index.reset(guild_id)
+
+            settings = index.get(guild_id)
+            overrides = index.overrides(guild_id)
+            lines = [f"⚙️ Настройки сервера {interaction.guild.name} ({guild_id}):"]
+            for name in GUILD_FIELDS:
+                marker = " *(переопределено)*" if name in overrides else ""
+                lines.append(f"• `{name}` = `{getattr(settings, name)}`{marker}")
+            await interaction.response.send_message("\n".join(lines), ephemeral=True)
+        except Exception as exc:
+            await notify_admin(self.bot, f"Error in /guild_settings: {exc}\n{traceback.format_exc()}")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("Ошибка при изменении настроек.", ephemeral=True)
+
+    @app_commands.command(name="tmdb", description="Отправить локальные PNG-изображения (до 10) пользователю в ЛС")
     @app_commands.describe(user="Кому отправить изображения")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def tmdb(self, interaction: discord.Interaction, user: discord.User) -> None:
-        image_dir = Path("images")
-        image_paths = list(image_dir.glob("*.png"))[:4]
         try:
-            await interaction.response.send_message(
-                f"Отправляю {len(image_paths)} изображений пользователю {user.mention} в ЛС…",
-                ephemeral=True,
-            )
+            await interaction.response.defer(ephemeral=True, thinking=True)
 
-            if not image_paths:
+            images = await asyncio.to_thread(self.tmdb_images.load, MAX_FILES_PER_MESSAGE)
+            if not images:
                 await interaction.followup.send("Изображения не найдены.", ephemeral=True)
                 return
 
-            for image_path in image_paths:
-                try:
-                    with image_path.open("rb") as image_file:
-                        file = discord.File(image_file, filename=image_path.name)
-                        await user.send(file=file)
-                except FileNotFoundError:
-                    await interaction.followup.send(
-                        f"Файл {image_path.name} не найден для {user.mention}.", ephemeral=True,
-                    )
-            await interaction.followup.send("Готово: отправлено в ЛС.", ephemeral=True)
+            try:
+                async with send_guard(self.bot, user_destination(user.id)):
+                    await user.send(files=files_from_bytes(images))
+            except CircuitOpen as exc:
+                await interaction.followup.send(f"⛔ {user.mention}: {exc.notice()}", ephemeral=True)
+                return
+            await interaction.followup.send(
+                f"Готово: {len(images)} изображений отправлено пользователю {user.mention} в ЛС.",
+                ephemeral=True,
+            )
         except Exception as exc:
             await notify_admin(self.bot, f"Error in /tmdb: {exc}\n{traceback.format_exc()}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("Произошла ошибка при отправке изображений.", ephemeral=True)
+            try:
+                if interaction.response.is_done():
+                    await interaction.followup.send("Произошла ошибка при отправке изображений.", ephemeral=True)
+                else:
+                    await interaction.response.send_message("Произошла ошибка при отправке изображений.", ephemeral=True)
+            except Exception:
+                pass
 
     @app_commands.command(name="roll", description="Случайное число")
     @app_commands.describe(start="Начало интервала", end="Конец интервала")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def roll(self, interaction: discord.Interaction, start: int = 1, end: int = 100) -> None:
         try:
             if start > end:
@@ -157,7 +227,7 @@ class MiscCog(commands.Cog):
             app_commands.Choice(name="Соревнуется", value="competing"),
         ],
     )
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def set_status(
         self,
         interaction: discord.Interaction,
@@ -209,7 +279,7 @@ class MiscCog(commands.Cog):
                 pass
 
     @app_commands.command(name="ping", description="Проверка отклика бота")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def ping(self, interaction: discord.Interaction) -> None:
         try:
             latency_ms = round(self.bot.latency * 1000)
@@ -235,13 +305,21 @@ class MiscCog(commands.Cog):
                         if markers:
                             state.append(", ".join(markers))
                     voice_info = "; ".join(state)
-            await interaction.response.send_message(
-                f"🏓 Пинг: {latency_ms} мс\n🎧 Голос: {voice_info}",
-                ephemeral=True,
-            )
+            lines = [f"🏓 Пинг: {latency_ms} мс", f"🎧 Голос: {voice_info}"]
+            cogs_ready = getattr(self.bot, "cogs_ready", None)
+            if cogs_ready is not None and not cogs_ready.is_set():
+                lines.append("⏳ Коги ещё инициализируются после подключения.")
+            monitor = getattr(self.bot, "loop_monitor", None)
+            if monitor is not None:
+                lines.extend(format_lag_summary(monitor.stats()))
+            await interaction.response.send_message("\n".join(lines), ephemeral=True)
         except Exception as exc:
             await notify_admin(self.bot, f"Error in /ping: {exc}\n{traceback.format_exc()}")
             if not interaction.response.is_done():
                 await interaction.response.send_message(
                     "Не удалось получить информацию о пинге.", ephemeral=True
                 )
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(MiscCog(bot))
@@ -2,19 +2,53 @@
 
 from __future__ import annotations
 
-import asyncio
 import random
+from typing import Any, Dict, Optional
 
 import discord
 from discord.ext import commands
 
+GAME_SECONDS = 15
+
 
 class TargetGameCog(commands.Cog):
+    FINISH_TIMER = "target.finish"
+
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
         self.target_participants: set[discord.User] = set()
-        self.target_game_active: bool = False
-        self.target_game_event: asyncio.Event = asyncio.Event()
+        self.target_channel: Optional[discord.abc.Messageable] = None
+
+    async def cog_load(self) -> None:
+        self.bot.scheduler.on(self.FINISH_TIMER, self._on_finish_timer)
+
+    async def cog_unload(self) -> None:
+        self.bot.scheduler.off(self.FINISH_TIMER)
+        self.bot.scheduler.cancel(self.FINISH_TIMER)
+
+    @property
+    def target_game_active(self) -> bool:
+        return self.target_channel is not None
+
+    async def _finish(self) -> None:
+        channel, participants = self.target_channel, self.target_participants
+        self.target_channel = None
+        self.target_participants = set()
+        if channel is None:
+            return
+        if participants:
+            winner = random.choice(list(participants))
+            await channel.send(f"Победитель: {winner.mention}!")
+        else:
+            await channel.send("Участников не было.")
+
+    async def _on_finish_timer(self, _payload: Dict[str, Any]) -> None:
+        await self._finish()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        if self.target_channel is not None and message.content == "+" and message.channel == self.target_channel:
+            self.target_participants.add(message.author)
 
     @commands.command(name="target", help="Start a target game where users can join by typing +")
     async def target(self, ctx: commands.Context) -> None:
@@ -23,54 +57,19 @@ class TargetGameCog(commands.Cog):
             return
 
         self.target_participants = set()
-        self.target_game_active = True
-        self.target_game_event.clear()
-        await ctx.send("Напишите +, чтобы участвовать (15 секунд).")
-
-        def check(message: discord.Message) -> bool:
-            return message.content == "+" and message.channel == ctx.channel
-
-        async def collect_participants() -> None:
-            try:
-                loop = asyncio.get_running_loop()
-                end_time = loop.time() + 15
-                while not self.target_game_event.is_set():
-                    timeout = end_time - loop.time()
-                    if timeout <= 0:
-                        break
-                    try:
-                        message = await asyncio.wait_for(
-                            self.bot.wait_for("message", check=check),
-                            timeout=timeout,
-                        )
-                    except asyncio.TimeoutError:
-                        break
-                    else:
-                        self.target_participants.add(message.author)
-            finally:
-                self.target_game_event.set()
-
-        try:
-            await collect_participants()
-
-            if self.target_participants:
-                winner = random.choice(list(self.target_participants))
-                await ctx.send(f"Победитель: {winner.mention}!")
-            else:
-                await ctx.send("Участников не было.")
-        finally:
-            self.target_game_active = False
+        self.target_channel = ctx.channel
+        self.bot.scheduler.schedule(self.FINISH_TIMER, self.FINISH_TIMER, GAME_SECONDS)
+        await ctx.send(f"Напишите +, чтобы участвовать ({GAME_SECONDS} секунд).")
 
     @commands.command(name="go", help="End the target game early and choose a winner")
     async def go(self, ctx: commands.Context) -> None:
         if self.target_game_active:
-            self.target_game_event.set()
+            self.bot.scheduler.cancel(self.FINISH_TIMER)
             await ctx.send("Останавливаю игру досрочно!")
-            if self.target_participants:
-                winner = random.choice(list(self.target_participants))
-                await ctx.send(f"Победитель: {winner.mention}!")
-            else:
-                await ctx.send("Участников не было.")
-            self.target_game_active = False
+            await self._finish()
         else:
             await ctx.send("Игра сейчас не запущена.")
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(TargetGameCog(bot))
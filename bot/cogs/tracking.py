@@ -1,97 +1,245 @@
-"""Presence tracking for a specific user."""
+"""Presence tracking for a set of users."""
 
 from __future__ import annotations
 
 import traceback
-from typing import Optional
+from typing import Any, Dict, FrozenSet, Optional, Set
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from bot.cluster import BROADCAST
+from bot.presence import PresenceAggregate, PresenceDebouncer
 from bot.utils import notify_admin
-from config import GUILD_ID
+from config import (
+    GUILD_IDS,
+    PRESENCE_SETTLE_SECONDS,
+    PRESENCE_UPDATE_BUDGET,
+    PRESENCE_UPDATE_WINDOW,
+    TRACK_RULE,
+    TRACK_USER_IDS,
+)
 
 
 class TrackingCog(commands.Cog):
+    HANDOFF_ATTRS = ("aggregate",)
+
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        self.tracking_enabled: bool = False
-        self._last_applied_tracking_status: Optional[discord.Status] = None
+        store = bot.store
+        self.tracking_enabled: bool = store.get_bool("tracking.enabled", False)
+        rule = store.get_str("tracking.rule", TRACK_RULE)
+        self.aggregate = PresenceAggregate(
+            store.get_int_list("tracking.user_ids", TRACK_USER_IDS),
+            rule if rule in PresenceAggregate.RULES else TRACK_RULE,
+        )
+        self.presence_debouncer = PresenceDebouncer(
+            self._change_presence,
+            settle_seconds=PRESENCE_SETTLE_SECONDS,
+            budget=PRESENCE_UPDATE_BUDGET,
+            window=PRESENCE_UPDATE_WINDOW,
+        )
+        # Startup check: guild id -> tracked users not found there.
+        self._missing_by_guild: Dict[int, Set[int]] = {}
+        # Primary only: cluster id -> users that worker found in none of its
+        # guilds, or None when it serves no guild.
+        self._missing_by_worker: Dict[int, Optional[Set[int]]] = {}
+        # Cluster mode: the online set last sent to the primary, and on the
+        # primary each worker's online tracked users and the status broadcast.
+        self._reported_online: Optional[FrozenSet[int]] = None
+        self._online_by_worker: Dict[int, Set[int]] = {}
+        self._cluster_status: Optional[discord.Status] = None
+
+    async def cog_load(self) -> None:
+        cluster = self.bot.cluster
+        if cluster is not None:
+            cluster.on("track_state", self._on_cluster_state)
+            cluster.on("track_status", self._on_cluster_status)
+            if cluster.info.primary:
+                cluster.on("track_missing", self._on_cluster_missing)
+                cluster.on("track_online", self._on_cluster_online)
+
+    async def cog_unload(self) -> None:
+        self.presence_debouncer.reset()
+        if self.bot.cluster is not None:
+            for kind in ("track_state", "track_status", "track_missing", "track_online"):
+                self.bot.cluster.off(kind)
+
+    def _save_state(self) -> None:
+        store = self.bot.store
+        store.set("tracking.enabled", self.tracking_enabled)
+        store.set("tracking.rule", self.aggregate.rule)
+        store.set("tracking.user_ids", sorted(self.aggregate.tracked))
 
     def _is_online_like(self, status: discord.Status) -> bool:
         return status in (discord.Status.online, discord.Status.idle, discord.Status.dnd)
 
-    async def _apply_tracking_by_status(self, user_status: discord.Status, guild: discord.Guild) -> None:
+    async def _change_presence(self, status: discord.Status) -> bool:
+        if not self.tracking_enabled:
+            return False
+        try:
+            await self.bot.change_presence(status=status)
+            return True
+        except Exception:
+            await notify_admin(self.bot, f"apply_tracking_by_status failed:\n{traceback.format_exc()}")
+            return False
+
+    def _desired_status(self, online: Optional[Set[int]] = None) -> discord.Status:
+        return discord.Status.invisible if self.aggregate.is_satisfied(online) else discord.Status.idle
+
+    async def _apply_tracking_rule(self, *, immediate: bool = False) -> None:
         if not self.tracking_enabled:
             return
 
-        desired = discord.Status.invisible if self._is_online_like(user_status) else discord.Status.idle
+        cluster = self.bot.cluster
+        if cluster is not None and cluster.info.size > 1:
+            # A worker sees presences from its own guilds only; the primary decides for every shard.
+            online = self.aggregate.online
+            if online != self._reported_online or immediate:
+                self._reported_online = online
+                await cluster.send("track_online", {"online": sorted(online), "immediate": immediate})
+            return
+        self.presence_debouncer.submit(self._desired_status(), immediate=immediate)
 
-        if self._last_applied_tracking_status == desired:
+    async def _on_cluster_online(self, sender: int, payload: Dict[str, Any]) -> None:
+        """Primary: merge a worker's online tracked users and broadcast the status for every shard."""
+        self._online_by_worker[sender] = set(payload["online"])
+        if not self.tracking_enabled:
             return
+        status = self._desired_status(set().union(*self._online_by_worker.values()))
+        if status == self._cluster_status and not payload["immediate"]:
+            return
+        self._cluster_status = status
+        message = {"status": status.value, "immediate": payload["immediate"]}
+        await self.bot.cluster.send("track_status", message, target=BROADCAST)
+        await self._on_cluster_status(self.bot.cluster.info.cluster_id, message)
 
-        try:
-            await self.bot.change_presence(status=desired)
-            self._last_applied_tracking_status = desired
-        except Exception:
-            await notify_admin(self.bot, f"apply_tracking_by_status failed:\n{traceback.format_exc()}")
+    async def _on_cluster_status(self, _sender: int, payload: Dict[str, Any]) -> None:
+        if self.tracking_enabled:
+            self.presence_debouncer.submit(discord.Status(payload["status"]), immediate=payload["immediate"])
 
-    async def _evaluate_tracking_now(self, guild: discord.Guild) -> None:
+    async def _evaluate_tracking_now(self, guild: discord.Guild) -> Set[int]:
+        """Refresh tracked users' status from ``guild``; returns the ones who are not members of it."""
+        missing: Set[int] = set()
         try:
-            member = guild.get_member(self.bot.settings.track_user_id)
-            if member is None:
+            for user_id in list(self.aggregate.tracked):
                 try:
-                    member = await guild.fetch_member(self.bot.settings.track_user_id)
+                    member = await self.bot.entities.member(guild, user_id)
                 except Exception:
                     member = None
 
-            if member is None:
-                await notify_admin(
-                    self.bot,
-                    f"Track: user {self.bot.settings.track_user_id} не найден в гильдии {guild.id}",
-                )
-                return
+                if member is None:
+                    missing.add(user_id)
+                    continue
+                self.aggregate.update(user_id, self._is_online_like(member.status))
 
-            await self._apply_tracking_by_status(member.status, guild)
+            await self._apply_tracking_rule(immediate=True)
         except Exception:
             await notify_admin(self.bot, f"evaluate_tracking_now error:\n{traceback.format_exc()}")
+        return missing
 
-    @commands.Cog.listener()
-    async def on_ready(self) -> None:
+    async def _report_missing(self, missing: Optional[Set[int]]) -> None:
+        if missing:
+            await notify_admin(
+                self.bot,
+                f"Track: users {', '.join(map(str, sorted(missing)))} не найдены ни в одной гильдии бота",
+            )
+
+    async def ready_guild(self, guild: discord.Guild) -> None:
+        if self.tracking_enabled:
+            self._missing_by_guild[guild.id] = await self._evaluate_tracking_now(guild)
+
+    async def guilds_ready(self) -> None:
+        """Once every served guild was checked, report users found in none of them."""
+        checked = list(self._missing_by_guild.values())
+        self._missing_by_guild.clear()
+        if self.tracking_enabled:
+            await self._submit_missing(set.intersection(*checked) if checked else None)
+
+    async def _submit_missing(self, missing: Optional[Set[int]]) -> None:
+        """``missing`` is None when this worker checked no guild."""
+        cluster = self.bot.cluster
+        if cluster is not None and cluster.info.size > 1:
+            # Other workers hold other guilds; the primary reports once every worker has checked.
+            await cluster.send("track_missing", {"missing": None if missing is None else sorted(missing)})
+        else:
+            await self._report_missing(missing)
+
+    async def _on_cluster_missing(self, sender: int, payload: Dict[str, Any]) -> None:
+        missing = payload["missing"]
+        self._missing_by_worker[sender] = None if missing is None else set(missing)
+        if len(self._missing_by_worker) < self.bot.cluster.info.size:
+            return
+        checked = [users for users in self._missing_by_worker.values() if users is not None]
+        self._missing_by_worker.clear()
+        if checked:
+            await self._report_missing(set.intersection(*checked))
+
+    async def _apply_state(self) -> None:
+        """Persist the settings and re-check tracked users in every served guild of this worker."""
+        self._save_state()
+        self.presence_debouncer.reset()
+        self._reported_online = None
+        self._cluster_status = None
         if not self.tracking_enabled:
+            self.aggregate.clear_online()
             return
-        for guild in self.bot.guilds:
-            await self._evaluate_tracking_now(guild)
+        served = [guild for guild in self.bot.guilds if self.bot.guild_settings.serves(guild.id)]
+        missing = [await self._evaluate_tracking_now(guild) for guild in served]
+        await self._submit_missing(set.intersection(*missing) if missing else None)
+
+    async def _on_cluster_state(self, _sender: int, payload: Dict[str, Any]) -> None:
+        """/track ran on another worker; apply the same settings to this worker's guilds."""
+        self.tracking_enabled = payload["enabled"]
+        self.aggregate.rule = payload["rule"]
+        user_ids = set(payload["user_ids"])
+        for user_id in self.aggregate.tracked - user_ids:
+            self.aggregate.remove(user_id)
+        for user_id in user_ids - self.aggregate.tracked:
+            self.aggregate.add(user_id)
+        await self._apply_state()
 
     @commands.Cog.listener()
     async def on_presence_update(self, _before: discord.Member, after: discord.Member) -> None:
         try:
-            if not self.tracking_enabled:
+            if after.id not in self.aggregate:
                 return
-            if after.id != self.bot.settings.track_user_id:
+            if not self.tracking_enabled:
                 return
-            if after.guild:
-                await self._apply_tracking_by_status(after.status, after.guild)
+            self.aggregate.update(after.id, self._is_online_like(after.status))
+            await self._apply_tracking_rule()
         except Exception:
             await notify_admin(self.bot, f"on_presence_update error:\n{traceback.format_exc()}")
 
     @app_commands.command(
         name="track",
-        description="Включить/выключить трекинг статуса пользователя и автосмену присутствия бота",
+        description="Трекинг статуса пользователей и автосмена присутствия бота",
+    )
+    @app_commands.describe(
+        mode="Режим: on/off (или не указывать — тогда переключение)",
+        rule="Когда уходить в невидимку: если онлайн любой (any) или все (all) отслеживаемые",
+        add="Добавить пользователя в отслеживаемые",
+        remove="Убрать пользователя из отслеживаемых",
     )
-    @app_commands.describe(mode="Режим: on/off (или не указывать — тогда переключение)")
     @app_commands.choices(
         mode=[
             app_commands.Choice(name="on (включить)", value="on"),
             app_commands.Choice(name="off (выключить)", value="off"),
-        ]
+        ],
+        rule=[
+            app_commands.Choice(name="any (любой онлайн)", value="any"),
+            app_commands.Choice(name="all (все онлайн)", value="all"),
+        ],
     )
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def track_cmd(
         self,
         interaction: discord.Interaction,
         mode: Optional[app_commands.Choice[str]] = None,
+        rule: Optional[app_commands.Choice[str]] = None,
+        add: Optional[discord.User] = None,
+        remove: Optional[discord.User] = None,
     ) -> None:
         if interaction.user.id != self.bot.settings.admin_user_id:
             await interaction.response.send_message("Недостаточно прав.", ephemeral=True)
@@ -106,31 +254,55 @@ class TrackingCog(commands.Cog):
 
             await interaction.response.defer(ephemeral=True, thinking=False)
 
+            reconfigured = rule is not None or add is not None or remove is not None
+            if rule is not None:
+                self.aggregate.rule = rule.value
+            if remove is not None:
+                self.aggregate.remove(remove.id)
+            if add is not None:
+                member = interaction.guild.get_member(add.id)
+                self.aggregate.add(add.id, member is not None and self._is_online_like(member.status))
+
             if mode is None:
-                self.tracking_enabled = not self.tracking_enabled
+                if not reconfigured:
+                    self.tracking_enabled = not self.tracking_enabled
             elif mode.value == "on":
                 self.tracking_enabled = True
             elif mode.value == "off":
                 self.tracking_enabled = False
 
-            self._last_applied_tracking_status = None
-
-            if self.tracking_enabled:
-                await self._evaluate_tracking_now(interaction.guild)
-                state_msg = "включён"
-            else:
-                state_msg = "выключен"
+            cluster = self.bot.cluster
+            if cluster is not None:
+                await cluster.send(
+                    "track_state",
+                    {
+                        "enabled": self.tracking_enabled,
+                        "rule": self.aggregate.rule,
+                        "user_ids": sorted(self.aggregate.tracked),
+                    },
+                    target=BROADCAST,
+                )
+            await self._apply_state()
+            state_msg = "включён" if self.tracking_enabled else "выключен"
 
-            member = interaction.guild.get_member(self.bot.settings.track_user_id)
-            target_status = str(member.status) if member else "unknown"
+            lines = []
+            for user_id in sorted(self.aggregate.tracked):
+                member = interaction.guild.get_member(user_id)
+                target_status = str(member.status) if member else "unknown"
+                lines.append(f"• <@{user_id}> — **{target_status}**")
+            targets = "\n".join(lines) if lines else "— никого"
 
             me = interaction.guild.me
             bot_status = str(me.status) if me else "unknown"
 
+            debouncer = self.presence_debouncer
             await interaction.followup.send(
-                f"🔎 Трекинг: **{state_msg}**\n"
-                f"Целевой пользователь: `<@{self.bot.settings.track_user_id}>` статус сейчас: **{target_status}**\n"
-                f"Статус бота: **{bot_status}**",
+                f"🔎 Трекинг: **{state_msg}**, правило: **{self.aggregate.rule}** "
+                f"(онлайн {self.aggregate.online_count}/{len(self.aggregate)})\n"
+                f"Отслеживаемые пользователи:\n{targets}\n"
+                f"Статус бота: **{bot_status}**\n"
+                f"Обновлений присутствия: {debouncer.applied_count}, подавлено: {debouncer.suppressed_count}, "
+                f"отложено по лимиту: {debouncer.throttled_count}",
                 ephemeral=True,
             )
         except Exception:
@@ -145,3 +317,7 @@ class TrackingCog(commands.Cog):
                     )
             except Exception:
                 pass
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(TrackingCog(bot))
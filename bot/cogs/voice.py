@@ -2,9 +2,8 @@
 
 from __future__ import annotations
 
-import asyncio
 import traceback
-from typing import Dict, Tuple
+from typing import Any, Dict, Tuple
 
 import discord
 from aiohttp.client_exceptions import ClientConnectionResetError
@@ -12,7 +11,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from bot.utils import notify_admin
-from config import GUILD_ID
+from config import GUILD_IDS
 
 
 class _OpusSilence(discord.AudioSource):
@@ -25,12 +24,37 @@ class _OpusSilence(discord.AudioSource):
 
 class VoiceCog(commands.Cog):
     MAX_RECONNECT_ATTEMPTS = 3
+    RECONNECT_TIMER = "voice.reconnect"
+    HANDOFF_ATTRS = ("reconnect_attempts",)
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        self.sticky_voice_channels: Dict[int, int] = {}
+        self.sticky_voice_channels: Dict[int, int] = bot.store.table("voice.sticky_channels", int, int)
         self.reconnect_attempts: Dict[int, int] = {}
 
+    async def cog_load(self) -> None:
+        self.bot.scheduler.on(self.RECONNECT_TIMER, self._reconnect_sticky)
+
+    async def cog_unload(self) -> None:
+        self.bot.scheduler.off(self.RECONNECT_TIMER)
+
+    def health_status(self) -> Dict[str, Any]:
+        """Sticky voice state per guild for the health endpoint."""
+        guilds = {}
+        for guild_id, channel_id in self.sticky_voice_channels.items():
+            guild = self.bot.get_guild(guild_id)
+            vc = guild.voice_client if guild is not None else None
+            connected = vc is not None and vc.is_connected()
+            guilds[str(guild_id)] = {
+                "channel_id": channel_id,
+                "connected": connected,
+                "in_channel": connected and vc.channel is not None and vc.channel.id == channel_id,
+                "playing": connected and vc.is_playing(),
+                "reconnect_attempts": self.reconnect_attempts.get(guild_id, 0),
+                "reconnect_pending": self.bot.scheduler.pending(f"{self.RECONNECT_TIMER}:{guild_id}") is not None,
+            }
+        return {"sticky": guilds}
+
     def _can_connect(self, guild: discord.Guild, channel: discord.abc.Connectable) -> Tuple[bool, str]:
         me = guild.me
         if not me:
@@ -100,6 +124,20 @@ class VoiceCog(commands.Cog):
             )
             return False
 
+    async def ready_guild(self, guild: discord.Guild) -> None:
+        # Rejoin the sticky channel restored from the state store.
+        channel_id = self.sticky_voice_channels.get(guild.id)
+        if channel_id is None:
+            return
+        channel = guild.get_channel(channel_id)
+        if not isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+            self.sticky_voice_channels.pop(guild.id, None)
+            return
+        vc = guild.voice_client
+        if vc and vc.is_connected():
+            return
+        await self._safe_connect(channel, "Restore sticky voice", guild.id)
+
     @commands.Cog.listener()
     async def on_voice_state_update(
         self,
@@ -107,7 +145,8 @@ class VoiceCog(commands.Cog):
         _before: discord.VoiceState,
         after: discord.VoiceState,
     ) -> None:
-        if member.id != self.bot.user.id:
+        if member.id != self.bot.user.id or self.bot.shutting_down:
+            # Leaving voice on shutdown keeps the sticky channel for the next start.
             return
 
         guild = member.guild
@@ -125,59 +164,71 @@ class VoiceCog(commands.Cog):
                 )
                 return
 
-            delay = 2 ** attempts
-            await asyncio.sleep(delay)
+            # A burst of voice updates shares one pending reconnect.
+            self.bot.scheduler.schedule(
+                self.RECONNECT_TIMER,
+                f"{self.RECONNECT_TIMER}:{guild.id}",
+                2 ** attempts,
+                {"guild_id": guild.id},
+                replace=False,
+            )
 
-            target_channel = self.bot.get_channel(self.sticky_voice_channels.get(guild.id, 0))
-            if target_channel is None or not isinstance(
-                target_channel, (discord.VoiceChannel, discord.StageChannel)
-            ):
-                self.sticky_voice_channels.pop(guild.id, None)
-                return
+    async def _reconnect_sticky(self, payload: Dict[str, Any]) -> None:
+        guild = self.bot.get_guild(payload["guild_id"])
+        if guild is None or guild.id not in self.sticky_voice_channels:
+            return
+        attempts = self.reconnect_attempts.get(guild.id, 0)
 
-            ok_perms, reason = self._can_connect(guild, target_channel)
-            if not ok_perms:
-                self.reconnect_attempts[guild.id] = attempts + 1
-                return
+        target_channel = self.bot.get_channel(self.sticky_voice_channels.get(guild.id, 0))
+        if target_channel is None or not isinstance(
+            target_channel, (discord.VoiceChannel, discord.StageChannel)
+        ):
+            self.sticky_voice_channels.pop(guild.id, None)
+            return
 
-            next_attempt = attempts + 1
-            vc = guild.voice_client
-            success = False
-            try:
-                if vc and vc.is_connected():
-                    if vc.channel and vc.channel.id == target_channel.id:
-                        success = True
-                    elif vc.channel:
-                        await vc.move_to(target_channel)
-                        success = True
-                if not success:
-                    success = await self._safe_connect(target_channel, "Auto-reconnect", guild.id)
-
-                if success:
-                    self.reconnect_attempts[guild.id] = 0
-                    await self._ensure_self_mute(guild)
-                    await self._ensure_silence_playing(guild.voice_client)
-                else:
-                    self.reconnect_attempts[guild.id] = next_attempt
-                    return
-            except IndexError:
-                self.reconnect_attempts[guild.id] = next_attempt
-                self.sticky_voice_channels.pop(guild.id, None)
-                await notify_admin(
-                    self.bot,
-                    f"Auto-reconnect IndexError in guild {guild.id}. Sticky disabled.\n{traceback.format_exc()}",
-                )
-                return
-            except Exception:
+        ok_perms, reason = self._can_connect(guild, target_channel)
+        if not ok_perms:
+            self.reconnect_attempts[guild.id] = attempts + 1
+            return
+
+        next_attempt = attempts + 1
+        vc = guild.voice_client
+        success = False
+        try:
+            if vc and vc.is_connected():
+                if vc.channel and vc.channel.id == target_channel.id:
+                    success = True
+                elif vc.channel:
+                    await vc.move_to(target_channel)
+                    success = True
+            if not success:
+                success = await self._safe_connect(target_channel, "Auto-reconnect", guild.id)
+
+            if success:
+                self.reconnect_attempts[guild.id] = 0
+                await self._ensure_self_mute(guild)
+                await self._ensure_silence_playing(guild.voice_client)
+            else:
                 self.reconnect_attempts[guild.id] = next_attempt
-                await notify_admin(
-                    self.bot,
-                    f"Auto-reconnect unexpected error in guild {guild.id}:\n{traceback.format_exc()}",
-                )
                 return
+        except IndexError:
+            self.reconnect_attempts[guild.id] = next_attempt
+            self.sticky_voice_channels.pop(guild.id, None)
+            await notify_admin(
+                self.bot,
+                f"Auto-reconnect IndexError in guild {guild.id}. Sticky disabled.\n{traceback.format_exc()}",
+            )
+            return
+        except Exception:
+            self.reconnect_attempts[guild.id] = next_attempt
+            await notify_admin(
+                self.bot,
+                f"Auto-reconnect unexpected error in guild {guild.id}:\n{traceback.format_exc()}",
+            )
+            return
 
     @app_commands.command(name="накрутка", description="Бот зайдёт в ваш голосовой канал и будет там находиться (серый микрофон)")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def nakrutka(self, interaction: discord.Interaction) -> None:
         try:
             if not interaction.guild:
@@ -268,7 +319,7 @@ class VoiceCog(commands.Cog):
                 )
 
     @app_commands.command(name="стопнакрутка", description="Отключить 'прилипание' и выйти из голосового канала")
-    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.guilds(*GUILD_IDS)
     async def stop_nakrutka(self, interaction: discord.Interaction) -> None:
         try:
             if not interaction.guild:
@@ -295,3 +346,7 @@ class VoiceCog(commands.Cog):
                 await interaction.response.send_message(
                     "Произошла ошибка при отключении от голоса.", ephemeral=True
                 )
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(VoiceCog(bot))
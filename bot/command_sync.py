@@ -0,0 +1,103 @@
+"""Application command sync that skips the REST round trip when nothing changed."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+SYNC_STATE_FILE = Path(".command_sync.json")
+
+
+@dataclass(frozen=True)
+class SyncResult:
+    guild_id: int
+    fingerprint: str
+    synced: Optional[List[app_commands.AppCommand]]
+
+    @property
+    def skipped(self) -> bool:
+        return self.synced is None
+
+
+def _command_payload(command: Any, tree: app_commands.CommandTree) -> Dict[str, Any]:
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        # discord.py < 2.4 builds the payload without the tree.
+        return command.to_dict()
+
+
+def command_fingerprint(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    """Stable hash of the payload ``tree.sync(guild=...)`` would upload."""
+    payload = [_command_payload(cmd, tree) for cmd in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda item: (item.get("type", 1), item.get("name", "")))
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _read_state(path: Path) -> Dict[str, str]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_state(path: Path, key: str, fingerprint: str) -> None:
+    state = _read_state(path)
+    state[key] = fingerprint
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def sync_guild_commands(
+    bot: commands.Bot,
+    guild_id: int,
+    *,
+    force: bool = False,
+    state_file: Path = SYNC_STATE_FILE,
+) -> SyncResult:
+    """Sync guild commands only when their fingerprint differs from the stored one."""
+    guild = discord.Object(id=guild_id)
+    fingerprint = command_fingerprint(bot.tree, guild)
+    key = f"{bot.application_id}:{guild_id}"
+
+    if not force:
+        state = await asyncio.to_thread(_read_state, state_file)
+        if state.get(key) == fingerprint:
+            return SyncResult(guild_id, fingerprint, None)
+
+    synced = await bot.tree.sync(guild=guild)
+    await asyncio.to_thread(_write_state, state_file, key, fingerprint)
+    return SyncResult(guild_id, fingerprint, synced)
+
+
+async def sync_all_guilds(
+    bot: commands.Bot,
+    guild_ids: Iterable[int],
+    *,
+    force: bool = False,
+    state_file: Path = SYNC_STATE_FILE,
+) -> Dict[int, Union[SyncResult, Exception]]:
+    """Run ``sync_guild_commands`` for every guild; failures are returned, not raised.
+
+    Guilds are synced one after another because they share the fingerprint
+    state file.
+    """
+    results: Dict[int, Union[SyncResult, Exception]] = {}
+    for guild_id in guild_ids:
+        try:
+            results[guild_id] = await sync_guild_commands(bot, guild_id, force=force, state_file=state_file)
+        except Exception as exc:
+            results[guild_id] = exc
+    return results
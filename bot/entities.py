@@ -0,0 +1,123 @@
+"""Shared user/member lookups with single-flight fetches and a TTL cache."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import discord
+from discord.ext import commands
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires: float
+
+
+class EntityCache:
+    """Resolves users and members from discord.py's cache, then a TTL cache, then REST.
+
+    Concurrent lookups of the same ID share one in-flight request. IDs that
+    Discord reports as unknown are cached as ``None`` for ``negative_ttl``.
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        *,
+        ttl: float = 600.0,
+        negative_ttl: float = 60.0,
+        max_entries: int = 5000,
+    ) -> None:
+        self.bot = bot
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.negative_hits = 0
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._admin_dm: Optional[discord.DMChannel] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def user(self, user_id: int) -> Optional[discord.User]:
+        cached = self.bot.get_user(user_id)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        return await self._lookup(("user", user_id), lambda: self.bot.fetch_user(user_id))
+
+    async def member(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        cached = guild.get_member(user_id)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        return await self._lookup(("member", guild.id, user_id), lambda: guild.fetch_member(user_id))
+
+    async def admin_dm(self) -> Optional[discord.DMChannel]:
+        """The admin's DM channel, resolved once and kept until ADMIN_USER_ID changes."""
+        admin_id = self.bot.settings.admin_user_id
+        channel = self._admin_dm
+        if channel is not None and channel.recipient is not None and channel.recipient.id == admin_id:
+            self.hits += 1
+            return channel
+        admin = await self.user(admin_id)
+        if admin is None:
+            return None
+        self._admin_dm = admin.dm_channel or await self._lookup(("dm", admin_id), admin.create_dm)
+        return self._admin_dm
+
+    def invalidate(self, *key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    async def _lookup(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires > time.monotonic():
+                self.hits += 1
+                if entry.value is None:
+                    self.negative_hits += 1
+                return entry.value
+            del self._entries[key]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._fetch(key, fetch))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the fetch other callers share.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            try:
+                value = await fetch()
+            except discord.NotFound:
+                value = None
+            ttl = self.ttl if value is not None else self.negative_ttl
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = _Entry(value, time.monotonic() + ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats_line(self) -> str:
+        return (
+            f"Кэш пользователей: {len(self)} записей, попаданий {self.hit_rate:.0%} "
+            f"({self.hits}/{self.hits + self.misses}), объединено запросов {self.coalesced}, "
+            f"негативных попаданий {self.negative_hits}"
+        )
@@ -0,0 +1,133 @@
+"""Per-guild settings: stored overrides layered over the global ``BotSettings``."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+import json
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from discord.ext import commands
+
+from .storage import PersistentMap
+
+STORE_NAMESPACE = "guild_settings"
+
+
+@dataclass(frozen=True)
+class GuildSettings:
+    guild_id: int
+    boost_report_channel_id: int
+    invite_code_for_bot_booster: str
+    role_bot_booster: str
+    role_server_booster: str
+    role_movies: str
+    moderator_role: str
+    google_sheet_url: str
+
+
+# Fields a guild may override; each defaults to the BotSettings field of the same name.
+GUILD_FIELDS = tuple(field.name for field in fields(GuildSettings) if field.name != "guild_id")
+# Fields that may be set to an empty string (disables the feature for the guild).
+_OPTIONAL_FIELDS = frozenset({"moderator_role"})
+
+
+def parse_value(field: str, raw: str) -> Any:
+    """Convert user input for ``field``; raises ValueError when it is not acceptable."""
+    if field not in GUILD_FIELDS:
+        raise ValueError(f"Unknown guild setting {field!r}.")
+    value = raw.strip()
+    if field.endswith("_id"):
+        try:
+            number = int(value.strip("<#>"))
+        except ValueError as exc:
+            raise ValueError(f"{field} must be a Discord ID.") from exc
+        if number <= 0:
+            raise ValueError(f"{field} must be a positive Discord ID.")
+        return number
+    if not value and field not in _OPTIONAL_FIELDS:
+        raise ValueError(f"{field} must not be empty.")
+    return value
+
+
+class GuildSettingsIndex:
+    """Resolved settings per guild, kept in memory.
+
+    Overrides are stored as one JSON object per guild in the state store.
+    Resolved snapshots are cached per guild, so a lookup is one dict hit. The
+    cache is rebuilt lazily when an override or ``bot.settings`` changes.
+    Override changes dispatch
+    ``on_guild_settings_changed(guild_id, old, new, changed_fields)``.
+    """
+
+    def __init__(self, bot: commands.Bot, guild_ids: Iterable[int]) -> None:
+        self.bot = bot
+        self.guild_ids: FrozenSet[int] = frozenset(guild_ids)
+        self._overrides: Dict[int, Dict[str, Any]] = {}
+        self._resolved: Dict[int, GuildSettings] = {}
+        self._base: Optional[object] = None
+
+    def load(self) -> None:
+        """Read stored overrides; call once the state store is open."""
+        self._overrides = {}
+        for guild_id, encoded in self._table().items():
+            try:
+                values = json.loads(encoded)
+            except ValueError:
+                continue
+            if isinstance(values, dict):
+                self._overrides[guild_id] = {key: value for key, value in values.items() if key in GUILD_FIELDS}
+        self._resolved.clear()
+
+    def _table(self) -> PersistentMap[int, str]:
+        return self.bot.store.table(STORE_NAMESPACE, int, str)
+
+    def serves(self, guild_id: Optional[int]) -> bool:
+        return guild_id in self.guild_ids
+
+    def get(self, guild_id: int) -> GuildSettings:
+        base = self.bot.settings
+        if base is not self._base:
+            # Global settings were reloaded; every guild without an override follows them.
+            self._resolved.clear()
+            self._base = base
+        resolved = self._resolved.get(guild_id)
+        if resolved is None:
+            values = {field: getattr(base, field) for field in GUILD_FIELDS}
+            values.update(self._overrides.get(guild_id, {}))
+            resolved = self._resolved[guild_id] = GuildSettings(guild_id=guild_id, **values)
+        return resolved
+
+    def overrides(self, guild_id: int) -> Dict[str, Any]:
+        return dict(self._overrides.get(guild_id, {}))
+
+    def set(self, guild_id: int, field: str, value: Any) -> GuildSettings:
+        if field not in GUILD_FIELDS:
+            raise ValueError(f"Unknown guild setting {field!r}.")
+        overrides = dict(self._overrides.get(guild_id, {}))
+        overrides[field] = value
+        return self._replace(guild_id, overrides)
+
+    def reset(self, guild_id: int, field: Optional[str] = None) -> GuildSettings:
+        """Drop one override (or all of them when ``field`` is None)."""
+        overrides = dict(self._overrides.get(guild_id, {}))
+        if field is None:
+            overrides.clear()
+        else:
+            overrides.pop(field, None)
+        return self._replace(guild_id, overrides)
+
+    def _replace(self, guild_id: int, overrides: Dict[str, Any]) -> GuildSettings:
+        old = self.get(guild_id)
+        if overrides:
+            self._overrides[guild_id] = overrides
+            self._table()[guild_id] = json.dumps(overrides, ensure_ascii=False, sort_keys=True)
+        else:
+            self._overrides.pop(guild_id, None)
+            self._table().pop(guild_id, None)
+        self._resolved.pop(guild_id, None)
+        new = self.get(guild_id)
+        changed = frozenset(field for field in GUILD_FIELDS if getattr(old, field) != getattr(new, field))
+        if changed:
+            self.bot.dispatch("guild_settings_changed", guild_id, old, new, changed)
+        return new
+
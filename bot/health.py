@@ -0,0 +1,147 @@
+"""Local HTTP health endpoint for process supervisors.
+
+Routes (GET or HEAD, JSON bodies, 200 when healthy and 503 otherwise):
+
+* ``/livez`` – the event loop is responsive (watchdog beat not overdue);
+* ``/readyz`` – not shutting down, gateway connected, caches loaded, cogs ready,
+  commands synced;
+* ``/status`` – both of the above plus every cog's ``health_status()`` section
+  (the voice cog reports its sticky channels per guild).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import traceback
+from typing import Any, Dict, Optional, Tuple
+
+from discord.ext import commands
+
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+# Requests are a request line plus a few headers; anything larger is not a probe.
+_MAX_REQUEST_BYTES = 8192
+_READ_TIMEOUT = 5.0
+
+
+def liveness(bot: commands.Bot, *, stall_after: float) -> Tuple[bool, Dict[str, Any]]:
+    monitor = bot.loop_monitor  # type: ignore[attr-defined]
+    overdue = monitor.last_beat_age
+    stats = monitor.stats()
+    body = {
+        "beat_overdue_ms": round(overdue * 1000, 1),
+        "loop_lag_ms": round(stats.last * 1000, 1),
+        "closed": bot.is_closed(),
+    }
+    return overdue < stall_after and not bot.is_closed(), body
+
+
+def readiness(bot: commands.Bot) -> Tuple[bool, Dict[str, Any]]:
+    shards = getattr(bot, "shards", {})
+    checks = {
+        "accepting": not bot.shutting_down,  # type: ignore[attr-defined]
+        "gateway": bool(shards) and all(not shard.is_closed() for shard in shards.values()),
+        "caches": bot.is_ready(),
+        "cogs": bot.cogs_ready.is_set(),  # type: ignore[attr-defined]
+        "commands": bool(bot.commands_synced),  # type: ignore[attr-defined]
+    }
+    body: Dict[str, Any] = {"checks": checks}
+    pending = sorted(name for name, cog in bot.cogs.items() if not bot.is_cog_ready(name))  # type: ignore[attr-defined]
+    if pending:
+        body["pending_cogs"] = pending
+    return all(checks.values()), body
+
+
+def cog_status(bot: commands.Bot) -> Dict[str, Any]:
+    """Sections contributed by cogs that define ``health_status()``."""
+    sections = {}
+    for name, cog in sorted(bot.cogs.items()):
+        if hasattr(cog, "health_status"):
+            try:
+                sections[name] = cog.health_status()  # type: ignore[attr-defined]
+            except Exception as exc:
+                sections[name] = {"error": repr(exc)}
+    return sections
+
+
+class HealthServer:
+    """Minimal HTTP/1.1 server on ``host:port`` answering one request per connection."""
+
+    def __init__(self, bot: commands.Bot, host: str, port: int, *, stall_after: float) -> None:
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.stall_after = stall_after
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if self._server is not None:
+            return
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        print(f"Health endpoint listening on http://{self.host}:{self.port} (/livez, /readyz, /status).")
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    def route(self, method: str, path: str) -> Tuple[int, Dict[str, Any]]:
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        if path not in ("/livez", "/readyz", "/status"):
+            return 404, {"error": f"unknown path {path}"}
+        if method not in ("GET", "HEAD"):
+            return 405, {"error": f"method {method} not allowed"}
+        if path == "/livez":
+            ok, body = liveness(self.bot, stall_after=self.stall_after)
+        elif path == "/readyz":
+            ok, body = readiness(self.bot)
+        else:
+            live, live_body = liveness(self.bot, stall_after=self.stall_after)
+            ready, ready_body = readiness(self.bot)
+            ok = live and ready
+            body = {
+                "live": live,
+                "ready": ready,
+                "liveness": live_body,
+                "readiness": ready_body,
+                "cogs": cog_status(self.bot),
+            }
+        body["ok"] = ok
+        body["time"] = time.time()
+        return (200 if ok else 503), body
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), _READ_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            if len(head) > _MAX_REQUEST_BYTES:
+                return
+            parts = head.split(b"\r\n", 1)[0].decode("latin-1").split()
+            if len(parts) != 3:
+                return
+            method, path, _version = parts
+            self.requests += 1
+            status, body = self.route(method, path)
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Cache-Control: no-store\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1")
+            )
+            if method != "HEAD":
+                writer.write(payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception:
+            print(f"Health endpoint request failed:\n{traceback.format_exc()}")
+        finally:
+            writer.close()
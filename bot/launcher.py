@@ -0,0 +1,157 @@
+"""Multi-process launcher: one worker process per shard range, restarted when it dies."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import multiprocessing
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+import signal
+import time
+from typing import Any, Dict, Optional
+
+import discord
+
+from .cluster import ClusterInfo, reset_cluster_db, shard_ranges
+
+# A worker that stayed up this long has its restart backoff reset.
+_STABLE_AFTER = 60.0
+_MAX_BACKOFF = 60.0
+# Discord allows one IDENTIFY per 5 s (max_concurrency 1); workers start staggered
+# so each one's shards identify after the previous worker's.
+_IDENTIFY_INTERVAL = 5.0
+
+
+async def recommended_shard_count(token: str) -> int:
+    """Ask Discord how many shards the bot should run."""
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _url, _limits = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+
+def run_worker(info: ClusterInfo, token: str) -> None:
+    """Process entry point: run an ``OutBot`` limited to ``info.shard_ids``."""
+    started = time.perf_counter()
+    # Ctrl+C reaches every process in the group; only the launcher reacts to
+    # it, and stops workers with SIGTERM, which starts their graceful shutdown.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from config import FAST_RUNTIME, SHUTDOWN_DRAIN_SECONDS
+
+    from .bot import create_bot
+    from .runtime import install_runtime
+    from .shutdown import run_bot
+
+    print(f"Cluster worker {info.cluster_id} runtime: {install_runtime(FAST_RUNTIME).describe()}.")
+    bot = create_bot(started_at=started, cluster=info)
+    run_bot(bot, token, drain_timeout=SHUTDOWN_DRAIN_SECONDS, signals=(signal.SIGTERM,))
+
+
+@dataclass
+class _Worker:
+    info: ClusterInfo
+    process: Optional[BaseProcess] = None
+    started_at: float = 0.0
+    failures: int = 0
+    restart_at: float = 0.0
+
+
+class ClusterLauncher:
+    """Spreads shards over ``processes`` workers and supervises them.
+
+    Workers are started with the ``spawn`` method so each gets a fresh
+    interpreter. A worker that exits is started again after an exponential
+    backoff. SIGINT/SIGTERM stop every worker and then the launcher.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        processes: int,
+        shard_count: int,
+        db_path: Path,
+        stop_timeout: float = 30.0,
+    ) -> None:
+        self.token = token
+        self.processes = processes
+        self.shard_count = shard_count
+        self.db_path = db_path
+        self.stop_timeout = stop_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _Worker] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        shard_count = self.shard_count or asyncio.run(recommended_shard_count(self.token))
+        ranges = shard_ranges(shard_count, self.processes)
+        reset_cluster_db(self.db_path, shard_count)
+        print(
+            f"Cluster: {shard_count} shards over {len(ranges)} processes "
+            f"({', '.join(f'{r[0]}-{r[-1]}' for r in ranges)})."
+        )
+        start_at = time.monotonic()
+        for cluster_id, shard_ids in enumerate(ranges):
+            info = ClusterInfo(cluster_id, shard_ids, shard_count, len(ranges))
+            self._workers[cluster_id] = _Worker(info, restart_at=start_at)
+            start_at += len(shard_ids) * _IDENTIFY_INTERVAL
+
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        try:
+            while not self._stopping:
+                self._supervise()
+                time.sleep(1.0)
+        finally:
+            self._stop_all()
+
+    def _request_stop(self, _signum: int, _frame: Any) -> None:
+        self._stopping = True
+
+    def _start(self, worker: _Worker) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(worker.info, self.token),
+            name=f"outbot-cluster-{worker.info.cluster_id}",
+        )
+        process.start()
+        worker.process = process
+        worker.started_at = time.monotonic()
+
+    def _supervise(self) -> None:
+        now = time.monotonic()
+        for worker in self._workers.values():
+            process = worker.process
+            if process is not None and process.is_alive():
+                if worker.failures and now - worker.started_at > _STABLE_AFTER:
+                    worker.failures = 0
+                continue
+            if process is not None:
+                # Just exited: schedule a restart with backoff.
+                worker.failures += 1
+                delay = min(_MAX_BACKOFF, 2.0 ** (worker.failures - 1))
+                worker.restart_at = now + delay
+                worker.process = None
+                print(
+                    f"Cluster worker {worker.info.cluster_id} exited with code {process.exitcode}; "
+                    f"restarting in {delay:.0f} s."
+                )
+                continue
+            if now >= worker.restart_at:
+                self._start(worker)
+
+    def _stop_all(self) -> None:
+        processes = [worker.process for worker in self._workers.values() if worker.process is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
@@ -0,0 +1,177 @@
+"""Event-loop lag sampling and blocked-loop detection."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+import sys
+import threading
+import time
+import traceback
+from typing import Deque, List, Optional, Tuple
+
+from discord.ext import commands
+
+from .utils import notify_admin
+
+# Frames from these files are scheduling plumbing, not the code that blocked.
+_PLUMBING = ("asyncio", "threading.py", "loopmon.py")
+# Shortest watchdog poll, so a zero stall threshold does not busy-spin the thread.
+_MIN_POLL = 0.01
+
+
+@dataclass(frozen=True)
+class SlowCallback:
+    at: datetime
+    duration: float
+    location: str
+
+
+@dataclass(frozen=True)
+class LoopLagStats:
+    last: float
+    average: float
+    peak: float
+    samples: int
+    slow_callbacks: Tuple[SlowCallback, ...]
+
+
+def _describe_stack(frame) -> str:
+    stack = traceback.extract_stack(frame)
+    ours = [entry for entry in stack if not any(part in entry.filename for part in _PLUMBING)]
+    entries = (ours or stack)[-4:]
+    return " <- ".join(
+        f"{entry.name} ({entry.filename.rsplit('/', 1)[-1]}:{entry.lineno})" for entry in reversed(entries)
+    )
+
+
+class LoopMonitor:
+    """Measures how late the event loop wakes up a periodic sleeper.
+
+    A watchdog thread notices when the loop has not woken up in time and
+    captures the loop thread's stack while it is still blocked, so the
+    offending coroutine can be named once the loop recovers.
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        *,
+        interval: float,
+        stall_threshold: float,
+        alert_threshold: float,
+        alert_cooldown: float = 600.0,
+        history: int = 300,
+    ) -> None:
+        self.bot = bot
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.alert_threshold = alert_threshold
+        self.alert_cooldown = alert_cooldown
+
+        self._samples: Deque[float] = deque(maxlen=history)
+        self._slow: Deque[SlowCallback] = deque(maxlen=20)
+        self._deadline: float = 0.0
+        self._captured: Optional[Tuple[float, str]] = None
+        self._last_alert: Optional[float] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._alert_task: Optional[asyncio.Task[None]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    @property
+    def last_beat_age(self) -> float:
+        """Seconds the loop is overdue for its next sample (0 when on time)."""
+        return max(0.0, time.monotonic() - self._deadline) if self._deadline else 0.0
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._deadline = time.monotonic() + self.interval
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._thread = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._thread = None
+
+    def stats(self) -> LoopLagStats:
+        samples = list(self._samples)
+        return LoopLagStats(
+            last=samples[-1] if samples else 0.0,
+            average=sum(samples) / len(samples) if samples else 0.0,
+            peak=max(samples, default=0.0),
+            samples=len(samples),
+            slow_callbacks=tuple(self._slow),
+        )
+
+    def _watchdog(self) -> None:
+        poll = max(_MIN_POLL, min(self.interval, self.stall_threshold) / 2)
+        while not self._stopped.wait(poll):
+            deadline = self._deadline
+            if time.monotonic() - deadline < self.stall_threshold:
+                continue
+            if self._captured is not None and self._captured[0] == deadline:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._captured = (deadline, _describe_stack(frame))
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._deadline = time.monotonic() + self.interval
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._samples.append(lag)
+
+            if lag < self.stall_threshold:
+                continue
+
+            captured = self._captured
+            location = captured[1] if captured and captured[0] == self._deadline else "unknown (not captured)"
+            self._slow.append(SlowCallback(datetime.now(), lag, location))
+
+            now = time.monotonic()
+            if lag >= self.alert_threshold and (
+                self._last_alert is None or now - self._last_alert >= self.alert_cooldown
+            ):
+                self._last_alert = now
+                # Sent off the sampler: a slow admin DM must not stall the samples or /livez.
+                message = (
+                    f"Event loop blocked for {lag * 1000:.0f} ms (threshold {self.alert_threshold * 1000:.0f} ms).\n"
+                    f"Blocking code: {location}"
+                )
+                self._alert_task = loop.create_task(notify_admin(self.bot, message), name="loop lag alert")
+                track = getattr(self.bot, "track", None)
+                if track is not None:
+                    track(self._alert_task)
+
+
+def format_lag_summary(stats: LoopLagStats) -> List[str]:
+    lines = [
+        f"⏱ Задержка цикла: сейчас {stats.last * 1000:.0f} мс, "
+        f"средняя {stats.average * 1000:.0f} мс, максимум {stats.peak * 1000:.0f} мс "
+        f"(выборок: {stats.samples})"
+    ]
+    if stats.slow_callbacks:
+        slow = stats.slow_callbacks[-1]
+        lines.append(
+            f"🐢 Блокировок: {len(stats.slow_callbacks)}, последняя {slow.at:%H:%M:%S} — "
+            f"{slow.duration * 1000:.0f} мс в {slow.location}"
+        )
+    return lines
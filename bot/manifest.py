@@ -0,0 +1,75 @@
+"""Cog manifest: which cogs exist and what gateway data each of them needs."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Tuple
+
+import discord
+
+from config import DM_FORUM_CHANNEL_ID
+
+
+@dataclass(frozen=True)
+class CogSpec:
+    name: str
+    module: str
+    class_name: str
+    intents: Tuple[str, ...] = ()
+    chunk_members: bool = False
+    message_cache: bool = False
+    required: bool = False
+
+
+COG_MANIFEST: Tuple[CogSpec, ...] = (
+    CogSpec("misc", "bot.cogs.misc", "MiscCog", intents=("voice_states",)),
+    CogSpec("boosters", "bot.cogs.boosters", "BoostersCog", intents=("members",), chunk_members=True),
+    CogSpec("voice", "bot.cogs.voice", "VoiceCog", intents=("voice_states",)),
+    CogSpec(
+        "tracking",
+        "bot.cogs.tracking",
+        "TrackingCog",
+        intents=("members", "presences"),
+        chunk_members=True,
+    ),
+    CogSpec(
+        "dm_relay",
+        "bot.cogs.dm_relay",
+        "DmRelayCog",
+        # Forum mode also reads staff replies in the forum's threads.
+        intents=("dm_messages", "message_content") + (("guild_messages",) if DM_FORUM_CHANNEL_ID else ()),
+    ),
+    CogSpec(
+        "target_game",
+        "bot.cogs.target_game",
+        "TargetGameCog",
+        intents=("guild_messages", "message_content"),
+    ),
+    CogSpec("diagnostics", "bot.cogs.diagnostics", "DiagnosticsCog"),
+    CogSpec("error_handlers", "bot.cogs.error_handlers", "ErrorHandlerCog", required=True),
+)
+
+
+def select_cogs(enabled: Iterable[str]) -> Tuple[CogSpec, ...]:
+    """Return the manifest entries to load; an empty selection means every cog."""
+    wanted = {name.strip().lower() for name in enabled if name.strip()}
+    if not wanted:
+        return COG_MANIFEST
+
+    known = {spec.name for spec in COG_MANIFEST}
+    unknown = sorted(wanted - known)
+    if unknown:
+        raise RuntimeError(
+            f"Unknown cogs in ENABLED_COGS: {', '.join(unknown)}. Available: {', '.join(sorted(known))}."
+        )
+    return tuple(spec for spec in COG_MANIFEST if spec.required or spec.name in wanted)
+
+
+def compute_intents(specs: Iterable[CogSpec]) -> discord.Intents:
+    """Build the smallest intent set that satisfies every selected cog."""
+    intents = discord.Intents.none()
+    intents.guilds = True
+    for spec in specs:
+        for flag in spec.intents:
+            setattr(intents, flag, True)
+    return intents
@@ -0,0 +1,185 @@
+"""In-memory caches for files the bot sends repeatedly."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import hashlib
+import io
+from pathlib import Path
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import discord
+
+# Discord accepts at most 10 attachments per message.
+MAX_FILES_PER_MESSAGE = 10
+# Payloads above this are hashed off the event loop.
+_HASH_INLINE_BYTES = 1 << 20
+
+ContentKey = Tuple[int, str]
+
+
+def content_key(data: bytes) -> ContentKey:
+    return len(data), hashlib.sha256(data).hexdigest()
+
+
+class AttachmentCache:
+    """Content-addressed file bytes, least recently used evicted past ``max_bytes``.
+
+    Payloads are stored once per ``(size, sha256)``. Sources – Discord
+    attachment IDs, local files at a given mtime – point at them, so fetching
+    a known source again skips the download or read, and identical files from
+    different sources share one copy. Methods are thread-safe so
+    ``ImageCache.load`` can use the cache from a worker thread.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Bytes not downloaded or read again thanks to a hit.
+        self.bytes_saved = 0
+        # Bytes of fetched payloads that were already stored under another source.
+        self.bytes_deduplicated = 0
+        # Fetches that waited on a download already in flight for the same source.
+        self.coalesced = 0
+        self._entries: "OrderedDict[ContentKey, bytes]" = OrderedDict()
+        self._sources: Dict[Hashable, ContentKey] = {}
+        self._sources_by_key: Dict[ContentKey, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        # Only touched from the event loop, by ``fetch``.
+        self._inflight: Dict[Hashable, "asyncio.Task[bytes]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, source: Hashable) -> Optional[bytes]:
+        with self._lock:
+            key = self._sources.get(source)
+            data = self._entries.get(key) if key is not None else None
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += len(data)
+            return data
+
+    def put(self, source: Hashable, data: bytes, key: Optional[ContentKey] = None) -> bytes:
+        """Store ``data`` for ``source``; returns the cached copy when the content was already known."""
+        key = key or content_key(data)
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                self.bytes_deduplicated += len(data)
+                data = existing
+            elif len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self.size += len(data)
+                while self.size > self.max_bytes:
+                    self._evict()
+            else:
+                return data
+            previous = self._sources.get(source)
+            if previous is not None and previous != key:
+                self._sources_by_key.get(previous, set()).discard(source)
+            self._sources[source] = key
+            self._sources_by_key.setdefault(key, set()).add(source)
+            return data
+
+    def _evict(self) -> None:
+        key, data = self._entries.popitem(last=False)
+        self.size -= len(data)
+        for source in self._sources_by_key.pop(key, ()):
+            self._sources.pop(source, None)
+
+    async def fetch(self, source: Hashable, download: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = self.get(source)
+        if data is not None:
+            return data
+        task = self._inflight.get(source)
+        if task is None:
+            task = self._inflight[source] = asyncio.get_running_loop().create_task(self._download(source, download))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the download other callers share.
+        return await asyncio.shield(task)
+
+    async def _download(self, source: Hashable, download: Callable[[], Awaitable[bytes]]) -> bytes:
+        try:
+            data = await download()
+            if len(data) > _HASH_INLINE_BYTES:
+                return self.put(source, data, await asyncio.to_thread(content_key, data))
+            return self.put(source, data)
+        finally:
+            self._inflight.pop(source, None)
+
+    async def attachment(self, attachment: discord.Attachment) -> Tuple[str, bytes]:
+        """``(filename, bytes)`` of a Discord attachment; its ID is the source, as attachments never change."""
+        return attachment.filename, await self.fetch(("attachment", attachment.id), attachment.read)
+
+    def stats_line(self) -> str:
+        return (
+            f"Кэш вложений: {len(self)} файлов, {self.size / 1024:.1f} из {self.max_bytes / 1024:.0f} KiB, "
+            f"попаданий {self.hit_rate:.0%} ({self.hits}/{self.hits + self.misses}), "
+            f"сэкономлено {self.bytes_saved / 1024:.1f} KiB, дубликатов {self.bytes_deduplicated / 1024:.1f} KiB, "
+            f"объединено загрузок {self.coalesced}"
+        )
+
+
+class ImageCache:
+    """The images in a directory, read through an ``AttachmentCache``.
+
+    A file is re-read only when its mtime or size changes or its bytes were
+    evicted. ``load`` does blocking file I/O; call it through ``asyncio.to_thread``.
+    """
+
+    def __init__(self, directory: Path, cache: AttachmentCache, pattern: str = "*.png") -> None:
+        self.directory = directory
+        self.cache = cache
+        self.pattern = pattern
+        self._dir_mtime: Optional[int] = None
+        self._paths: List[Path] = []
+
+    def load(self, limit: int = MAX_FILES_PER_MESSAGE) -> List[Tuple[str, bytes]]:
+        try:
+            dir_mtime = self.directory.stat().st_mtime_ns
+        except OSError:
+            self._dir_mtime = None
+            self._paths = []
+            return []
+
+        if dir_mtime != self._dir_mtime:
+            self._paths = sorted(self.directory.glob(self.pattern))
+            self._dir_mtime = dir_mtime
+
+        images: List[Tuple[str, bytes]] = []
+        for path in self._paths:
+            if len(images) >= limit:
+                break
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            source = ("file", str(path), stat.st_mtime_ns, stat.st_size)
+            data = self.cache.get(source)
+            if data is None:
+                try:
+                    data = self.cache.put(source, path.read_bytes())
+                except OSError:
+                    continue
+            images.append((path.name, data))
+        return images
+
+
+def files_from_bytes(items: List[Tuple[str, bytes]]) -> List[discord.File]:
+    """Build fresh ``discord.File`` objects; they are consumed by each send."""
+    return [discord.File(io.BytesIO(data), filename=name) for name, data in items]
@@ -0,0 +1,163 @@
+"""Runtime memory diagnostics: tracemalloc snapshot diffs and cache sizes."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sized
+from dataclasses import dataclass
+import sys
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from discord.ext import commands
+
+# Allocations made by the diagnostics themselves are noise in every diff.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass(frozen=True)
+class ContainerSize:
+    name: str
+    length: int
+    nested: int
+    shallow_bytes: int
+
+
+@dataclass(frozen=True)
+class AllocationSite:
+    location: str
+    size_diff: int
+    size: int
+    count_diff: int
+
+
+def _container_size(name: str, value: Sized) -> ContainerSize:
+    values = value.values() if isinstance(value, Mapping) else value
+    nested = 0
+    try:
+        for item in values:
+            if isinstance(item, Sized) and not isinstance(item, (str, bytes)):
+                nested += len(item)
+    except TypeError:
+        pass
+    return ContainerSize(name, len(value), nested, sys.getsizeof(value))
+
+
+def cog_containers(bot: commands.Bot) -> List[ContainerSize]:
+    """Size every container attribute held by a loaded cog."""
+    sizes = []
+    for cog_name, cog in sorted(bot.cogs.items()):
+        for attr, value in vars(cog).items():
+            if attr == "bot" or attr.startswith("__") or isinstance(value, (str, bytes)) or not isinstance(value, Sized):
+                continue
+            try:
+                sizes.append(_container_size(f"{cog_name}.{attr}", value))
+            except TypeError:
+                continue
+    return sizes
+
+
+def discord_caches(bot: commands.Bot) -> List[ContainerSize]:
+    """Size discord.py's connection-state caches, summing per-guild caches."""
+    state = bot._connection
+    guilds = list(state._guilds.values())
+    sizes = [
+        _container_size("state._guilds", state._guilds),
+        _container_size("state._users", state._users),
+        _container_size("state._emojis", state._emojis),
+        _container_size("state._stickers", state._stickers),
+        _container_size("state._private_channels", state._private_channels),
+        _container_size("state._voice_clients", state._voice_clients),
+        _container_size("state._view_store._views", state._view_store._views),
+    ]
+    if state._messages is not None:
+        sizes.append(_container_size("state._messages", state._messages))
+    for attr in ("_members", "_channels", "_roles", "_threads"):
+        containers = [getattr(guild, attr) for guild in guilds]
+        sizes.append(
+            ContainerSize(
+                f"guild.{attr} (Σ)",
+                sum(len(container) for container in containers),
+                0,
+                sum(sys.getsizeof(container) for container in containers),
+            )
+        )
+    return sizes
+
+
+class MemoryTracker:
+    """Holds tracemalloc snapshots so later ones can be diffed against them."""
+
+    def __init__(self) -> None:
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self.previous_containers: Dict[str, int] = {}
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        """Start tracing (blocking: also takes the baseline snapshot)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = self.previous = self._take()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.baseline = self.previous = None
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def snapshot_diff(self, top: int, *, against_baseline: bool = False) -> List[AllocationSite]:
+        """Take a snapshot and diff it against the previous one (blocking)."""
+        snapshot = self._take()
+        reference = self.baseline if against_baseline else self.previous
+        self.previous = snapshot
+        if reference is None:
+            self.baseline = snapshot
+            return []
+        key = "traceback" if tracemalloc.get_traceback_limit() > 1 else "lineno"
+        sites = []
+        for stat in snapshot.compare_to(reference, key)[:top]:
+            frame = stat.traceback[0]
+            sites.append(AllocationSite(f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.size, stat.count_diff))
+        return sites
+
+    def container_deltas(self, sizes: List[ContainerSize]) -> Dict[str, int]:
+        """Item-count change per container since the previous call."""
+        current = {size.name: size.length + size.nested for size in sizes}
+        deltas = {name: count - self.previous_containers.get(name, count) for name, count in current.items()}
+        self.previous_containers = current
+        return deltas
+
+
+def _kib(value: int) -> str:
+    return f"{value / 1024:.1f} KiB"
+
+
+def format_memory_report(
+    sites: List[AllocationSite],
+    containers: List[ContainerSize],
+    deltas: Dict[str, int],
+    traced: Optional[Tuple[int, int]],
+) -> str:
+    lines = []
+    if traced is not None:
+        current, peak = traced
+        lines.append(f"tracemalloc: {current / 1048576:.1f} MiB сейчас, пик {peak / 1048576:.1f} MiB")
+    if sites:
+        lines.append("Рост по местам выделения:")
+        for site in sites:
+            lines.append(f"  {site.size_diff / 1024:+10.1f} KiB ({site.count_diff:+d} блоков)  {site.location}")
+    lines.append("Контейнеры (элементов / вложенных / размер самого контейнера):")
+    for size in containers:
+        delta = deltas.get(size.name, 0)
+        change = f"  {delta:+d}" if delta else ""
+        lines.append(f"  {size.name:42} {size.length:8d} {size.nested:8d} {_kib(size.shallow_bytes):>12}{change}")
+    return "\n".join(lines)
@@ -0,0 +1,162 @@
+"""Presence helpers shared by the tracking features."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, FrozenSet, Iterable, Optional, Set
+
+import discord
+
+
+class PresenceDebouncer:
+    """Settle bursts of desired presence changes into rate-limited updates.
+
+    A new status only reaches the gateway after it has stayed unchanged for
+    ``settle_seconds``; intermediate flips are coalesced and counted as
+    suppressed. At most ``budget`` updates are sent per ``window`` seconds.
+    ``apply`` returns whether the update reached the gateway.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[discord.Status], Awaitable[bool]],
+        *,
+        settle_seconds: float,
+        budget: int,
+        window: float,
+    ) -> None:
+        self._apply = apply
+        self.settle_seconds = max(0.0, settle_seconds)
+        self.budget = max(1, budget)
+        self.window = max(0.0, window)
+
+        self.applied: Optional[discord.Status] = None
+        self._desired: Optional[discord.Status] = None
+        self._changed_at: float = 0.0
+        self._pending: int = 0
+        self._immediate: bool = False
+        self._sent: Deque[float] = deque()
+        self._task: Optional[asyncio.Task[None]] = None
+
+        self.applied_count: int = 0
+        self.suppressed_count: int = 0
+        self.throttled_count: int = 0
+
+    @property
+    def pending(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, status: discord.Status, *, immediate: bool = False) -> None:
+        """Record the latest desired status; ``immediate`` skips the settle window."""
+        if not self.pending and status == self.applied:
+            return
+        loop = asyncio.get_running_loop()
+        self._desired = status
+        self._changed_at = loop.time()
+        self._pending += 1
+        self._immediate = self._immediate or immediate
+        if not self.pending:
+            self._task = loop.create_task(self._run())
+
+    def reset(self) -> None:
+        """Forget the applied status and drop any pending change."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.applied = None
+        self._desired = None
+        self._pending = 0
+        self._immediate = False
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if not self._immediate:
+                remaining = self._changed_at + self.settle_seconds - loop.time()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+
+            now = loop.time()
+            while self._sent and now - self._sent[0] >= self.window:
+                self._sent.popleft()
+            if len(self._sent) >= self.budget:
+                self.throttled_count += 1
+                await asyncio.sleep(self._sent[0] + self.window - now)
+                continue
+
+            desired, pending = self._desired, self._pending
+            self._pending = 0
+            self._immediate = False
+            if desired is None or desired == self.applied:
+                self.suppressed_count += pending
+                continue
+
+            self.suppressed_count += pending - 1
+            self._sent.append(loop.time())
+            if await self._apply(desired):
+                self.applied = desired
+                self.applied_count += 1
+
+
+class PresenceAggregate:
+    """Online state of a set of tracked users, maintained incrementally.
+
+    ``update`` is O(1) per presence event; the rule is evaluated from the
+    maintained online count instead of rescanning members.
+    """
+
+    RULES = ("any", "all")
+
+    def __init__(self, user_ids: Iterable[int], rule: str = "any") -> None:
+        if rule not in self.RULES:
+            raise ValueError(f"Unknown tracking rule {rule!r}; expected one of {', '.join(self.RULES)}.")
+        self.rule = rule
+        self.tracked: Set[int] = set(user_ids)
+        self._online: Set[int] = set()
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self.tracked
+
+    def __len__(self) -> int:
+        return len(self.tracked)
+
+    @property
+    def online_count(self) -> int:
+        return len(self._online)
+
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self._online
+
+    def update(self, user_id: int, online: bool) -> None:
+        if user_id not in self.tracked:
+            return
+        if online:
+            self._online.add(user_id)
+        else:
+            self._online.discard(user_id)
+
+    def add(self, user_id: int, online: bool = False) -> None:
+        self.tracked.add(user_id)
+        self.update(user_id, online)
+
+    def remove(self, user_id: int) -> None:
+        self.tracked.discard(user_id)
+        self._online.discard(user_id)
+
+    def clear_online(self) -> None:
+        self._online.clear()
+
+    @property
+    def online(self) -> FrozenSet[int]:
+        return frozenset(self._online)
+
+    def is_satisfied(self, online: Optional[Iterable[int]] = None) -> bool:
+        """Evaluate the rule on the maintained state, or on ``online`` (e.g. merged from other processes)."""
+        if not self.tracked:
+            return False
+        online_count = self.online_count if online is None else len(self.tracked.intersection(online))
+        if self.rule == "any":
+            return online_count > 0
+        return online_count == len(self.tracked)
@@ -0,0 +1,299 @@
+"""On-demand profiling of commands, listeners or the whole event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+from collections import Counter
+from datetime import datetime
+import functools
+import io
+import os
+from pathlib import Path
+import pstats
+import sys
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Generator, List, Optional, Tuple
+
+from discord.ext import commands
+
+MODES = ("deterministic", "sampling")
+
+
+class StackSampler:
+    """Samples the event-loop thread's stack from a helper thread.
+
+    Samples are only kept while ``active`` is set, so a sampler can follow a
+    single coroutine across its await points. Stacks are stored in the folded
+    ``frame;frame;frame count`` format understood by flamegraph tools.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.002) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.active = False
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.samples[";".join(reversed(names))] += 1
+
+    def write(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+    def summary(self, top: int) -> List[str]:
+        total = sum(self.samples.values())
+        if not total:
+            return ["Нет выборок."]
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        lines = [f"Выборок: {total} (интервал {self.interval * 1000:.0f} мс)", "Собственное время:"]
+        lines += [f"{count * 100 / total:5.1f}%  {frame}" for frame, count in own.most_common(top)]
+        lines.append("Включая вызовы:")
+        lines += [f"{count * 100 / total:5.1f}%  {frame}" for frame, count in inclusive.most_common(top)]
+        return lines
+
+
+class _Stepped:
+    """Awaitable that switches profiling on only while ``coro`` itself runs."""
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], on: Callable[[], None], off: Callable[[], None]) -> None:
+        self._coro = coro
+        self._on = on
+        self._off = off
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        coro = self._coro
+        send_value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            self._on()
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(send_value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self._off()
+            try:
+                send_value = yield yielded
+                error = None
+            except BaseException as exc:  # propagate cancellation and errors into the coroutine
+                send_value = None
+                error = exc
+
+
+class _ProfiledListener:
+    """Listener wrapper that compares equal to the listener it wraps.
+
+    ``Bot.remove_listener`` (cog unload, ``/reload``) finds the cog's entry
+    by equality, so it still removes it while a profile is attached.
+    """
+
+    def __init__(
+        self,
+        original: Callable[..., Coroutine[Any, Any, Any]],
+        wrapped: Callable[..., Coroutine[Any, Any, Any]],
+    ) -> None:
+        functools.update_wrapper(self, original)
+        self.original = original
+        self._wrapped = wrapped
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Coroutine[Any, Any, Any]:
+        return self._wrapped(*args, **kwargs)
+
+    def __eq__(self, other: object) -> bool:
+        return other is self or self.original == other
+
+    def __hash__(self) -> int:
+        return hash(self.original)
+
+
+class ProfileSession:
+    """Profiles the next ``count`` invocations of a target, or a time window."""
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        *,
+        target: Optional[str],
+        mode: str,
+        count: int,
+        output_dir: Path,
+        on_complete: Callable[["ProfileSession"], Awaitable[None]],
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}.")
+        self.bot = bot
+        self.target = target
+        self.mode = mode
+        self.count = max(1, count)
+        self.output_dir = output_dir
+        self.invocations = 0
+        self.started_at = datetime.now()
+        self.output_path: Optional[Path] = None
+        self._on_complete = on_complete
+        self._restore: List[Callable[[], None]] = []
+        self._finished = False
+        self._done = asyncio.Event()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        if mode == "deterministic":
+            self._profiler = cProfile.Profile()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def _on(self) -> None:
+        if self._profiler is not None:
+            self._profiler.enable()
+        elif self._sampler is not None:
+            self._sampler.active = True
+
+    def _off(self) -> None:
+        if self._profiler is not None:
+            self._profiler.disable()
+        elif self._sampler is not None:
+            self._sampler.active = False
+
+    def attach(self) -> int:
+        """Wrap every command/listener called ``target``; returns how many were wrapped."""
+        assert self.target is not None
+        name = self.target.lstrip("/!")
+        wrapped = 0
+
+        found: Dict[int, Any] = {}
+        for guild in [None, *self.bot.guilds]:
+            for command in self.bot.tree.walk_commands(guild=guild):
+                found[id(command)] = command
+        prefix_command = self.bot.get_command(name)
+        if prefix_command is not None:
+            found[id(prefix_command)] = prefix_command
+        for command in found.values():
+            if getattr(command, "qualified_name", None) != name:
+                continue
+            original = command._callback
+            command._callback = self._wrap(original)
+            self._restore.append(functools.partial(setattr, command, "_callback", original))
+            wrapped += 1
+
+        listeners = self.bot.extra_events.get(name if name.startswith("on_") else f"on_{name}", [])
+        for index, original in enumerate(list(listeners)):
+            wrapper = _ProfiledListener(original, self._wrap(original))
+            listeners[index] = wrapper
+
+            def restore(wrapper: _ProfiledListener = wrapper, listeners: list = listeners) -> None:
+                # By identity: a reload may have removed or reordered the entries meanwhile.
+                for position, listener in enumerate(listeners):
+                    if listener is wrapper:
+                        listeners[position] = wrapper.original
+                        return
+
+            self._restore.append(restore)
+            wrapped += 1
+        return wrapped
+
+    def _wrap(self, func: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
+        @functools.wraps(func)
+        async def profiled(*args: Any, **kwargs: Any) -> Any:
+            if self._finished:
+                return await func(*args, **kwargs)
+            try:
+                return await _Stepped(func(*args, **kwargs), self._on, self._off)
+            finally:
+                self.invocations += 1
+                if self.invocations >= self.count and not self._finished:
+                    asyncio.get_running_loop().create_task(self.finish())
+
+        return profiled
+
+    async def run_window(self, seconds: float) -> None:
+        """Profile everything the event loop runs for ``seconds``, or until cancelled."""
+        self._on()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._off()
+        await self.finish()
+
+    async def cancel(self) -> None:
+        self._finished = True
+        self._done.set()
+        for restore in self._restore:
+            restore()
+        self._restore.clear()
+        if self._sampler is not None:
+            await asyncio.to_thread(self._sampler.stop)
+
+    async def finish(self) -> None:
+        if self._finished:
+            return
+        await self.cancel()
+        label = (self.target or "loop").lstrip("/!").replace("/", "_") or "loop"
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S")
+        suffix = "prof" if self._profiler is not None else "folded"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_path = self.output_dir / f"{stamp}-{label}.{suffix}"
+        if self._profiler is not None:
+            await asyncio.to_thread(self._profiler.dump_stats, str(self.output_path))
+        elif self._sampler is not None:
+            await asyncio.to_thread(self._sampler.write, self.output_path)
+        await self._on_complete(self)
+
+    def summary(self, top: int = 15) -> str:
+        if self._sampler is not None:
+            lines = self._sampler.summary(top)
+        elif self._profiler is not None:
+            lines = _pstats_summary(self._profiler, top)
+        else:
+            lines = []
+        return "\n".join(lines)
+
+
+def _pstats_summary(profiler: cProfile.Profile, top: int) -> List[str]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows: List[Tuple[float, float, int, str]] = []
+    for (filename, lineno, func), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append((cumtime, tottime, ncalls, f"{func} ({os.path.basename(filename)}:{lineno})"))
+    if not rows:
+        return ["Нет данных."]
+    lines = ["   cum ms   own ms   calls  function"]
+    for cumtime, tottime, ncalls, label in sorted(rows, reverse=True)[:top]:
+        lines.append(f"{cumtime * 1000:9.2f} {tottime * 1000:8.2f} {ncalls:7d}  {label}")
+    return lines
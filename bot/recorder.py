@@ -0,0 +1,196 @@
+"""Opt-in capture of dispatched gateway events for offline replay.
+
+Each captured event is one JSON line ``[unix_time, event_type, payload]`` in a
+gzip file. The event loop only queues the payload once discord.py has parsed
+it; scrubbing, encoding, compression and file I/O happen on a background
+thread.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+CapturedEvent = Tuple[float, str, Dict[str, Any]]
+
+# Free text written by users; replaced by a same-length placeholder.
+_TEXT_KEYS = frozenset({"content", "topic", "bio", "state", "details", "description", "title", "filename"})
+# Channel types whose name is user text: threads and forum posts (DM ticket threads carry usernames).
+_THREAD_TYPES = frozenset({10, 11, 12})
+_DROP_KEYS = frozenset({"email", "phone", "token", "ip", "avatar_decoration_data", "banner", "embeds"})
+_USER_KEYS = frozenset({"user", "author", "member", "inviter", "target_user"})
+_USER_LIST_KEYS = frozenset({"recipients", "mentions", "members"})
+# Per-guild member profile fields, cleared wherever a member object appears.
+_MEMBER_PROFILE_KEYS = ("nick", "avatar")
+_URL_KEYS = frozenset({"url", "proxy_url"})
+
+
+def _pseudonym(value: Any) -> str:
+    return "u" + hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:10]
+
+
+def _scrub_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    scrubbed = scrub(user)
+    if "username" in scrubbed:
+        scrubbed["username"] = _pseudonym(user.get("id", user["username"]))
+    for key in ("global_name", *_MEMBER_PROFILE_KEYS):
+        if scrubbed.get(key) is not None:
+            scrubbed[key] = None
+    return scrubbed
+
+
+def _is_member(value: Dict[str, Any]) -> bool:
+    # GUILD_MEMBER_ADD/UPDATE payloads and embedded members: a user plus guild membership fields.
+    return isinstance(value.get("user"), dict) and ("roles" in value or "joined_at" in value)
+
+
+def scrub(value: Any) -> Any:
+    """Copy a gateway payload with user-identifying text removed; IDs are kept."""
+    if isinstance(value, dict):
+        result = {}
+        # Thread names and attachment names are user text; role, channel and guild names are kept.
+        user_named = value.get("type") in _THREAD_TYPES or "filename" in value
+        for key, item in value.items():
+            if key in _DROP_KEYS:
+                continue
+            if (key in _TEXT_KEYS or (user_named and key == "name")) and isinstance(item, str):
+                result[key] = "x" * len(item)
+            elif key in _URL_KEYS and isinstance(item, str):
+                result[key] = "https://cdn.invalid/scrubbed"
+            elif key in _USER_KEYS and isinstance(item, dict):
+                result[key] = _scrub_user(item)
+            elif key in _USER_LIST_KEYS and isinstance(item, list):
+                result[key] = [_scrub_user(user) if isinstance(user, dict) else user for user in item]
+            else:
+                result[key] = scrub(item)
+        if _is_member(value):
+            for key in _MEMBER_PROFILE_KEYS:
+                if result.get(key) is not None:
+                    result[key] = None
+        return result
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+class EventRecorder:
+    """Buffers dispatched events and appends them to a rotating gzip capture."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_bytes: int,
+        backups: int,
+        queue_size: int = 10000,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[CapturedEvent]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def install(self, parsers: Dict[str, Callable[[Any], None]]) -> None:
+        """Wrap discord.py's gateway parsers so every event is captured before it is handled."""
+        for event_type, parser in list(parsers.items()):
+            parsers[event_type] = self._wrap(event_type, parser)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="event-recorder", daemon=True)
+            self._thread.start()
+
+    def _wrap(self, event_type: str, parser: Callable[[Any], None]) -> Callable[[Any], None]:
+        def recorded(data: Any) -> None:
+            received = time.time()
+            try:
+                parser(data)
+            finally:
+                # Queued after the parser so its in-place changes are done before the writer reads it.
+                try:
+                    self._queue.put_nowait((received, event_type, data))
+                except queue.Full:
+                    self.dropped += 1
+
+        return recorded
+
+    def close(self) -> None:
+        """Flush buffered events and stop the writer thread (blocking)."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def _writer(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = gzip.open(self.path, "ab")
+        try:
+            running = True
+            while running:
+                batch: List[CapturedEvent] = []
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                    while True:
+                        if item is None:
+                            running = False
+                            break
+                        batch.append(item)
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+                lines = []
+                for timestamp, event_type, data in batch:
+                    try:
+                        event = [timestamp, event_type, scrub(data)]
+                        lines.append(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+                    except RuntimeError:
+                        # A handler changed the payload while it was being copied.
+                        self.dropped += 1
+                if lines:
+                    fh.write(("\n".join(lines) + "\n").encode("utf-8"))
+                    fh.flush()
+                    self.recorded += len(lines)
+
+                if self.path.stat().st_size >= self.max_bytes:
+                    fh.close()
+                    self._rotate()
+                    fh = gzip.open(self.path, "ab")
+        finally:
+            fh.close()
+
+
+def read_capture(path: Path) -> Iterator[CapturedEvent]:
+    """Yield events from a capture, tolerating a truncated tail from a crash."""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        try:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    timestamp, event_type, data = json.loads(line)
+                except ValueError:
+                    return
+                yield float(timestamp), event_type, data
+        except EOFError:
+            return
@@ -0,0 +1,55 @@
+"""Opt-in fast runtime: uvloop for the event loop.
+
+uvloop is an optional dependency; without it the bot runs on asyncio exactly
+as before. Gateway JSON is left to discord.py, which already decodes with
+orjson whenever it is installed, so there is nothing to swap there.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+import discord
+
+JsonLoads = Callable[[Any], Any]
+
+
+@dataclass(frozen=True)
+class RuntimeProfile:
+    loop: str
+    json: str
+
+    def describe(self) -> str:
+        return f"event loop: {self.loop}, JSON: {self.json}"
+
+
+def gateway_json() -> Tuple[str, JsonLoads]:
+    """The decoder discord.py already uses for gateway frames: orjson when installed, else the stdlib."""
+    return ("orjson" if discord.utils.HAS_ORJSON else "json (stdlib)"), discord.utils._from_json
+
+
+def fast_loop_factory() -> Optional[Tuple[str, Callable[[], asyncio.AbstractEventLoop]]]:
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return f"uvloop {uvloop.__version__}", uvloop.new_event_loop
+
+
+def install_runtime(fast: bool) -> RuntimeProfile:
+    """Run on uvloop when ``fast`` is set and it is installed; call before the event loop starts.
+
+    The JSON decoder is reported, not changed: discord.py picks orjson on its own.
+    """
+    json_name = gateway_json()[0]
+    if not fast:
+        return RuntimeProfile("asyncio", json_name)
+
+    try:
+        import uvloop
+    except ImportError:
+        return RuntimeProfile("asyncio (uvloop not installed)", json_name)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return RuntimeProfile(f"uvloop {uvloop.__version__}", json_name)
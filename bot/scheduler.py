@@ -0,0 +1,242 @@
+"""Central timer scheduler: one heap and one task for every delayed action."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import heapq
+import json
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from discord.ext import commands
+
+from .storage import PersistentMap
+from .utils import notify_admin
+
+STORE_NAMESPACE = "scheduler.timers"
+
+TimerCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# A persisted timer whose handler is not registered yet (its cog is still
+# loading or being reloaded) is retried after this many seconds.
+_UNHANDLED_RETRY = 30.0
+
+
+@dataclass
+class Timer:
+    key: str
+    kind: str
+    due: float  # loop time
+    payload: Dict[str, Any]
+    persist: bool
+    cancelled: bool = False
+
+
+class TimerHandle:
+    """What ``schedule`` returns; ``cancel()`` drops the timer if it is still pending."""
+
+    def __init__(self, scheduler: "TimerScheduler", timer: Timer) -> None:
+        self._scheduler = scheduler
+        self._timer = timer
+
+    @property
+    def key(self) -> str:
+        return self._timer.key
+
+    @property
+    def pending(self) -> bool:
+        return self._scheduler._timers.get(self._timer.key) is self._timer
+
+    def cancel(self) -> bool:
+        if not self.pending:
+            return False
+        return self._scheduler.cancel(self._timer.key)
+
+
+class TimerScheduler:
+    """Keyed timers on a binary heap, fired by a single task.
+
+    Handlers are registered per timer ``kind`` with ``on``; a timer carries a
+    JSON-serialisable payload for its handler. Scheduling a key that is
+    already pending coalesces: the new deadline replaces the old one, or the
+    earlier one is kept when ``replace=False``. Cancelled and replaced entries
+    stay in the heap and are skipped when they surface. Timers scheduled with
+    ``persist=True`` are kept in the state store (with wall-clock deadlines)
+    and restored on start; ones that came due while the bot was down fire
+    right after the gateway is ready. Cluster workers share the store, so each
+    restores only the timers it owns: those whose payload has a ``guild_id``
+    on one of its shards, and every other timer on the primary.
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.fired = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self._handlers: Dict[str, TimerCallback] = {}
+        self._timers: Dict[str, Timer] = {}
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._seq = 0
+        # Cancelled or replaced entries still in the heap.
+        self._dead = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def on(self, kind: str, handler: TimerCallback) -> None:
+        self._handlers[kind] = handler
+
+    def off(self, kind: str) -> None:
+        self._handlers.pop(kind, None)
+
+    def _table(self) -> PersistentMap[str, str]:
+        return self.bot.store.table(STORE_NAMESPACE, str, str)
+
+    def load(self) -> None:
+        """Restore persisted timers; call once the state store is open."""
+        loop_now = asyncio.get_running_loop().time()
+        wall_now = time.time()
+        for key, encoded in self._table().items():
+            try:
+                data = json.loads(encoded)
+                timer = Timer(key, data["kind"], loop_now + data["due"] - wall_now, data.get("payload") or {}, True)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if self._owns(timer):
+                self._push(timer)
+
+    def _owns(self, timer: Timer) -> bool:
+        cluster = getattr(self.bot, "cluster", None)
+        if cluster is None:
+            return True
+        guild_id = timer.payload.get("guild_id")
+        return cluster.info.owns_guild(guild_id) if isinstance(guild_id, int) else cluster.info.primary
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(
+        self,
+        kind: str,
+        key: str,
+        delay: float,
+        payload: Optional[Dict[str, Any]] = None,
+        *,
+        replace: bool = True,
+        persist: bool = False,
+    ) -> TimerHandle:
+        """Run ``kind``'s handler with ``payload`` after ``delay`` seconds."""
+        existing = self._timers.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            if not replace:
+                return TimerHandle(self, existing)
+            existing.cancelled = True
+            self._dead += 1
+        timer = Timer(key, kind, asyncio.get_running_loop().time() + max(0.0, delay), dict(payload or {}), persist)
+        self._push(timer)
+        if persist:
+            self._table()[key] = json.dumps(
+                {"kind": kind, "due": time.time() + max(0.0, delay), "payload": timer.payload}, ensure_ascii=False
+            )
+        elif existing is not None and existing.persist:
+            self._table().pop(key, None)
+        return TimerHandle(self, timer)
+
+    def cancel(self, key: str) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        self._dead += 1
+        self.cancelled += 1
+        if timer.persist:
+            self._table().pop(key, None)
+        return True
+
+    def pending(self, key: str) -> Optional[Timer]:
+        return self._timers.get(key)
+
+    def _push(self, timer: Timer) -> None:
+        if self._dead > len(self._timers) + 1024:
+            # Long timers replaced over and over (expiry pushed out on every
+            # message) would otherwise pile up until their old deadlines pass.
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._dead = 0
+        self._timers[timer.key] = timer
+        self._seq += 1
+        heapq.heappush(self._heap, (timer.due, self._seq, timer))
+        # Wake the runner only when this timer is now the earliest one.
+        if self._wakeup is not None and self._heap[0][2] is timer:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        await self.bot.wait_until_ready()
+        loop = asyncio.get_running_loop()
+        while True:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+                self._dead = max(0, self._dead - 1)
+            if not self._heap:
+                timeout = None
+            else:
+                timeout = self._heap[0][0] - loop.time()
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, timer = heapq.heappop(self._heap)
+            self._fire(timer)
+
+    def _fire(self, timer: Timer) -> None:
+        handler = self._handlers.get(timer.kind)
+        if handler is None:
+            if timer.persist:
+                timer.due = asyncio.get_running_loop().time() + _UNHANDLED_RETRY
+                self._seq += 1
+                heapq.heappush(self._heap, (timer.due, self._seq, timer))
+            else:
+                self._timers.pop(timer.key, None)
+                print(f"Timer {timer.key!r} dropped: no handler for {timer.kind!r}.")
+            return
+        self._timers.pop(timer.key, None)
+        if timer.persist:
+            self._table().pop(timer.key, None)
+        self.fired += 1
+        task = asyncio.get_running_loop().create_task(self._call(handler, timer), name=f"timer: {timer.key}")
+        track = getattr(self.bot, "track", None)
+        if track is not None:
+            track(task)
+
+    async def _call(self, handler: TimerCallback, timer: Timer) -> None:
+        try:
+            await handler(timer.payload)
+        except Exception:
+            await notify_admin(self.bot, f"Timer {timer.key!r} ({timer.kind}) failed:\n{traceback.format_exc()}")
+
+    def stats_line(self) -> str:
+        return (
+            f"Таймеры: ожидают {len(self._timers)} (в куче {len(self._heap)}), сработало {self.fired}, "
+            f"объединено {self.coalesced}, отменено {self.cancelled}"
+        )
@@ -0,0 +1,106 @@
+"""Hot reload of ``BotSettings`` from ``.env`` without reconnecting."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from pathlib import Path
+import traceback
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from discord.ext import commands
+
+from config import reloaded_environ, settings_from_env
+
+from .utils import notify_admin
+
+# GUILD_ID is the default for GUILD_IDS, which slash commands are registered for at import time.
+RESTART_FIELDS = frozenset({"guild_id"})
+_ID_FIELDS = ("admin_user_id", "guild_id", "boost_report_channel_id")
+
+
+def _validate(values: Dict[str, Any]) -> None:
+    for field in _ID_FIELDS:
+        if values[field] <= 0:
+            raise ValueError(f"{field.upper()} must be a positive Discord ID.")
+    for field in ("role_bot_booster", "role_server_booster", "invite_code_for_bot_booster"):
+        if not values[field].strip():
+            raise ValueError(f"{field.upper()} must not be empty.")
+
+
+class SettingsReloader:
+    """Polls ``.env`` and swaps ``bot.settings`` for a new snapshot when it changes.
+
+    Each poll is a single ``stat()``; the file is only read (off the event
+    loop) when its mtime or size moved. Cogs receive
+    ``on_settings_changed(old, new, changed_fields)``.
+    """
+
+    def __init__(self, bot: commands.Bot, path: Path, *, interval: float) -> None:
+        self.bot = bot
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self._seen = self._signature()
+        self._task: Optional[asyncio.Task] = None
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                await notify_admin(self.bot, f"Settings reload failed:\n{traceback.format_exc()}")
+
+    async def check(self, *, force: bool = False) -> FrozenSet[str]:
+        """Reload if ``.env`` changed; returns the names of the fields that changed."""
+        signature = self._signature()
+        if signature == self._seen and not force:
+            return frozenset()
+        self._seen = signature
+
+        env = await asyncio.to_thread(reloaded_environ, self.path)
+        try:
+            values = settings_from_env(env)
+            _validate(values)
+        except ValueError as exc:
+            await notify_admin(self.bot, f"Settings reload rejected, keeping current values: {exc}")
+            return frozenset()
+
+        current = self.bot.settings
+        pinned = sorted(field for field in RESTART_FIELDS if values[field] != getattr(current, field))
+        for field in pinned:
+            values[field] = getattr(current, field)
+        if pinned:
+            await notify_admin(self.bot, f"Settings reload: {', '.join(pinned)} requires a restart to take effect.")
+
+        new = dataclasses.replace(current, **values)
+        changed = frozenset(
+            field.name for field in dataclasses.fields(current) if getattr(current, field.name) != getattr(new, field.name)
+        )
+        if changed:
+            self.bot.settings = new
+            self.reloads += 1
+            print(f"Settings reloaded from {self.path}: {', '.join(sorted(changed))}.")
+            self.bot.dispatch("settings_changed", current, new, changed)
+        return changed
@@ -0,0 +1,164 @@
+"""Orderly shutdown on SIGTERM/SIGINT and the signal-aware runner around ``bot.start``.
+
+Phases, each timed and printed as a shutdown timeline:
+
+1. stop accepting work – new slash commands get a "restarting" reply,
+   ``/readyz`` turns 503 and the .env watcher stops;
+2. drain – wait for in-flight event handlers and commands (DM relays, kicks,
+   voice reconnects) up to ``drain_timeout``, then cancel the rest;
+3. flush – commit the state store and close the event recorder;
+4. disconnect voice – leave voice channels; sticky channels stay stored and
+   are rejoined on the next start;
+5. close – ``bot.close()``: cluster bus, gateway, store.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import signal
+import sys
+import time
+import traceback
+from typing import Any, Awaitable, Iterable, Optional
+
+import discord
+from discord.ext import commands
+
+from .startup import StartupTimeline
+
+SHUTDOWN_NOTICE = "Бот перезапускается, повторите команду через минуту."
+# Upper bound for every phase except the drain.
+PHASE_TIMEOUT = 5.0
+
+
+async def _bounded(awaitable: Awaitable[Any], timeout: float, what: str) -> None:
+    try:
+        await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        print(f"Shutdown: {what} did not finish within {timeout:.0f} s.")
+    except Exception:
+        print(f"Shutdown: {what} failed:\n{traceback.format_exc()}")
+
+
+async def drain(bot: commands.Bot, timeout: float) -> tuple[int, int]:
+    """Wait for tracked in-flight tasks, including ones started meanwhile; cancel what is left.
+
+    Returns ``(finished, cancelled)``.
+    """
+    deadline = time.monotonic() + timeout
+    current = asyncio.current_task()
+    finished = 0
+    while True:
+        pending = {task for task in bot.inflight if task is not current and not task.done()}  # type: ignore[attr-defined]
+        remaining = deadline - time.monotonic()
+        if not pending or remaining <= 0:
+            break
+        done, _ = await asyncio.wait(pending, timeout=remaining)
+        finished += len(done)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending, timeout=1.0)
+    return finished, len(pending)
+
+
+async def graceful_shutdown(bot: commands.Bot, *, drain_timeout: float) -> StartupTimeline:
+    timeline = StartupTimeline()
+
+    with timeline.span("stop accepting work"):
+        bot.shutting_down = True  # type: ignore[attr-defined]
+        await _bounded(bot.settings_reloader.stop(), PHASE_TIMEOUT, "settings watcher")  # type: ignore[attr-defined]
+
+    with timeline.span("drain in-flight work") as phase:
+        finished, cancelled = await drain(bot, drain_timeout)
+        phase.name = f"drain in-flight work ({finished} finished, {cancelled} cancelled)"
+
+    with timeline.span("flush state and logs") as phase:
+        store = bot.store  # type: ignore[attr-defined]
+        rows = store.pending
+        await _bounded(store.flush(), PHASE_TIMEOUT, "state store flush")
+        recorder = bot.event_recorder  # type: ignore[attr-defined]
+        if recorder is not None:
+            await _bounded(asyncio.to_thread(recorder.close), PHASE_TIMEOUT, "event recorder")
+        sys.stdout.flush()
+        sys.stderr.flush()
+        phase.name = f"flush state and logs ({rows} rows)"
+
+    voice_clients = list(bot.voice_clients)
+    with timeline.span(f"disconnect voice ({len(voice_clients)} channels)"):
+        await asyncio.gather(
+            *(_bounded(vc.disconnect(force=False), PHASE_TIMEOUT, f"voice disconnect in {vc.channel}")
+              for vc in voice_clients)
+        )
+
+    with timeline.span("close gateway"):
+        # Not cancelled on timeout: discord.py's close task must run to the end.
+        closing = asyncio.ensure_future(bot.close())
+        done, _ = await asyncio.wait({closing}, timeout=PHASE_TIMEOUT * 2)
+        if not done:
+            print(f"Shutdown: bot close still running after {PHASE_TIMEOUT * 2:.0f} s.")
+
+    print("\n".join(timeline.format("Shutdown timeline")))
+    return timeline
+
+
+def run_bot(
+    bot: commands.Bot,
+    token: str,
+    *,
+    drain_timeout: float,
+    signals: Iterable[signal.Signals] = (signal.SIGINT, signal.SIGTERM),
+) -> None:
+    """Like ``bot.run``, but the given signals trigger ``graceful_shutdown``."""
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(_serve(bot, token, drain_timeout=drain_timeout, signals=tuple(signals)))
+    except KeyboardInterrupt:
+        # Platforms without loop signal handlers fall back to bot.run's behaviour.
+        return
+
+
+async def _serve(
+    bot: commands.Bot,
+    token: str,
+    *,
+    drain_timeout: float,
+    signals: tuple[signal.Signals, ...],
+) -> None:
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    shutdown: Optional[asyncio.Task] = None
+    forced = False
+
+    def on_signal(signum: signal.Signals) -> None:
+        nonlocal forced
+        if shutdown is not None:
+            print(f"Received {signum.name} again; closing without waiting.")
+            forced = True
+            shutdown.cancel()
+            return
+        print(f"Received {signum.name}; shutting down.")
+        stop.set()
+
+    for signum in signals:
+        try:
+            loop.add_signal_handler(signum, on_signal, signum)
+        except NotImplementedError:
+            pass
+
+    async with bot:
+        runner = loop.create_task(bot.start(token))
+        stopper = loop.create_task(stop.wait())
+        await asyncio.wait({runner, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        stopper.cancel()
+        if stop.is_set():
+            shutdown = loop.create_task(graceful_shutdown(bot, drain_timeout=drain_timeout))
+            try:
+                await shutdown
+            except asyncio.CancelledError:
+                if not forced:
+                    raise
+            if not bot.is_closed():
+                await bot.close()
+        # Returns once the bot is closed; raises if login or the connection failed.
+        await runner
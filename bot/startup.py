@@ -0,0 +1,114 @@
+"""Startup timeline and concurrent per-guild cog readiness."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass
+import time
+import traceback
+from typing import Iterator, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+from .utils import notify_admin
+
+
+@dataclass
+class Phase:
+    name: str
+    start: float
+    end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class StartupTimeline:
+    """Named startup phases, measured from ``origin`` (process start when known)."""
+
+    def __init__(self, origin: Optional[float] = None) -> None:
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases: List[Phase] = []
+
+    def begin(self, name: str) -> Phase:
+        phase = Phase(name, time.perf_counter())
+        self.phases.append(phase)
+        return phase
+
+    def end(self, phase: Phase) -> None:
+        phase.end = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Phase]:
+        phase = self.begin(name)
+        try:
+            yield phase
+        finally:
+            self.end(phase)
+
+    def add(self, name: str, start: float, end: float) -> None:
+        self.phases.append(Phase(name, start, end))
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.add(name, now, now)
+
+    def format(self, title: str = "Startup timeline") -> List[str]:
+        total = max((phase.end or phase.start for phase in self.phases), default=self.origin) - self.origin
+        lines = [f"{title} ({total:.2f} s):"]
+        for phase in sorted(self.phases, key=lambda item: item.start):
+            offset = phase.start - self.origin
+            if phase.end == phase.start:
+                lines.append(f"  {offset:8.3f} s             {phase.name}")
+            else:
+                lines.append(f"  {offset:8.3f} s  +{phase.duration:7.3f} s  {phase.name}")
+        return lines
+
+
+async def run_cog_readiness(bot: commands.Bot, timeline: StartupTimeline, *, limit: int) -> None:
+    """Run every cog's ``ready_guild(guild)`` concurrently, at most ``limit`` at a time.
+
+    Only guilds listed in ``GUILD_IDS`` are prepared; others the bot is a
+    member of are left alone.
+
+    A cog may also define ``guilds_ready()``, awaited once its work has
+    finished for every guild, even when there were none. Names of such cogs
+    are added to ``bot.ready_cogs`` as they complete; ``bot.cogs_ready`` is set
+    at the end.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def ready_one(cog: commands.Cog, guild: discord.Guild) -> Tuple[float, float]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await cog.ready_guild(guild)  # type: ignore[attr-defined]
+            except Exception:
+                await notify_admin(
+                    bot, f"{type(cog).__name__}.ready_guild failed for guild {guild.id}:\n{traceback.format_exc()}"
+                )
+            return started, time.perf_counter()
+
+    async def ready_cog(name: str, cog: commands.Cog) -> None:
+        guilds = [guild for guild in bot.guilds if bot.guild_settings.serves(guild.id)]  # type: ignore[attr-defined]
+        spans = await asyncio.gather(*(ready_one(cog, guild) for guild in guilds))
+        if spans:
+            timeline.add(
+                f"{name} ready ({len(spans)} guilds)",
+                min(start for start, _ in spans),
+                max(end for _, end in spans),
+            )
+        if hasattr(cog, "guilds_ready"):
+            try:
+                await cog.guilds_ready()  # type: ignore[attr-defined]
+            except Exception:
+                await notify_admin(bot, f"{name}.guilds_ready failed:\n{traceback.format_exc()}")
+        bot.ready_cogs.add(name)  # type: ignore[attr-defined]
+
+    await asyncio.gather(
+        *(ready_cog(name, cog) for name, cog in list(bot.cogs.items()) if hasattr(cog, "ready_guild"))
+    )
+    bot.cogs_ready.set()  # type: ignore[attr-defined]
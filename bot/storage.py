@@ -0,0 +1,286 @@
+"""SQLite-backed state shared by every cog.
+
+All rows are read once in ``open()``; afterwards reads are served from memory.
+Writes update memory immediately and are queued, coalesced per key and
+committed in batches on a dedicated thread, so the event loop never waits on
+disk. ``close()`` flushes whatever is still queued.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+from pathlib import Path
+import sqlite3
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, Tuple, Type, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# (namespace, key) -> encoded value, or None for a delete.
+_Batch = Dict[Tuple[str, str], Optional[str]]
+
+KV_NAMESPACE = "kv"
+# Longest wait between retries of a failing commit, in seconds.
+_MAX_RETRY_DELAY = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID
+"""
+
+
+def _codec(kind: type) -> Tuple[Callable[[Any], str], Callable[[str], Any]]:
+    if kind is datetime:
+        return (lambda value: value.isoformat()), datetime.fromisoformat
+    if kind is str:
+        return str, str
+    if kind is int:
+        return str, int
+    raise TypeError(f"Unsupported state type {kind!r}.")
+
+
+class PersistentMap(Dict[K, V], Generic[K, V]):
+    """A dict whose mutations are queued for the store; reads stay plain dict lookups."""
+
+    def __init__(
+        self,
+        store: "StateStore",
+        namespace: str,
+        key_type: Type[K],
+        value_type: Type[V],
+        rows: Dict[str, str],
+    ) -> None:
+        self._store = store
+        self._namespace = namespace
+        self._encode_key, decode_key = _codec(key_type)
+        self._encode_value, decode_value = _codec(value_type)
+        super().__init__((decode_key(key), decode_value(value)) for key, value in rows.items())
+
+    def _put(self, key: K, value: V) -> None:
+        if self._store.path is not None:
+            self._store._queue(self._namespace, self._encode_key(key), self._encode_value(value))
+
+    def _drop(self, key: K) -> None:
+        if self._store.path is not None:
+            self._store._queue(self._namespace, self._encode_key(key), None)
+
+    def __setitem__(self, key: K, value: V) -> None:
+        super().__setitem__(key, value)
+        self._put(key, value)
+
+    def __delitem__(self, key: K) -> None:
+        super().__delitem__(key)
+        self._drop(key)
+
+    def pop(self, key: K, *default: Any) -> Any:  # type: ignore[override]
+        if key in self:
+            self._drop(key)
+        return super().pop(key, *default)
+
+    def popitem(self) -> Tuple[K, V]:
+        key, value = super().popitem()
+        self._drop(key)
+        return key, value
+
+    def setdefault(self, key: K, default: V = None) -> V:  # type: ignore[assignment]
+        if key not in self:
+            self[key] = default
+        return super().__getitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        for key in list(self):
+            self._drop(key)
+        super().clear()
+
+
+class StateStore:
+    """Key/value and per-namespace tables persisted to one SQLite file.
+
+    ``path=None`` keeps everything in memory (used by the offline harness).
+    """
+
+    def __init__(self, path: Optional[Path], *, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.commits = 0
+        self.rows_written = 0
+        self.last_error: Optional[str] = None
+        # Consecutive failed commits; backs off the retry.
+        self.failures = 0
+        self._rows: Dict[str, Dict[str, str]] = {}
+        self._kv: Dict[str, Any] = {}
+        self._pending: _Batch = {}
+        self._tables: Dict[str, PersistentMap] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def open(self) -> None:
+        """Load every row; must complete before cogs read state."""
+        if self.path is None or self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+        rows = await self._run(self._load)
+        for namespace, key, value in rows:
+            self._rows.setdefault(namespace, {})[key] = value
+        self._kv = {key: json.loads(value) for key, value in self._rows.pop(KV_NAMESPACE, {}).items()}
+        self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._executor is not None:
+            await self._run(self._disconnect)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        assert self._executor is not None
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def stats_line(self) -> str:
+        line = f"Хранилище: коммитов {self.commits}, записано строк {self.rows_written}, в очереди {self.pending}"
+        if self.last_error is not None:
+            line += f", ошибок подряд {self.failures} (последняя: {self.last_error})"
+        return line
+
+    # -- key/value -------------------------------------------------------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._kv.get(key, default)
+
+    def get_bool(self, key: str, default: bool) -> bool:
+        value = self._kv.get(key)
+        return value if isinstance(value, bool) else default
+
+    def get_str(self, key: str, default: str) -> str:
+        value = self._kv.get(key)
+        return value if isinstance(value, str) else default
+
+    def get_int_list(self, key: str, default: Iterable[int]) -> list[int]:
+        value = self._kv.get(key)
+        if isinstance(value, list) and all(isinstance(item, int) for item in value):
+            return value
+        return list(default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serialisable value; no-op when unchanged."""
+        if self._kv.get(key, _MISSING) == value:
+            return
+        self._kv[key] = value
+        self._queue(KV_NAMESPACE, key, json.dumps(value, ensure_ascii=False))
+
+    # -- tables ----------------------------------------------------------
+
+    def table(self, namespace: str, key_type: Type[K], value_type: Type[V]) -> PersistentMap[K, V]:
+        """Return the shared map for ``namespace``; keys and values are int, str or datetime."""
+        if namespace == KV_NAMESPACE:
+            raise ValueError(f"Namespace {KV_NAMESPACE!r} is reserved.")
+        table = self._tables.get(namespace)
+        if table is None:
+            table = self._tables[namespace] = PersistentMap(
+                self, namespace, key_type, value_type, self._rows.pop(namespace, {})
+            )
+        return table
+
+    # -- write-behind ----------------------------------------------------
+
+    def _queue(self, namespace: str, key: str, value: Optional[str]) -> None:
+        if self.path is None:
+            return
+        self._pending[(namespace, key)] = value
+        self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Commit everything queued so far in one transaction."""
+        if not self._pending or self._executor is None:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await self._run(self._commit, batch)
+        except Exception as exc:
+            # Keep newer writes; retry the failed ones with the next batch.
+            for item, value in batch.items():
+                self._pending.setdefault(item, value)
+            self.failures += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            print(f"State store commit failed ({len(batch)} rows): {self.last_error}")
+            # Retry without waiting for an unrelated write; the flush loop backs off.
+            self._wakeup.set()
+        else:
+            self.commits += 1
+            self.rows_written += len(batch)
+            self.failures = 0
+            self.last_error = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            delay = self.flush_interval
+            if self.failures:
+                # Back off after failed commits: 2 s, 4 s, ... up to _MAX_RETRY_DELAY.
+                delay = min(max(delay, 1.0) * 2 ** min(self.failures, 6), _MAX_RETRY_DELAY)
+            await asyncio.sleep(delay)
+            await self.flush()
+
+    # -- store thread ----------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            assert self.path is not None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load(self) -> list[Tuple[str, str, str]]:
+        return self._connect().execute("SELECT namespace, key, value FROM state").fetchall()
+
+    def _commit(self, batch: _Batch) -> None:
+        conn = self._connect()
+        upserts = [(namespace, key, value) for (namespace, key), value in batch.items() if value is not None]
+        deletes = [(namespace, key) for (namespace, key), value in batch.items() if value is None]
+        with conn:
+            if upserts:
+                conn.executemany(
+                    "INSERT INTO state (namespace, key, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+                    upserts,
+                )
+            if deletes:
+                conn.executemany("DELETE FROM state WHERE namespace = ? AND key = ?", deletes)
+
+    def _disconnect(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_MISSING = object()
@@ -0,0 +1,173 @@
+"""Forum-thread tickets: one thread per DM ticket in a staff forum channel."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+from .media import files_from_bytes
+from .storage import PersistentMap
+
+STORE_NAMESPACE = "dm_relay.forum_threads"
+# Discord's limit for thread names.
+_MAX_NAME = 100
+# Thread messages starting with this go to the user even when they are not replies.
+REPLY_MARKER = ">>"
+
+
+@dataclass
+class _Request:
+    ticket: str
+    name: str
+    content: str
+    attachments: List[Tuple[str, bytes]]
+    future: "asyncio.Future[discord.Message]"
+
+
+class ForumTickets:
+    """Routes DM tickets to threads in a forum channel, created on first use.
+
+    A ticket's first message becomes the opening post of its thread, so a new
+    thread costs one request. Thread IDs are kept in the state store by ticket
+    code. Creation goes through a queue served by one task, at most ``budget``
+    threads per ``window`` seconds; further messages for a ticket whose thread
+    is still queued wait for it instead of opening a second one.
+    """
+
+    def __init__(self, bot: commands.Bot, channel_id: int, *, budget: int, window: float = 60.0) -> None:
+        self.bot = bot
+        self.channel_id = channel_id
+        self.budget = max(1, budget)
+        self.window = window
+        self.threads: PersistentMap[str, int] = bot.store.table(STORE_NAMESPACE, str, int)
+        self._tickets: Dict[int, str] = {thread_id: ticket for ticket, thread_id in self.threads.items()}
+        self._creating: Dict[str, "asyncio.Future[discord.Message]"] = {}
+        self._queue: Deque[_Request] = deque()
+        self._created_at: Deque[float] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.coalesced = 0
+        self.throttled = 0
+
+    def is_ticket_thread(self, channel: Any) -> bool:
+        # Threads this worker opened are known by ID even before they reach the
+        # channel cache; other workers go by the parent forum.
+        if channel.id in self._tickets:
+            return True
+        return isinstance(channel, discord.Thread) and channel.parent_id == self.channel_id
+
+    @staticmethod
+    def reply_text(message: discord.Message) -> Optional[str]:
+        """Text to relay for a staff message in a ticket thread, or None for staff-only chat.
+
+        Only replies to a message in the thread and messages starting with
+        ``REPLY_MARKER`` (which is stripped) reach the user.
+        """
+        content = message.content or ""
+        if content.startswith(REPLY_MARKER):
+            return content[len(REPLY_MARKER):].lstrip()
+        if message.reference is not None and message.reference.message_id:
+            return content
+        return None
+
+    def ticket_for(self, thread_id: int) -> Optional[str]:
+        return self._tickets.get(thread_id)
+
+    def forget(self, ticket: str) -> None:
+        thread_id = self.threads.pop(ticket, None)
+        if thread_id is not None:
+            self._tickets.pop(thread_id, None)
+
+    async def post(self, ticket: str, name: str, content: str, attachments: List[Tuple[str, bytes]]) -> discord.Message:
+        """Post to the ticket's thread, opening one when the ticket has none yet."""
+        thread_id = self.threads.get(ticket)
+        if thread_id is not None:
+            try:
+                return await self._send(thread_id, content, attachments)
+            except discord.NotFound:
+                # Thread deleted by staff; the next message opens a new one.
+                self.forget(ticket)
+
+        future = self._creating.get(ticket)
+        if future is not None:
+            self.coalesced += 1
+            await asyncio.shield(future)
+            return await self._send(self.threads[ticket], content, attachments)
+
+        future = asyncio.get_running_loop().create_future()
+        # Consumed even when the waiting sender was cancelled meanwhile.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._creating[ticket] = future
+        self._queue.append(_Request(ticket, name[:_MAX_NAME], content, attachments, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="forum ticket threads")
+        return await asyncio.shield(future)
+
+    async def _send(self, thread_id: int, content: str, attachments: List[Tuple[str, bytes]]) -> discord.Message:
+        channel = self.bot.get_channel(thread_id) or self.bot.get_partial_messageable(thread_id)
+        return await channel.send(content, files=files_from_bytes(attachments) or None)  # type: ignore[union-attr]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            now = loop.time()
+            while self._created_at and now - self._created_at[0] >= self.window:
+                self._created_at.popleft()
+            if len(self._created_at) >= self.budget:
+                self.throttled += 1
+                await asyncio.sleep(self._created_at[0] + self.window - now)
+                continue
+
+            request = self._queue.popleft()
+            self._created_at.append(now)
+            try:
+                forum = self.bot.get_channel(self.channel_id)
+                if not isinstance(forum, discord.ForumChannel):
+                    raise RuntimeError(f"DM_FORUM_CHANNEL_ID {self.channel_id} is not a cached forum channel.")
+                created = await forum.create_thread(
+                    name=request.name,
+                    content=request.content,
+                    files=files_from_bytes(request.attachments) or discord.utils.MISSING,
+                )
+            except asyncio.CancelledError:
+                self._creating.pop(request.ticket, None)
+                request.future.cancel()
+                raise
+            except Exception as exc:
+                self._creating.pop(request.ticket, None)
+                request.future.set_exception(exc)
+                continue
+            self.threads[request.ticket] = created.thread.id
+            self._tickets[created.thread.id] = request.ticket
+            self.created += 1
+            self._creating.pop(request.ticket, None)
+            request.future.set_result(created.message)
+
+    async def close(self) -> None:
+        """Stop the creation task; queued requests fail with ``CancelledError``."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for request in self._queue:
+            request.future.cancel()
+        self._queue.clear()
+        self._creating.clear()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "channel_id": self.channel_id,
+            "threads": len(self.threads),
+            "queued": len(self._queue),
+            "created": self.created,
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+        }
@@ -9,15 +9,23 @@ from typing import Optional
 import discord
 from discord.ext import commands
 
+from .breaker import send_guard, user_destination
+
 ERROR_LOG_FILE = Path("error_log.txt")
 
 
-async def notify_admin(bot: commands.Bot, message: str, *, error_log: Path = ERROR_LOG_FILE) -> None:
-    """Send a diagnostic message to the configured admin and persist it locally."""
+async def send_admin_alert(bot: commands.Bot, message: str) -> None:
+    """DM ``message`` to the configured admin; failures are ignored."""
     admin_id: Optional[int] = getattr(getattr(bot, "settings", None), "admin_user_id", None)
-    admin: Optional[discord.User] = None
+    admin: Optional[discord.abc.Messageable] = None
+    entities = getattr(bot, "entities", None)
 
-    if admin_id is not None:
+    if entities is not None:
+        try:
+            admin = await entities.admin_dm()
+        except Exception:
+            admin = None
+    elif admin_id is not None:
         admin = bot.get_user(admin_id)
         if admin is None:
             try:
@@ -27,10 +35,34 @@ async def notify_admin(bot: commands.Bot, message: str, *, error_log: Path = ERR
 
     if admin is not None:
         try:
-            await admin.send(f"⚠️ **Bot Error:**\n```\n{message}\n```")
+            # With the admin's DMs closed, skip the round trip until the breaker's cooldown ends.
+            async with send_guard(bot, user_destination(admin_id or 0)):
+                await admin.send(f"⚠️ **Bot Error:**\n```\n{message}\n```")
         except Exception:
             pass
 
+
+async def notify_admin(bot: commands.Bot, message: str, *, error_log: Path = ERROR_LOG_FILE) -> None:
+    """Send a diagnostic message to the configured admin and persist it locally.
+
+    In cluster mode only the primary worker DMs the admin; other workers hand
+    the message to it over the cluster bus.
+    """
+    cluster = getattr(bot, "cluster", None)
+    forwarded = False
+    if cluster is not None and not cluster.info.primary:
+        try:
+            await cluster.send("notify", {"message": message})
+            forwarded = True
+        except Exception:
+            forwarded = False
+    if not forwarded:
+        await send_admin_alert(bot, message)
+    append_error_log(message, error_log=error_log)
+
+
+def append_error_log(message: str, *, error_log: Path = ERROR_LOG_FILE) -> None:
+    """Append ``message`` to the local error log; failures are ignored."""
     try:
         error_log.parent.mkdir(parents=True, exist_ok=True)
         with error_log.open("a", encoding="utf-8") as fh:
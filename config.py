@@ -8,17 +8,22 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
 
 
-def _load_dotenv(path: Path) -> None:
-    """Populate os.environ from a simple KEY=VALUE .env file if present."""
-    if not path.exists():
-        return
+DOTENV_PATH = Path(".env")
+# Keys that came from .env rather than the real environment; only these
+# follow edits to the file when settings are reloaded.
+_DOTENV_KEYS: Set[str] = set()
+
+
+def read_dotenv(path: Path) -> Dict[str, str]:
+    """Parse a simple KEY=VALUE .env file; a missing or unreadable file is empty."""
+    values: Dict[str, str] = {}
     try:
         content = path.read_text(encoding="utf-8")
     except OSError:
-        return
+        return values
     for raw_line in content.splitlines():
         line = raw_line.strip()
         if not line or line.startswith("#") or "=" not in line:
@@ -27,10 +32,27 @@ def _load_dotenv(path: Path) -> None:
         key = key.strip()
         if not key or key.startswith("#"):
             continue
-        os.environ.setdefault(key, value.strip())
+        values[key] = value.strip()
+    return values
+
+
+def _load_dotenv(path: Path) -> None:
+    """Populate os.environ from a simple KEY=VALUE .env file if present."""
+    for key, value in read_dotenv(path).items():
+        if key not in os.environ:
+            os.environ[key] = value
+            _DOTENV_KEYS.add(key)
+
+
+def reloaded_environ(path: Path = DOTENV_PATH) -> Dict[str, str]:
+    """The environment as it would be at startup with the current .env contents."""
+    env = {key: value for key, value in os.environ.items() if key not in _DOTENV_KEYS}
+    for key, value in read_dotenv(path).items():
+        env.setdefault(key, value)
+    return env
 
 
-_load_dotenv(Path(".env"))
+_load_dotenv(DOTENV_PATH)
 
 
 def _require_env(name: str) -> str:
@@ -40,8 +62,8 @@ def _require_env(name: str) -> str:
     raise RuntimeError(f"Environment variable {name} is required.")
 
 
-def _int_env(name: str, default: Optional[int] = None) -> int:
-    value = os.getenv(name)
+def _int_env(name: str, default: Optional[int] = None, env: Mapping[str, str] = os.environ) -> int:
+    value = env.get(name)
     if value is not None and value.strip():
         try:
             return int(value)
@@ -52,19 +74,148 @@ def _int_env(name: str, default: Optional[int] = None) -> int:
     return default
 
 
+def _bool_env(name: str, default: bool = False) -> bool:
+    value = os.getenv(name, "").strip().lower()
+    if not value:
+        return default
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Environment variable {name} must be a boolean (1/0, true/false).")
+
+
+def _list_env(name: str) -> Tuple[str, ...]:
+    value = os.getenv(name, "")
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _int_list_env(name: str, default: Tuple[int, ...] = ()) -> Tuple[int, ...]:
+    items = _list_env(name)
+    if not items:
+        return default
+    try:
+        return tuple(int(item) for item in items)
+    except ValueError as exc:
+        raise ValueError(f"Environment variable {name} must be a comma-separated list of integers.") from exc
+
+
 BOT_TOKEN = _require_env("DISCORD_BOT_TOKEN")
 
-ADMIN_USER_ID = _int_env("ADMIN_USER_ID", 233981175956242433)
+
+def settings_from_env(env: Mapping[str, str]) -> Dict[str, Any]:
+    """Values for ``BotSettings``; raises ValueError on malformed numbers."""
+    admin_user_id = _int_env("ADMIN_USER_ID", 233981175956242433, env)
+    return {
+        "admin_user_id": admin_user_id,
+        "guild_id": _int_env("GUILD_ID", 233981443766878208, env),
+        "boost_report_channel_id": _int_env("BOOST_REPORT_CHANNEL_ID", 1252628666639450236, env),
+        "invite_code_for_bot_booster": env.get("INVITE_CODE_FOR_BOT_BOOSTER", "Q9EesfD7Gs"),
+        "role_bot_booster": env.get("ROLE_BOT_BOOSTER", "Бот Бустер"),
+        "role_server_booster": env.get("ROLE_SERVER_BOOSTER", "Server Booster"),
+        "role_movies": env.get("ROLE_MOVIES", "Кино"),
+        "moderator_role": env.get("MODERATOR_ROLE", ""),
+        "google_sheet_url": env.get(
+            "GOOGLE_SHEET_URL",
+            "https://docs.google.com/spreadsheets/d/1JjNffnZHc-D8KdnLAdT09LTvoBJUVtX4ao9Wc-NM_6A",
+        ),
+    }
+
+
+_settings = settings_from_env(os.environ)
+ADMIN_USER_ID: int = _settings["admin_user_id"]
+# Users for presence tracking: TRACK_USER_IDS, or TRACK_USER_ID alone when unset;
+# TRACK_RULE is "any" or "all". Read at startup only; /track changes them at runtime.
 TRACK_USER_ID = _int_env("TRACK_USER_ID", ADMIN_USER_ID)
-GUILD_ID = _int_env("GUILD_ID", 233981443766878208)
-BOOST_REPORT_CHANNEL_ID = _int_env("BOOST_REPORT_CHANNEL_ID", 1252628666639450236)
-
-INVITE_CODE_FOR_BOT_BOOSTER = os.getenv("INVITE_CODE_FOR_BOT_BOOSTER", "Q9EesfD7Gs")
-ROLE_BOT_BOOSTER = os.getenv("ROLE_BOT_BOOSTER", "Бот Бустер")
-ROLE_SERVER_BOOSTER = os.getenv("ROLE_SERVER_BOOSTER", "Server Booster")
-ROLE_MOVIES = os.getenv("ROLE_MOVIES", "Кино")
-MODERATOR_ROLE = os.getenv("MODERATOR_ROLE", "")
-GOOGLE_SHEET_URL = os.getenv(
-    "GOOGLE_SHEET_URL",
-    "https://docs.google.com/spreadsheets/d/1JjNffnZHc-D8KdnLAdT09LTvoBJUVtX4ao9Wc-NM_6A",
-)
\ No newline at end of file
+TRACK_USER_IDS = _int_list_env("TRACK_USER_IDS", (TRACK_USER_ID,))
+TRACK_RULE = os.getenv("TRACK_RULE", "any").strip().lower() or "any"
+GUILD_ID: int = _settings["guild_id"]
+# Guilds the bot serves and registers slash commands in; defaults to GUILD_ID.
+# Per-guild overrides of the settings below are managed with /guild_settings.
+GUILD_IDS = _int_list_env("GUILD_IDS", (GUILD_ID,))
+BOOST_REPORT_CHANNEL_ID: int = _settings["boost_report_channel_id"]
+
+INVITE_CODE_FOR_BOT_BOOSTER: str = _settings["invite_code_for_bot_booster"]
+ROLE_BOT_BOOSTER: str = _settings["role_bot_booster"]
+ROLE_SERVER_BOOSTER: str = _settings["role_server_booster"]
+ROLE_MOVIES: str = _settings["role_movies"]
+MODERATOR_ROLE: str = _settings["moderator_role"]
+GOOGLE_SHEET_URL: str = _settings["google_sheet_url"]
+
+# Comma-separated cog names from bot/manifest.py; empty loads every cog.
+ENABLED_COGS = _list_env("ENABLED_COGS")
+
+# Presence tracking: how long a tracked status must stay unchanged before the
+# bot mirrors it, and how many presence updates may be sent per window.
+PRESENCE_SETTLE_SECONDS = _int_env("PRESENCE_SETTLE_SECONDS", 10)
+PRESENCE_UPDATE_BUDGET = _int_env("PRESENCE_UPDATE_BUDGET", 5)
+PRESENCE_UPDATE_WINDOW = _int_env("PRESENCE_UPDATE_WINDOW", 60)
+
+# Event-loop monitor: sampling interval, lag recorded as a blocked callback,
+# and lag that triggers an admin alert (all in milliseconds).
+LOOP_MONITOR_INTERVAL_MS = _int_env("LOOP_MONITOR_INTERVAL_MS", 1000)
+LOOP_STALL_THRESHOLD_MS = _int_env("LOOP_STALL_THRESHOLD_MS", 250)
+LOOP_LAG_ALERT_MS = _int_env("LOOP_LAG_ALERT_MS", 2000)
+
+# Gateway event capture for replay benchmarks; empty path disables recording.
+EVENT_RECORD_PATH = os.getenv("EVENT_RECORD_PATH", "").strip()
+EVENT_RECORD_MAX_MB = _int_env("EVENT_RECORD_MAX_MB", 64)
+EVENT_RECORD_BACKUPS = _int_env("EVENT_RECORD_BACKUPS", 5)
+
+# Directory where /profile writes .prof (pstats) and .folded (flamegraph) files.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles").strip() or "profiles"
+
+# Persistent runtime state (toggles, sticky voice channels, DM relay maps);
+# empty path keeps state in memory only. Writes are committed in batches.
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state.db").strip()
+STATE_FLUSH_INTERVAL_MS = _int_env("STATE_FLUSH_INTERVAL_MS", 1000)
+
+# How often .env is checked for changes to hot-reloadable settings; 0 disables.
+CONFIG_RELOAD_INTERVAL_SECONDS = _int_env("CONFIG_RELOAD_INTERVAL_SECONDS", 5)
+
+# Maximum number of per-guild cog readiness jobs (invite refresh, tracking
+# evaluation, sticky voice rejoin) running at once after connecting.
+READY_CONCURRENCY = _int_env("READY_CONCURRENCY", 4)
+
+# User/member lookups that miss discord.py's cache are kept this long;
+# unknown IDs are remembered for the shorter negative TTL.
+ENTITY_CACHE_TTL_SECONDS = _int_env("ENTITY_CACHE_TTL_SECONDS", 600)
+ENTITY_CACHE_NEGATIVE_TTL_SECONDS = _int_env("ENTITY_CACHE_NEGATIVE_TTL_SECONDS", 60)
+# Content-addressed cache for relayed attachments and /tmdb images, in MiB (0 = off)
+ATTACHMENT_CACHE_MB = _int_env("ATTACHMENT_CACHE_MB", 64)
+
+# Sharding: SHARD_COUNT=0 uses Discord's recommended count. CLUSTER_PROCESSES>1
+# spreads the shards over that many worker processes, which exchange messages
+# and per-shard health through CLUSTER_DB_PATH every CLUSTER_HEARTBEAT_SECONDS.
+SHARD_COUNT = _int_env("SHARD_COUNT", 0)
+CLUSTER_PROCESSES = _int_env("CLUSTER_PROCESSES", 1)
+CLUSTER_DB_PATH = os.getenv("CLUSTER_DB_PATH", "cluster.db").strip() or "cluster.db"
+CLUSTER_HEARTBEAT_SECONDS = _int_env("CLUSTER_HEARTBEAT_SECONDS", 5)
+
+# Local health endpoint (/livez, /readyz, /status); HEALTH_PORT=0 disables it. In cluster
+# mode worker N listens on HEALTH_PORT + N. /livez fails once the loop is HEALTH_STALL_SECONDS late.
+HEALTH_HOST = os.getenv("HEALTH_HOST", "127.0.0.1").strip() or "127.0.0.1"
+HEALTH_PORT = _int_env("HEALTH_PORT", 0)
+HEALTH_STALL_SECONDS = _int_env("HEALTH_STALL_SECONDS", 10)
+
+# On SIGTERM/SIGINT, seconds to let in-flight handlers and commands finish before cancelling them
+SHUTDOWN_DRAIN_SECONDS = _int_env("SHUTDOWN_DRAIN_SECONDS", 10)
+
+# Circuit breaker for DM sends: cooldown after a destination fails (403/404, or 5xx three times
+# in a row), doubled after every failed probe up to the maximum
+BREAKER_COOLDOWN_SECONDS = _int_env("BREAKER_COOLDOWN_SECONDS", 600)
+BREAKER_MAX_COOLDOWN_SECONDS = _int_env("BREAKER_MAX_COOLDOWN_SECONDS", 6 * 3600)
+
+# Timers: a DM ticket is forgotten after this many days without messages from its user;
+# every BOOSTER_CHECK_HOURS each guild's report channel gets the expired-booster report. 0 = off
+DM_TICKET_EXPIRY_DAYS = _int_env("DM_TICKET_EXPIRY_DAYS", 0)
+BOOSTER_CHECK_HOURS = _int_env("BOOSTER_CHECK_HOURS", 0)
+
+# DM relay forum mode: each ticket gets a thread in this forum channel instead of
+# going to the admin's DMs (0 = off); thread creation is capped per minute
+DM_FORUM_CHANNEL_ID = _int_env("DM_FORUM_CHANNEL_ID", 0)
+DM_FORUM_THREADS_PER_MINUTE = _int_env("DM_FORUM_THREADS_PER_MINUTE", 5)
+
+# Opt-in fast runtime: the uvloop event loop, used only when installed
+# (pip install uvloop). Measure with tools/runtime_bench.py.
+FAST_RUNTIME = _bool_env("FAST_RUNTIME")
@@ -2,13 +2,41 @@
 
 from __future__ import annotations
 
-from bot import create_bot
-from config import BOT_TOKEN
+import time
+
+# Measured before the heavy imports so the startup timeline includes them.
+_STARTED = time.perf_counter()
+
+from pathlib import Path  # noqa: E402
+
+from bot import create_bot  # noqa: E402
+from bot.launcher import ClusterLauncher  # noqa: E402
+from bot.runtime import install_runtime  # noqa: E402
+from bot.shutdown import run_bot  # noqa: E402
+from config import (  # noqa: E402
+    BOT_TOKEN,
+    CLUSTER_DB_PATH,
+    CLUSTER_PROCESSES,
+    FAST_RUNTIME,
+    SHARD_COUNT,
+    SHUTDOWN_DRAIN_SECONDS,
+)
 
 
 def main() -> None:
-    bot = create_bot()
-    bot.run(BOT_TOKEN)
+    if CLUSTER_PROCESSES > 1:
+        ClusterLauncher(
+            BOT_TOKEN,
+            processes=CLUSTER_PROCESSES,
+            shard_count=SHARD_COUNT,
+            db_path=Path(CLUSTER_DB_PATH),
+            # Room for every worker's graceful shutdown (drain plus the bounded phases).
+            stop_timeout=SHUTDOWN_DRAIN_SECONDS + 30,
+        ).run()
+        return
+    print(f"Runtime: {install_runtime(FAST_RUNTIME).describe()}.")
+    bot = create_bot(started_at=_STARTED)
+    run_bot(bot, BOT_TOKEN, drain_timeout=SHUTDOWN_DRAIN_SECONDS)
 
 
 if __name__ == "__main__":
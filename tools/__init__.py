@@ -0,0 +1,6 @@
+"""Developer tools: offline harness, load tests and benchmarks."""
+
+import os
+
+# The tools never talk to Discord, but importing config requires a token.
+os.environ.setdefault("DISCORD_BOT_TOKEN", "offline-harness")
@@ -0,0 +1,146 @@
+"""Micro-benchmarks for the pure functions on the bot's per-event hot paths.
+
+Usage::
+
+    python -m tools.bench                                  # print timings
+    python -m tools.bench --save-baseline bench_baseline.json
+    python -m tools.bench --baseline bench_baseline.json   # exit 1 when slower
+
+Fixtures are synthetic but sized like a busy deployment: 100k DM tickets,
+5k invites and 500 roles. Each benchmark reports the best per-call time over
+several ``timeit`` repeats, which is the most stable figure to compare.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import sys
+import timeit
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import discord
+
+from bot.cogs.boosters import BoostersCog
+from bot.cogs.dm_relay import DmRelayCog, _to_base36
+from bot.cogs.voice import VoiceCog
+from tools.offline import OfflineHarness, invite_payload, member_payload, next_id, scratch_cwd
+
+TICKETS = 100_000
+INVITES = 5_000
+ROLES = 500
+MODERATOR_ROLE = "Модератор"
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+async def build_benchmarks() -> List[Benchmark]:
+    harness = OfflineHarness(members=50, roles=ROLES, invites=10, moderator_role=MODERATOR_ROLE)
+    await harness.start()
+    bot = harness.bot
+    guild = bot.get_guild(harness.fixture.guild_id)
+    assert guild is not None
+
+    all_roles = [role.id for role in guild.roles if not role.is_default()]
+    plain_roles = [role.id for role in guild.roles if role.name != MODERATOR_ROLE and not role.is_default()]
+    moderator_id, plain_id = next_id(), next_id()
+    for user_id, roles in ((moderator_id, all_roles), (plain_id, plain_roles)):
+        data = member_payload(user_id, roles)
+        data["guild_id"] = str(guild.id)
+        await harness.feed("GUILD_MEMBER_ADD", data)
+    moderator = SimpleNamespace(user=guild.get_member(moderator_id))
+    plain = SimpleNamespace(user=guild.get_member(plain_id))
+
+    # DM tickets: 100k users plus a chain of ids that share the same 6-char code.
+    dm = DmRelayCog(bot)
+    user_ids = [10**17 + index * 7919 for index in range(TICKETS)]
+    for user_id in user_ids:
+        dm._get_or_make_ticket(user_id)
+    colliding = [user_ids[0] + k * 36**6 for k in range(1, 33)]
+    for user_id in colliding[:-1]:
+        dm._get_or_make_ticket(user_id)
+
+    def new_ticket(user_id: int) -> Callable[[], str]:
+        def run() -> str:
+            ticket = dm.dm_user_ticket.pop(user_id, None)
+            if ticket is not None:
+                dm.dm_ticket_map.pop(ticket, None)
+            return dm._get_or_make_ticket(user_id)
+
+        return run
+
+    boosters = BoostersCog(bot)
+    state = bot._connection
+    channel_id = harness.fixture.report_channel_id
+    invites = [
+        discord.Invite(state=state, data=invite_payload(f"code{index:05d}", guild.id, channel_id, index))
+        for index in range(INVITES)
+    ]
+    invite_index = boosters._index_invites(invites)
+    last_code = invites[-1].code
+
+    voice = VoiceCog(bot)
+    voice_channel = guild.get_channel(harness.fixture.voice_channel_id)
+
+    benchmarks: List[Benchmark] = [
+        ("dm_relay._to_base36", lambda: _to_base36(user_ids[-1])),
+        ("DmRelayCog._get_or_make_ticket[hit]", lambda: dm._get_or_make_ticket(user_ids[TICKETS // 2])),
+        ("DmRelayCog._get_or_make_ticket[new]", new_ticket(10**18 + 12345)),
+        ("DmRelayCog._get_or_make_ticket[collision x32]", new_ticket(colliding[-1])),
+        ("BoostersCog._index_invites[5k]", lambda: boosters._index_invites(invites)),
+        ("BoostersCog.invite lookup[last of 5k]", lambda: invite_index.get(last_code)),
+        ("BoostersCog._has_moderator_privileges[holder]", lambda: boosters._has_moderator_privileges(moderator)),
+        ("BoostersCog._has_moderator_privileges[non-holder]", lambda: boosters._has_moderator_privileges(plain)),
+        ("VoiceCog._can_connect[500 roles]", lambda: voice._can_connect(guild, voice_channel)),
+    ]
+    await harness.stop()
+    return benchmarks
+
+
+def measure(func: Callable[[], object], repeat: int = 7) -> float:
+    """Best seconds per call across ``repeat`` runs of an auto-sized loop."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filter", nargs="?", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", type=Path, help="fail when a benchmark is slower than this file")
+    parser.add_argument("--save-baseline", type=Path, help="write results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown (default 0.5)")
+    args = parser.parse_args(argv)
+
+    baseline: Dict[str, float] = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else {}
+    save_to = args.save_baseline.resolve() if args.save_baseline else None
+    with scratch_cwd("outbot-bench-"):
+        benchmarks = [item for item in asyncio.run(build_benchmarks()) if args.filter in item[0]]
+
+        results: Dict[str, float] = {}
+        regressions = []
+        for name, func in benchmarks:
+            seconds = results[name] = measure(func)
+            line = f"{name:52} {seconds * 1e6:12.3f} µs"
+            base = baseline.get(name)
+            if base:
+                ratio = seconds / base
+                line += f"   x{ratio:5.2f} vs baseline"
+                if ratio > 1 + args.tolerance:
+                    regressions.append(f"{name}: {base * 1e6:.3f} µs -> {seconds * 1e6:.3f} µs")
+            print(line)
+
+        if save_to is not None:
+            save_to.write_text(json.dumps(results, indent=2, sort_keys=True), encoding="utf-8")
+            print(f"Baseline written to {save_to}")
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
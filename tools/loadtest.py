@@ -0,0 +1,211 @@
+"""Replay scripted event streams into the real cogs and report their cost.
+
+Usage::
+
+    python -m tools.loadtest                       # run every scenario, print a report
+    python -m tools.loadtest --save-baseline tools/loadtest_baseline.json
+    python -m tools.loadtest --baseline tools/loadtest_baseline.json   # exit 1 on regression
+
+Each scenario runs against a fresh ``OfflineHarness`` twice: once to time the
+events and once under ``tracemalloc`` to measure memory. REST calls are
+deterministic, so any increase over the baseline counts as a regression;
+latency and memory are compared with ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import random
+import statistics
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from tools.offline import (
+    BOT_USER_ID,
+    OfflineHarness,
+    ScriptedEvent,
+    member_payload,
+    message_payload,
+    next_id,
+    presence_payload,
+    scratch_cwd,
+    user_payload,
+    voice_state_payload,
+)
+
+Scenario = Callable[[OfflineHarness, int], Iterator[ScriptedEvent]]
+
+
+def join_raid(harness: OfflineHarness, count: int) -> Iterator[ScriptedEvent]:
+    """Members joining in a burst; every tenth one uses the booster invite."""
+    fixture = harness.fixture
+    for index in range(count):
+        code = fixture.booster_invite_code if index % 10 == 0 else f"inv{index % 40:05d}"
+        fixture.invite_uses[code] = fixture.invite_uses.get(code, 0) + 1
+        data = member_payload(next_id())
+        data["guild_id"] = str(fixture.guild_id)
+        yield "GUILD_MEMBER_ADD", data
+
+
+def presence_flood(harness: OfflineHarness, count: int) -> Iterator[ScriptedEvent]:
+    """Presence churn from ordinary members mixed with a flapping tracked user."""
+    fixture = harness.fixture
+    tracking = harness.cog("TrackingCog")
+    if tracking is not None:
+        tracking.tracking_enabled = True
+    tracked = sorted(tracking.aggregate.tracked) if tracking is not None else []
+    rng = random.Random(32)
+    statuses = ("online", "idle", "dnd", "offline")
+    for index in range(count):
+        if tracked and index % 5 == 0:
+            user_id = tracked[index % len(tracked)]
+        else:
+            user_id = rng.choice(fixture.member_ids)
+        yield "PRESENCE_UPDATE", presence_payload(user_id, fixture.guild_id, statuses[index % len(statuses)])
+
+
+def dm_burst(harness: OfflineHarness, count: int) -> Iterator[ScriptedEvent]:
+    """Direct messages from many users, relayed to the admin."""
+    fixture = harness.fixture
+    senders = fixture.member_ids[: max(1, count // 4)]
+    for index in range(count):
+        user_id = senders[index % len(senders)]
+        yield "MESSAGE_CREATE", message_payload(next_id(), user_id + 1, user_payload(user_id), f"message {index}")
+
+
+def voice_flaps(harness: OfflineHarness, count: int) -> Iterator[ScriptedEvent]:
+    """Members and the bot itself joining and leaving the voice channel."""
+    fixture = harness.fixture
+    for index in range(count):
+        user_id = BOT_USER_ID if index % 4 == 0 else fixture.member_ids[index % len(fixture.member_ids)]
+        channel_id = fixture.voice_channel_id if index % 2 == 0 else None
+        yield "VOICE_STATE_UPDATE", voice_state_payload(
+            user_id, fixture.guild_id, channel_id, bot=user_id == BOT_USER_ID
+        )
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "join_raid": join_raid,
+    "presence_flood": presence_flood,
+    "dm_burst": dm_burst,
+    "voice_flaps": voice_flaps,
+}
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _run_once(name: str, count: int, *, trace_memory: bool) -> Dict[str, Any]:
+    harness = OfflineHarness()
+    await harness.start()
+    rest_before = harness.http.total_calls
+    routes_before = harness.http.calls.copy()
+
+    if trace_memory:
+        tracemalloc.start()
+    latencies = []
+    # Scenarios may mutate the fixture per event, so consume them lazily.
+    for event_type, data in SCENARIOS[name](harness, count):
+        latencies.append(await harness.feed(event_type, data))
+    memory_peak = 0
+    if trace_memory:
+        _current, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    routes = harness.http.calls - routes_before
+    result = {
+        "events": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "rest_calls": harness.http.total_calls - rest_before,
+        "rest_routes": dict(sorted(routes.items())),
+        "presence_updates": harness.gateway.presence_updates,
+        "memory_peak_kb": memory_peak / 1024,
+    }
+    await harness.stop()
+    return result
+
+
+async def run_scenario(name: str, count: int) -> Dict[str, Any]:
+    timing = await _run_once(name, count, trace_memory=False)
+    memory = await _run_once(name, count, trace_memory=True)
+    timing["memory_peak_kb"] = memory["memory_peak_kb"]
+    return timing
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    min_delta_ms: float = 0.1,
+) -> List[str]:
+    """Return a description of every metric that regressed against the baseline.
+
+    Latency changes smaller than ``min_delta_ms`` are scheduler noise and ignored.
+    """
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current["rest_calls"] > base["rest_calls"]:
+            problems.append(f"{name}: REST calls {base['rest_calls']} -> {current['rest_calls']}")
+        for metric in ("mean_ms", "p95_ms", "memory_peak_kb"):
+            allowed = base[metric] * (1 + tolerance)
+            if metric.endswith("_ms"):
+                allowed = max(allowed, base[metric] + min_delta_ms)
+            if base[metric] > 0 and current[metric] > allowed:
+                problems.append(f"{name}: {metric} {base[metric]:.2f} -> {current[metric]:.2f} (allowed {allowed:.2f})")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--events", type=int, default=500, help="events per scenario")
+    parser.add_argument("--baseline", type=Path, help="fail when results regress against this file")
+    parser.add_argument("--save-baseline", type=Path, help="write results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown (default 0.5)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore latency changes below this")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else None
+    save_to = args.save_baseline.resolve() if args.save_baseline else None
+
+    with scratch_cwd("outbot-loadtest-"):
+        results = {}
+        for name in names:
+            results[name] = asyncio.run(run_scenario(name, args.events))
+            r = results[name]
+            print(
+                f"{name:15} {r['events']:6d} events  mean {r['mean_ms']:7.3f} ms  p95 {r['p95_ms']:7.3f} ms  "
+                f"max {r['max_ms']:8.3f} ms  REST {r['rest_calls']:5d}  mem {r['memory_peak_kb']:9.1f} KiB"
+            )
+
+        if save_to is not None:
+            save_to.write_text(json.dumps(results, indent=2, sort_keys=True), encoding="utf-8")
+            print(f"Baseline written to {save_to}")
+
+        if baseline is not None:
+            problems = compare(results, baseline, args.tolerance, args.min_delta_ms)
+            for problem in problems:
+                print(f"REGRESSION {problem}", file=sys.stderr)
+            return 1 if problems else 0
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,439 @@
+"""Offline stand-in for the Discord gateway and REST API.
+
+``OfflineHarness`` builds a real ``OutBot`` with all of its cogs, replaces the
+HTTP client and the gateway socket with local fakes, and feeds raw gateway
+payloads straight into discord.py's parsers. Nothing leaves the process, so the
+cogs can be exercised and measured without a token or a network connection.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+import contextlib
+import dataclasses
+import itertools
+import os
+from pathlib import Path
+import re
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import discord
+from discord.http import Route
+
+from bot.bot import OutBot
+from bot.storage import StateStore
+
+APPLICATION_ID = 100000000000000001
+BOT_USER_ID = 100000000000000002
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+_snowflakes = itertools.count(200000000000000000)
+
+
+def next_id() -> int:
+    return next(_snowflakes)
+
+
+@contextlib.contextmanager
+def scratch_cwd(prefix: str) -> Iterator[Path]:
+    """Work in a fresh temporary directory, removed on exit with the previous cwd restored.
+
+    The cogs write error logs and command sync state into the working directory.
+    """
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=prefix) as directory:
+        os.chdir(directory)
+        try:
+            yield Path(directory)
+        finally:
+            os.chdir(previous)
+
+
+def user_payload(user_id: int, *, name: Optional[str] = None, bot: bool = False) -> Dict[str, Any]:
+    return {
+        "id": str(user_id),
+        "username": name or f"user{user_id % 1000000}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user_id: int, roles: Iterable[int] = (), *, bot: bool = False) -> Dict[str, Any]:
+    return {
+        "user": user_payload(user_id, bot=bot),
+        "roles": [str(role_id) for role_id in roles],
+        "joined_at": TIMESTAMP,
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+        "nick": None,
+    }
+
+
+def role_payload(role_id: int, name: str, position: int, permissions: int = 0) -> Dict[str, Any]:
+    return {
+        "id": str(role_id),
+        "name": name,
+        "color": 0,
+        "hoist": False,
+        "position": position,
+        "permissions": str(permissions),
+        "managed": False,
+        "mentionable": False,
+        "flags": 0,
+    }
+
+
+def channel_payload(
+    channel_id: int,
+    name: str,
+    *,
+    guild_id: int,
+    channel_type: int = 0,
+    position: int = 0,
+    user_limit: int = 0,
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "id": str(channel_id),
+        "name": name,
+        "type": channel_type,
+        "guild_id": str(guild_id),
+        "position": position,
+        "permission_overwrites": [],
+        "nsfw": False,
+        "parent_id": None,
+    }
+    if channel_type == 2:
+        payload.update(bitrate=64000, user_limit=user_limit, rtc_region=None)
+    return payload
+
+
+def invite_payload(code: str, guild_id: int, channel_id: int, uses: int) -> Dict[str, Any]:
+    return {
+        "code": code,
+        "guild": {"id": str(guild_id), "name": "Offline guild", "features": [], "icon": None},
+        "channel": {"id": str(channel_id), "name": "general", "type": 0},
+        "uses": uses,
+        "max_uses": 0,
+        "max_age": 0,
+        "temporary": False,
+        "created_at": TIMESTAMP,
+    }
+
+
+def message_payload(
+    message_id: int,
+    channel_id: int,
+    author: Dict[str, Any],
+    content: str,
+    *,
+    guild_id: Optional[int] = None,
+    attachments: Sequence[Dict[str, Any]] = (),
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": author,
+        "content": content,
+        "timestamp": TIMESTAMP,
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": list(attachments),
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0,
+    }
+    if guild_id is not None:
+        payload["guild_id"] = str(guild_id)
+    return payload
+
+
+def presence_payload(user_id: int, guild_id: int, status: str) -> Dict[str, Any]:
+    return {
+        "user": {"id": str(user_id)},
+        "guild_id": str(guild_id),
+        "status": status,
+        "activities": [],
+        "client_status": {"desktop": status} if status != "offline" else {},
+    }
+
+
+def voice_state_payload(
+    user_id: int,
+    guild_id: int,
+    channel_id: Optional[int],
+    *,
+    bot: bool = False,
+) -> Dict[str, Any]:
+    return {
+        "guild_id": str(guild_id),
+        "channel_id": str(channel_id) if channel_id is not None else None,
+        "user_id": str(user_id),
+        "member": member_payload(user_id, bot=bot),
+        "session_id": "offline",
+        "deaf": False,
+        "mute": False,
+        "self_deaf": False,
+        "self_mute": False,
+        "self_stream": False,
+        "self_video": False,
+        "suppress": False,
+        "request_to_speak_timestamp": None,
+    }
+
+
+class GuildFixture:
+    """A synthetic guild shaped after the bot's real deployment."""
+
+    def __init__(
+        self,
+        bot: OutBot,
+        *,
+        members: int = 200,
+        roles: int = 20,
+        invites: int = 50,
+    ) -> None:
+        settings = bot.settings
+        self.guild_id = settings.guild_id
+        self.report_channel_id = settings.boost_report_channel_id
+        self.voice_channel_id = next_id()
+        self.booster_invite_code = settings.invite_code_for_bot_booster
+
+        self.everyone_role_id = self.guild_id
+        self.server_booster_role_id = next_id()
+        self.bot_booster_role_id = next_id()
+        self.roles = [
+            role_payload(self.everyone_role_id, "@everyone", 0, permissions=int(discord.Permissions.general().value)),
+            role_payload(self.server_booster_role_id, settings.role_server_booster, 1),
+            role_payload(self.bot_booster_role_id, settings.role_bot_booster, 2),
+            role_payload(next_id(), settings.role_movies, 3),
+        ]
+        if settings.moderator_role:
+            self.roles.append(role_payload(next_id(), settings.moderator_role, 4))
+        while len(self.roles) < roles:
+            self.roles.append(role_payload(next_id(), f"role-{len(self.roles)}", len(self.roles)))
+
+        self.member_ids = [next_id() for _ in range(members)]
+        booster_roles = (self.server_booster_role_id, self.bot_booster_role_id)
+        self.members = [
+            member_payload(user_id, booster_roles if index % 10 == 0 else ())
+            for index, user_id in enumerate(self.member_ids)
+        ]
+        self.members.append(member_payload(BOT_USER_ID, bot=True))
+        self.members.append(member_payload(settings.admin_user_id))
+
+        self.invite_uses: Dict[str, int] = {f"inv{index:05d}": index for index in range(invites - 1)}
+        self.invite_uses[self.booster_invite_code] = 0
+
+    def guild_create(self) -> Dict[str, Any]:
+        return {
+            "id": str(self.guild_id),
+            "name": "Offline guild",
+            "owner_id": str(self.member_ids[0]),
+            "icon": None,
+            "features": [],
+            "roles": self.roles,
+            "emojis": [],
+            "stickers": [],
+            "channels": [
+                channel_payload(self.report_channel_id, "reports", guild_id=self.guild_id),
+                channel_payload(self.voice_channel_id, "voice", guild_id=self.guild_id, channel_type=2, position=1),
+            ],
+            "threads": [],
+            "members": self.members,
+            "member_count": len(self.members),
+            "presences": [],
+            "voice_states": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+            "soundboard_sounds": [],
+            "large": False,
+            "unavailable": False,
+            "premium_tier": 0,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "nsfw_level": 0,
+        }
+
+    def invites(self) -> List[Dict[str, Any]]:
+        return [
+            invite_payload(code, self.guild_id, self.report_channel_id, uses)
+            for code, uses in self.invite_uses.items()
+        ]
+
+
+def _route_pattern(path: str) -> "re.Pattern[str]":
+    return re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/?]+)", re.escape(path).replace(r"\{", "{").replace(r"\}", "}")))
+
+
+class FakeHTTP:
+    """Answers discord.py REST calls from the fixture and records every call."""
+
+    def __init__(self, bot: OutBot, fixture: GuildFixture) -> None:
+        self.bot = bot
+        self.fixture = fixture
+        self.calls: Counter[str] = Counter()
+        self.total_calls = 0
+        self._patterns: Dict[str, "re.Pattern[str]"] = {}
+
+    def install(self) -> None:
+        self.bot.http.request = self.request  # type: ignore[method-assign]
+        self.bot.http.get_from_cdn = self.get_from_cdn  # type: ignore[method-assign]
+
+    def _params(self, route: Route) -> Dict[str, str]:
+        pattern = self._patterns.get(route.path)
+        if pattern is None:
+            pattern = self._patterns[route.path] = _route_pattern(route.path)
+        match = pattern.match(route.url[len(Route.BASE):])
+        return match.groupdict() if match else {}
+
+    async def get_from_cdn(self, url: str) -> bytes:
+        self.calls["GET cdn"] += 1
+        self.total_calls += 1
+        return b"\x89PNG offline attachment"
+
+    async def request(self, route: Route, *, files: Any = None, form: Any = None, **kwargs: Any) -> Any:
+        self.calls[route.key] += 1
+        self.total_calls += 1
+        params = self._params(route)
+        key = route.key
+
+        if key == "GET /guilds/{guild_id}/invites":
+            return self.fixture.invites()
+        if key == "POST /users/@me/channels":
+            recipient = int(kwargs.get("json", {}).get("recipient_id"))
+            return {"id": str(recipient + 1), "type": 1, "recipients": [user_payload(recipient)], "last_message_id": None}
+        if key == "POST /channels/{channel_id}/messages":
+            body = kwargs.get("json") or {}
+            return message_payload(
+                next_id(),
+                int(params["channel_id"]),
+                user_payload(BOT_USER_ID, bot=True),
+                body.get("content") or "",
+            )
+        if key == "GET /channels/{channel_id}/messages/{message_id}":
+            return message_payload(
+                int(params["message_id"]), int(params["channel_id"]), user_payload(BOT_USER_ID, bot=True), ""
+            )
+        if key == "GET /users/{user_id}":
+            return user_payload(int(params["user_id"]))
+        if key == "GET /guilds/{guild_id}/members/{user_id}":
+            return member_payload(int(params["user_id"]))
+        if key.startswith("PUT /applications/{application_id}/"):
+            return []
+        return None
+
+
+class FakeGateway:
+    """Replaces the gateway websocket for the few calls cogs make directly."""
+
+    open = True
+
+    def __init__(self) -> None:
+        self.presence_updates = 0
+        self.voice_state_updates = 0
+        self.latency = 0.0
+
+    async def change_presence(self, **_kwargs: Any) -> None:
+        self.presence_updates += 1
+
+    async def voice_state(self, *_args: Any, **_kwargs: Any) -> None:
+        self.voice_state_updates += 1
+
+    async def request_chunks(self, *_args: Any, **_kwargs: Any) -> None:
+        return None
+
+    async def close(self, code: int = 1000) -> None:
+        return None
+
+
+class FakeShard:
+    """Stands in for discord.py's per-shard connection wrapper."""
+
+    def __init__(self, shard_id: int, ws: FakeGateway) -> None:
+        self.id = shard_id
+        self.ws = ws
+
+    async def close(self) -> None:
+        await self.ws.close()
+
+
+class OfflineHarness:
+    """A real ``OutBot`` wired to the local fakes."""
+
+    def __init__(self, *, members: int = 200, roles: int = 20, invites: int = 50, **settings: Any) -> None:
+        self.bot = OutBot()
+        self.bot.store = StateStore(None)
+        if settings:
+            self.bot.settings = dataclasses.replace(self.bot.settings, **settings)
+        self.fixture = GuildFixture(self.bot, members=members, roles=roles, invites=invites)
+        self.http = FakeHTTP(self.bot, self.fixture)
+        self.gateway = FakeGateway()
+        self._inflight: List[asyncio.Task] = []
+
+    async def start(self, *, fixture_guild: bool = True) -> None:
+        """Run ``setup_hook`` and, unless replaying a capture, create the fixture guild."""
+        bot = self.bot
+        self.http.install()
+        bot.ws = self.gateway  # type: ignore[assignment]
+        # One fake shard, so per-shard calls (presence, voice, chunking) reach FakeGateway.
+        bot.shard_count = bot._connection.shard_count = 1
+        bot._AutoShardedClient__shards[0] = FakeShard(0, self.gateway)  # type: ignore[attr-defined]
+
+        original_schedule = bot._schedule_event
+
+        def schedule(*args: Any, **kwargs: Any) -> asyncio.Task:
+            task = original_schedule(*args, **kwargs)
+            self._inflight.append(task)
+            return task
+
+        bot._schedule_event = schedule  # type: ignore[method-assign]
+
+        await bot._async_setup_hook()
+        state = bot._connection
+        state.application_id = APPLICATION_ID
+        state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID, name="outbot", bot=True))
+        await bot.setup_hook()
+
+        if fixture_guild:
+            await self.feed("GUILD_CREATE", self.fixture.guild_create())
+        else:
+            # Captured guilds would otherwise wait for member chunks that never arrive.
+            state._chunk_guilds = False
+        bot._ready.set()
+        bot.dispatch("ready")
+        await self.drain()
+
+    async def stop(self) -> None:
+        await self.drain()
+        await self.bot.close()
+
+    async def drain(self) -> None:
+        """Wait until every event handler scheduled so far has finished."""
+        while self._inflight:
+            tasks, self._inflight = self._inflight, []
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def feed(self, event_type: str, data: Dict[str, Any]) -> float:
+        """Dispatch one raw gateway event and return the seconds until its handlers finished."""
+        started = time.perf_counter()
+        self.bot._connection.parsers[event_type](data)
+        await self.drain()
+        return time.perf_counter() - started
+
+    def cog(self, name: str) -> Any:
+        return self.bot.get_cog(name)
+
+
+ScriptedEvent = Tuple[str, Dict[str, Any]]
@@ -0,0 +1,86 @@
+"""Replay a gateway capture from ``EVENT_RECORD_PATH`` into the real cogs.
+
+Usage::
+
+    python -m tools.replay events.jsonl.gz               # as fast as possible
+    python -m tools.replay events.jsonl.gz --speed 1     # original pacing
+    python -m tools.replay events.jsonl.gz.1 events.jsonl.gz --speed 10
+
+Rotated files are replayed in the order given. The bot runs inside
+``OfflineHarness``, so REST calls are answered locally and counted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+from pathlib import Path
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from bot.recorder import read_capture
+from tools.offline import OfflineHarness, scratch_cwd
+
+# Session bookkeeping that the harness performs itself.
+SKIPPED_EVENTS = frozenset({"READY", "RESUMED"})
+
+
+async def replay(paths: List[Path], speed: Optional[float]) -> int:
+    harness = OfflineHarness()
+    await harness.start(fixture_guild=False)
+    parsers = harness.bot._connection.parsers
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    skipped = 0
+    first_ts: Optional[float] = None
+    started = time.perf_counter()
+
+    for path in paths:
+        for timestamp, event_type, data in read_capture(path):
+            if event_type in SKIPPED_EVENTS or event_type not in parsers:
+                skipped += 1
+                continue
+            if speed is not None:
+                if first_ts is None:
+                    first_ts = timestamp
+                delay = (timestamp - first_ts) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                latencies[event_type].append(await harness.feed(event_type, data))
+            except Exception as exc:
+                skipped += 1
+                print(f"Failed to replay {event_type}: {exc!r}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    total = sum(len(values) for values in latencies.values())
+    rest_calls = harness.http.total_calls
+    await harness.stop()
+
+    print(f"Replayed {total} events in {elapsed:.2f} s ({total / elapsed if elapsed else 0:.0f} events/s), "
+          f"skipped {skipped}, REST calls {rest_calls}")
+    for event_type, values in sorted(latencies.items(), key=lambda item: -sum(item[1])):
+        print(
+            f"  {event_type:28} {len(values):7d}  mean {statistics.fmean(values) * 1000:8.3f} ms  "
+            f"max {max(values) * 1000:8.3f} ms"
+        )
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", type=Path, help="capture files, oldest first")
+    parser.add_argument("--speed", default="max", help="'max' or a multiplier of the original pacing (1 = real time)")
+    args = parser.parse_args(argv)
+
+    speed = None if args.speed == "max" else float(args.speed)
+    paths = [path.resolve() for path in args.captures]
+    with scratch_cwd("outbot-replay-"):
+        return asyncio.run(replay(paths, speed))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Compare the default and the fast runtime on replayed gateway payloads.
+
+Usage::
+
+    python -m tools.runtime_bench                          # synthetic load-test traffic
+    python -m tools.runtime_bench events.jsonl.gz          # a capture from EVENT_RECORD_PATH
+    python -m tools.runtime_bench --events 2000 --repeat 5
+
+Every payload is encoded as the gateway frame Discord would send
+(``{"op": 0, "t": ..., "s": ..., "d": ...}``) and decoded with
+``discord.utils._from_json``, the decoder discord.py itself uses (orjson when
+installed). Two stages are timed:
+
+* decode: JSON-decoding every frame, the fixed cost of each gateway message,
+  the same on every runtime and reported once;
+* replay: decoding plus discord.py's parsers and the cogs' handlers, driven
+  through ``OfflineHarness`` on each runtime's event loop (asyncio, and uvloop
+  when installed).
+
+Each figure is the best of ``--repeat`` runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import sys
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from bot.recorder import read_capture
+from bot.runtime import JsonLoads, fast_loop_factory, gateway_json
+from tools.loadtest import SCENARIOS
+from tools.offline import OfflineHarness, scratch_cwd
+from tools.replay import SKIPPED_EVENTS
+
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
+
+
+class Runtime(NamedTuple):
+    name: str
+    loop: Tuple[str, LoopFactory]
+
+
+def _frame(sequence: int, event_type: str, data: object) -> str:
+    return json.dumps({"op": 0, "t": event_type, "s": sequence, "d": data}, ensure_ascii=False, separators=(",", ":"))
+
+
+def frames_from_captures(paths: List[Path]) -> List[str]:
+    frames = []
+    for path in paths:
+        for _timestamp, event_type, data in read_capture(path):
+            if event_type not in SKIPPED_EVENTS:
+                frames.append(_frame(len(frames) + 1, event_type, data))
+    return frames
+
+
+async def synthetic_frames(events: int) -> List[str]:
+    """The fixture guild followed by every load-test scenario."""
+    harness = OfflineHarness()
+    await harness.start()
+    frames = [_frame(1, "GUILD_CREATE", harness.fixture.guild_create())]
+    for scenario in SCENARIOS.values():
+        for event_type, data in scenario(harness, events):
+            frames.append(_frame(len(frames) + 1, event_type, data))
+    await harness.stop()
+    return frames
+
+
+def runtimes() -> Tuple[List[Runtime], List[str]]:
+    available = [Runtime("default", ("asyncio", asyncio.new_event_loop))]
+    missing = []
+    fast_loop = fast_loop_factory()
+    if fast_loop is not None:
+        available.append(Runtime("fast (FAST_RUNTIME=1)", fast_loop))
+    else:
+        missing.append("uvloop")
+    return available, missing
+
+
+def time_decode(frames: List[str], loads: JsonLoads, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for frame in frames:
+            loads(frame)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def _replay(frames: List[str], loads: JsonLoads) -> float:
+    harness = OfflineHarness()
+    await harness.start(fixture_guild=False)
+    tracking = harness.cog("TrackingCog")
+    if tracking is not None:
+        tracking.tracking_enabled = True
+    parsers = harness.bot._connection.parsers
+
+    started = time.perf_counter()
+    for frame in frames:
+        message = loads(frame)
+        parser = parsers.get(message["t"])
+        if parser is not None:
+            parser(message["d"])
+            await harness.drain()
+    elapsed = time.perf_counter() - started
+    await harness.stop()
+    return elapsed
+
+
+def time_replay(frames: List[str], runtime: Runtime, loads: JsonLoads, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        loop = runtime.loop[1]()
+        try:
+            best = min(best, loop.run_until_complete(_replay(frames, loads)))
+        finally:
+            loop.close()
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="*", type=Path, help="capture files, oldest first (default: synthetic)")
+    parser.add_argument("--events", type=int, default=500, help="events per load-test scenario when synthetic")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is reported")
+    args = parser.parse_args(argv)
+
+    paths = [path.resolve() for path in args.captures]
+    with scratch_cwd("outbot-runtime-bench-"):
+        if paths:
+            frames = frames_from_captures(paths)
+            source = ", ".join(path.name for path in paths)
+        else:
+            frames = asyncio.run(synthetic_frames(args.events))
+            source = f"synthetic load-test traffic ({args.events} events per scenario)"
+        if not frames:
+            print("No replayable events found.", file=sys.stderr)
+            return 1
+        size = sum(len(frame.encode("utf-8")) for frame in frames)
+        available, missing = runtimes()
+        print(f"{len(frames)} frames, {size / 1048576:.1f} MiB, from {source}")
+        if missing:
+            print(f"Not installed, skipped: {', '.join(missing)}")
+
+        json_name, loads = gateway_json()
+        decode = time_decode(frames, loads, args.repeat)
+        print(
+            f"decode with {json_name}: {decode / len(frames) * 1e6:.2f} µs/frame "
+            f"({size / decode / 1048576:.1f} MiB/s)"
+        )
+
+        baseline = None
+        for runtime in available:
+            replay = time_replay(frames, runtime, loads, args.repeat)
+            baseline = baseline or replay
+            print(
+                f"{runtime.name:22} {runtime.loop[0]:>14}  "
+                f"replay {replay / len(frames) * 1e6:7.1f} µs/event ({len(frames) / replay:7.0f} events/s, "
+                f"×{baseline / replay:.2f})"
+            )
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())